@@ -1,6 +1,7 @@
 from django.contrib import admin
-from .models import Booking, Transaction
+from .models import Booking, BookingArchive, Transaction
 from django.utils.html import format_html
+from moviebooking.metrics import BOOKING_CONFIRMATIONS
 
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
@@ -36,13 +37,6 @@ class BookingAdmin(admin.ModelAdmin):
         return format_html('<span class="badge bg-{}">{}</span>', color, obj.status)
     payment_status.short_description = 'Status'
 
-@admin.register(Transaction)
-class TransactionAdmin(admin.ModelAdmin):
-    list_display = ['transaction_id', 'booking', 'amount', 'status', 'payment_gateway', 'created_at']
-    list_filter = ['status', 'payment_gateway', 'created_at']
-    search_fields = ['transaction_id', 'booking__booking_number']
-    readonly_fields = ['created_at']
-
     @admin.action(description="Confirm selected bookings")
     def confirm_payments(self, request, queryset):
         from django.utils import timezone
@@ -53,8 +47,9 @@ class TransactionAdmin(admin.ModelAdmin):
             booking.confirmed_at = timezone.now()
             booking.payment_method = 'MANUAL'
             booking.save()
+            BOOKING_CONFIRMATIONS.inc(path='admin')
             from .utils import SeatManager
-            SeatManager.confirm_seats(booking.showtime.id, booking.seats)
+            SeatManager.confirm_seats(booking.showtime.id, booking.seats, user_id=booking.user_id)
             updated += 1
         self.message_user(request, f"{updated} bookings confirmed successfully.")
 
@@ -70,20 +65,33 @@ class TransactionAdmin(admin.ModelAdmin):
 
     @admin.action(description="Export selected bookings to CSV")
     def export_as_csv(self, request, queryset):
-        import csv
-        from django.http import HttpResponse
-        response = HttpResponse(content_type='text/csv')
+
+        from django.http import StreamingHttpResponse
+        from .exports import ExportService
+
+        response = StreamingHttpResponse(
+            ExportService.stream('bookings', queryset=queryset.order_by('pk')),
+            content_type='text/csv'
+        )
         response['Content-Disposition'] = 'attachment; filename="selected_bookings.csv"'
-        writer = csv.writer(response)
-        writer.writerow(['Booking ID', 'User', 'Movie', 'Amount', 'Status', 'Date'])    
+        return response
+
+@admin.register(Transaction)
+class TransactionAdmin(admin.ModelAdmin):
+    list_display = ['transaction_id', 'booking', 'amount', 'status', 'payment_gateway', 'created_at']
+    list_filter = ['status', 'payment_gateway', 'created_at']
+    search_fields = ['transaction_id', 'booking__booking_number']
+    readonly_fields = ['created_at']
+
+@admin.register(BookingArchive)
+class BookingArchiveAdmin(admin.ModelAdmin):
+    list_display = ['booking_number', 'user', 'showtime', 'total_seats', 'total_amount', 'status', 'showtime_date', 'archived_at']
+    list_filter = ['status', 'showtime_date']
+    search_fields = ['booking_number', 'user__username', 'showtime__movie__title']
+
+    # Archived rows are history; BookingArchiver is the only writer
+    def has_add_permission(self, request):
+        return False
 
-        for booking in queryset:
-            writer.writerow([
-                booking.booking_number,
-                booking.user.username,
-                booking.showtime.movie.title,
-                booking.total_amount,
-                booking.status,
-                booking.created_at.strftime('%Y-%m-%d %H:%M')
-            ])
-        return response
\ No newline at end of file
+    def has_change_permission(self, request, obj=None):
+        return False
@@ -0,0 +1,145 @@
+import logging
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import BooleanField, Max, Value
+from django.utils import timezone
+
+from .models import Booking, BookingArchive, Transaction, TransactionArchive
+
+logger = logging.getLogger(__name__)
+
+class BookingArchiver:
+
+    # Bookings that can no longer change once their showtime is over
+    TERMINAL_STATUSES = ('CONFIRMED', 'CANCELLED', 'EXPIRED', 'FAILED')
+    MY_BOOKINGS_PAGE_SIZE = 20
+
+    @staticmethod
+    def cutoff(days=None):
+
+        if days is None:
+            days = getattr(settings, 'BOOKING_ARCHIVE_AFTER_DAYS', 180)
+        return timezone.localdate() - timedelta(days=days)
+
+    @staticmethod
+    def candidates(cutoff):
+        return Booking.objects.filter(
+            showtime__date__lt=cutoff, status__in=BookingArchiver.TERMINAL_STATUSES
+        ).order_by('id')
+
+    @staticmethod
+    def _columns(model):
+        return [field.column for field in model._meta.concrete_fields]
+
+    @staticmethod
+    def _move(ids, archived_at):
+
+        # One short transaction per batch: copy with INSERT ... SELECT, then delete what was copied
+        quote = connection.ops.quote_name
+        booking_table = quote(Booking._meta.db_table)
+        transaction_table = quote(Transaction._meta.db_table)
+        showtime_table = quote(Booking._meta.get_field('showtime').related_model._meta.db_table)
+        booking_columns = ', '.join(quote(column) for column in BookingArchiver._columns(Booking))
+        selected_columns = ', '.join(f"b.{quote(column)}" for column in BookingArchiver._columns(Booking))
+        transaction_columns = ', '.join(quote(column) for column in BookingArchiver._columns(Transaction))
+
+        with transaction.atomic():
+            if connection.features.has_select_for_update:
+                # A late refund or admin edit waits for the batch instead of landing on a row already copied
+                ids = list(Booking.objects.select_for_update().filter(
+                    id__in=ids, status__in=BookingArchiver.TERMINAL_STATUSES
+                ).values_list('id', flat=True))
+            if not ids:
+                return 0, 0
+            placeholders = ', '.join(['%s'] * len(ids))
+            statuses = ', '.join(['%s'] * len(BookingArchiver.TERMINAL_STATUSES))
+
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"INSERT INTO {quote(BookingArchive._meta.db_table)} ({booking_columns}, "
+                    f"{quote('showtime_date')}, {quote('archived_at')}) "
+                    f"SELECT {selected_columns}, s.{quote('date')}, %s FROM {booking_table} b "
+                    f"INNER JOIN {showtime_table} s ON s.{quote('id')} = b.{quote('showtime_id')} "
+                    f"WHERE b.{quote('id')} IN ({placeholders}) AND b.{quote('status')} IN ({statuses})",
+                    [connection.ops.adapt_datetimefield_value(archived_at), *ids, *BookingArchiver.TERMINAL_STATUSES],
+                )
+                moved = cursor.rowcount
+                archived = f"SELECT {quote('id')} FROM {quote(BookingArchive._meta.db_table)} WHERE {quote('id')} IN ({placeholders})"
+                cursor.execute(
+                    f"INSERT INTO {quote(TransactionArchive._meta.db_table)} ({transaction_columns}) "
+                    f"SELECT {transaction_columns} FROM {transaction_table} WHERE {quote('booking_id')} IN ({archived})",
+                    ids,
+                )
+                transactions = cursor.rowcount
+                cursor.execute(f"DELETE FROM {transaction_table} WHERE {quote('booking_id')} IN ({archived})", ids)
+                cursor.execute(f"DELETE FROM {booking_table} WHERE {quote('id')} IN ({archived})", ids)
+        return moved, transactions
+
+    @staticmethod
+    def run(days=None, batch_size=None, max_batches=None):
+
+        cutoff = BookingArchiver.cutoff(days)
+        batch_size = batch_size or getattr(settings, 'BOOKING_ARCHIVE_BATCH_SIZE', 500)
+        archived_at = timezone.now()
+        result = {'cutoff': cutoff, 'bookings': 0, 'transactions': 0, 'batches': 0}
+
+        while max_batches is None or result['batches'] < max_batches:
+            ids = list(BookingArchiver.candidates(cutoff).values_list('id', flat=True)[:batch_size])
+            if not ids:
+                break
+            moved, transactions = BookingArchiver._move(ids, archived_at)
+            if not moved:
+                break
+            result['bookings'] += moved
+            result['transactions'] += transactions
+            result['batches'] += 1
+
+        if result['bookings']:
+            logger.info(f"📦 Archived {result['bookings']} bookings ({result['transactions']} transactions) "
+                        f"for showtimes before {cutoff} in {result['batches']} batches")
+        return result
+
+    @staticmethod
+    def reaches(start_date):
+
+        # Whether bookings created on or after start_date (None: all time) may sit in the archive.
+        # A booking is made before its show, so nothing archived is newer than the latest archived showtime.
+        latest = BookingArchive.objects.aggregate(latest=Max('showtime_date'))['latest']
+        if latest is None:
+            return False
+        if isinstance(start_date, str):
+            start_date = date.fromisoformat(start_date)
+        return start_date is None or start_date <= latest
+
+    @staticmethod
+    def for_user(user, page=1, per_page=None):
+
+        # One page of a user's live and archived bookings, newest first, for My Bookings.
+        # The UNION of (id, created_at) is ordered and sliced in SQL, then only that page's rows are loaded.
+        per_page = per_page or BookingArchiver.MY_BOOKINGS_PAGE_SIZE
+        offset = (max(page, 1) - 1) * per_page
+
+        def keys(model, archived):
+            return model.objects.filter(user=user).annotate(
+                archived=Value(archived, output_field=BooleanField())
+            ).values_list('id', 'created_at', 'archived').order_by()
+
+        rows = list(
+            keys(Booking, False).union(keys(BookingArchive, True), all=True)
+            .order_by('-created_at', '-id')[offset:offset + per_page + 1]
+        )
+        has_more = len(rows) > per_page
+        rows = rows[:per_page]
+
+        related = ('showtime__movie', 'showtime__screen__theater')
+        loaded = {}
+        for model, archived in ((Booking, False), (BookingArchive, True)):
+            ids = [booking_id for booking_id, _, is_archived in rows if is_archived == archived]
+            if ids:
+                loaded.update(
+                    ((archived, booking.id), booking)
+                    for booking in model.objects.filter(id__in=ids).select_related(*related)
+                )
+        return [loaded[(archived, booking_id)] for booking_id, _, archived in rows], has_more
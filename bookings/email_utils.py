@@ -5,6 +5,8 @@ from django.conf import settings
 from django.utils import timezone
 from datetime import timedelta
 
+from moviebooking.metrics import EMAIL_LATENCY
+
 try:
     from celery import shared_task
 except ImportError:
@@ -97,7 +99,8 @@ def send_booking_confirmation_email(booking_id):
         email.attach_alternative(html_content, "text/html")
         
 
-        email.send()
+        with EMAIL_LATENCY.time(email='confirmation'):
+            email.send()
         
         logger.info(f"✅ 📧 CONFIRMATION EMAIL SENT | Booking: {booking.booking_number} | To: {user.email}")
         return f"Email sent successfully to {user.email}"
@@ -169,7 +172,8 @@ def send_payment_failed_email(booking_id):
         
         email = EmailMultiAlternatives(subject, text_content, from_email, to_email)
         email.attach_alternative(html_content, "text/html")
-        email.send()
+        with EMAIL_LATENCY.time(email='payment_failed'):
+            email.send()
         
         logger.info(f"✅ Payment failed email sent to {user.email}")
         return f"Payment failed email sent to {user.email}"
@@ -207,7 +211,8 @@ def send_seat_reminder_email(booking_id):
         
         email = EmailMultiAlternatives(subject, text_content, from_email, to_email)
         email.attach_alternative(html_content, "text/html")
-        email.send()
+        with EMAIL_LATENCY.time(email='seat_reminder'):
+            email.send()
         
         logger.info(f"✅ Reminder email sent for booking {booking.booking_number}")
         return f"Reminder sent for booking {booking.booking_number}"
@@ -251,7 +256,8 @@ def send_late_payment_email(booking_id):
         
         email = EmailMultiAlternatives(subject, text_content, from_email, to_email)
         email.attach_alternative(html_content, "text/html")
-        email.send()
+        with EMAIL_LATENCY.time(email='late_payment'):
+            email.send()
         
         logger.info(f"✅ [LATE PAYMENT] Refund email sent to {user.email} for booking {booking.booking_number}")
         
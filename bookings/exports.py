@@ -0,0 +1,162 @@
+import csv
+import json
+import zlib
+from datetime import date, datetime, time
+from decimal import Decimal
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from .models import Booking, Transaction
+
+class Echo:
+
+    # csv.writer only needs write(); returning the line lets us yield it straight away
+    def write(self, value):
+        return value
+
+class ExportService:
+
+    FORMATS = ('csv', 'jsonl')
+    CHUNK_SIZE = 2000
+    BATCH_BYTES = 64 * 1024
+
+    # dataset -> (model, path from the model to Booking, [(column, field), ...])
+    DATASETS = {
+        'bookings': (Booking, '', [
+            ('booking_number', 'booking_number'),
+            ('user', 'user__username'),
+            ('email', 'user__email'),
+            ('movie', 'showtime__movie__title'),
+            ('theater', 'showtime__screen__theater__name'),
+            ('city', 'showtime__screen__theater__city__name'),
+            ('show_date', 'showtime__date'),
+            ('show_time', 'showtime__start_time'),
+            ('seats', 'total_seats'),
+            ('base_price', 'base_price'),
+            ('convenience_fee', 'convenience_fee'),
+            ('tax_amount', 'tax_amount'),
+            ('total_amount', 'total_amount'),
+            ('status', 'status'),
+            ('payment_method', 'payment_method'),
+            ('payment_id', 'payment_id'),
+            ('created_at', 'created_at'),
+            ('confirmed_at', 'confirmed_at'),
+        ]),
+        'transactions': (Transaction, 'booking__', [
+            ('transaction_id', 'transaction_id'),
+            ('booking_number', 'booking__booking_number'),
+            ('user', 'booking__user__username'),
+            ('movie', 'booking__showtime__movie__title'),
+            ('theater', 'booking__showtime__screen__theater__name'),
+            ('amount', 'amount'),
+            ('status', 'status'),
+            ('payment_gateway', 'payment_gateway'),
+            ('created_at', 'created_at'),
+        ]),
+    }
+
+    @staticmethod
+    def queryset(dataset, filters=None):
+
+        model, to_booking, _ = ExportService.DATASETS[dataset]
+        filters = filters or {}
+        queryset = model.objects.all()
+
+        date_from = parse_date(str(filters.get('date_from') or ''))
+        date_to = parse_date(str(filters.get('date_to') or ''))
+        if date_from:
+            queryset = queryset.filter(created_at__date__gte=date_from)
+        if date_to:
+            queryset = queryset.filter(created_at__date__lte=date_to)
+        if filters.get('status'):
+            queryset = queryset.filter(status=str(filters['status']).upper())
+        if str(filters.get('movie_id') or '').isdigit():
+            queryset = queryset.filter(**{f'{to_booking}showtime__movie_id': int(filters['movie_id'])})
+        if str(filters.get('theater_id') or '').isdigit():
+            queryset = queryset.filter(**{f'{to_booking}showtime__screen__theater_id': int(filters['theater_id'])})
+
+        # Primary key order is index-backed and stable while rows are being added
+        return queryset.order_by('pk')
+
+    @staticmethod
+    def _cell(value):
+
+        if value is None:
+            return ''
+        if isinstance(value, datetime):
+            return timezone.localtime(value).isoformat() if timezone.is_aware(value) else value.isoformat()
+        if isinstance(value, (date, time)):
+            return value.isoformat()
+        if isinstance(value, Decimal):
+            return str(value)
+        return value
+
+    @staticmethod
+    def _lines(dataset, queryset, fmt):
+
+        _, _, columns = ExportService.DATASETS[dataset]
+        names = [name for name, _ in columns]
+
+        # Plain tuples from a server-side cursor: no model instances, constant memory
+        rows = queryset.values_list(*[field for _, field in columns]).iterator(chunk_size=ExportService.CHUNK_SIZE)
+
+        if fmt == 'jsonl':
+            for row in rows:
+                yield json.dumps(dict(zip(names, map(ExportService._cell, row)))) + '\n'
+            return
+
+        writer = csv.writer(Echo())
+        yield writer.writerow(names)
+        for row in rows:
+            yield writer.writerow([ExportService._cell(value) for value in row])
+
+    @staticmethod
+    def stream(dataset, queryset=None, fmt='csv', compress=False, filters=None):
+
+        if dataset not in ExportService.DATASETS:
+            raise ValueError(f"Unknown export dataset: {dataset}")
+        if fmt not in ExportService.FORMATS:
+            raise ValueError(f"Unknown export format: {fmt}")
+
+        if queryset is None:
+            queryset = ExportService.queryset(dataset, filters)
+        batches = ExportService._batches(ExportService._lines(dataset, queryset, fmt))
+
+        if not compress:
+            yield from batches
+            return
+
+        # wbits=31 writes a gzip header, so the output is a regular .gz file
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)
+        for batch in batches:
+            chunk = compressor.compress(batch)
+            if chunk:
+                yield chunk
+        yield compressor.flush()
+
+    @staticmethod
+    def _batches(lines):
+
+        # Group rows into ~64KB writes instead of handing the server one tiny chunk per row
+        buffer = []
+        size = 0
+        for line in lines:
+            buffer.append(line.encode('utf-8'))
+            size += len(buffer[-1])
+            if size >= ExportService.BATCH_BYTES:
+                yield b''.join(buffer)
+                buffer, size = [], 0
+        if buffer:
+            yield b''.join(buffer)
+
+    @staticmethod
+    def filename(dataset, fmt='csv', compress=False):
+        stamp = timezone.localtime().strftime('%Y%m%d-%H%M%S')
+        return f"{dataset}-{stamp}.{fmt}{'.gz' if compress else ''}"
+
+    @staticmethod
+    def content_type(fmt='csv', compress=False):
+        if compress:
+            return 'application/gzip'
+        return 'text/csv' if fmt == 'csv' else 'application/x-ndjson'
@@ -0,0 +1,70 @@
+import logging
+
+from django.db.models import F, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+class SeatInventory:
+
+    # Seats of bookings in these states are not available to anyone else
+    HOLDING_STATUSES = ('PENDING', 'CONFIRMED')
+
+    @staticmethod
+    def delta(previous_status, status, seats):
+
+        # Seats taken (negative) or given back (positive) by a status transition
+        was_holding = previous_status in SeatInventory.HOLDING_STATUSES
+        is_holding = status in SeatInventory.HOLDING_STATUSES
+        if was_holding == is_holding:
+            return 0
+        return -seats if is_holding else seats
+
+    @staticmethod
+    def adjust(showtime_id, delta):
+
+        # Single UPDATE ... SET available_seats = available_seats + delta, inside the caller's transaction
+        if not delta:
+            return 0
+
+        from movies.theater_models import Screen, Showtime
+
+        # A showtime whose counter was never set starts from its screen's capacity
+        capacity = Subquery(Screen.objects.filter(pk=OuterRef('screen_id')).values('total_seats')[:1])
+        return Showtime.objects.filter(pk=showtime_id).update(
+            available_seats=Greatest(Coalesce(F('available_seats'), capacity) + delta, Value(0))
+        )
+
+    @staticmethod
+    def repair(from_date=None, dry_run=False):
+
+        from movies.theater_models import Showtime
+        from .models import Booking
+
+        from_date = from_date or timezone.localdate()
+
+        held = dict(
+            Booking.objects.filter(
+                status__in=SeatInventory.HOLDING_STATUSES,
+                showtime__date__gte=from_date,
+            ).order_by().values('showtime_id').annotate(
+                seats=Sum('total_seats')
+            ).values_list('showtime_id', 'seats')
+        )
+
+        drifted = []
+        for showtime in Showtime.objects.filter(date__gte=from_date).only(
+            'id', 'available_seats', 'screen__total_seats'
+        ).select_related('screen'):
+            expected = max(showtime.screen.total_seats - (held.get(showtime.id) or 0), 0)
+            if showtime.available_seats != expected:
+                showtime.available_seats = expected
+                drifted.append(showtime)
+
+        if not dry_run:
+            Showtime.objects.bulk_update(drifted, ['available_seats'], batch_size=500)
+
+        if drifted:
+            logger.info(f"Seat inventory repair: {len(drifted)} showtimes drifted")
+        return len(drifted)
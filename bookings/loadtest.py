@@ -0,0 +1,285 @@
+import hashlib
+import hmac
+import json
+import logging
+import math
+import random
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+from django.conf import settings
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from importlib import import_module
+
+from .stress import SeatInvariants
+
+logger = logging.getLogger(__name__)
+
+# Built-in contention levels; a scenario file uses the same keys (see FlashSaleLoadTest.load_scenario)
+SCENARIOS = {
+    'low': {'users': 20, 'concurrency': 5, 'hot_seats': 0, 'seats_per_user': [1, 2], 'polls': 1},
+    'medium': {'users': 100, 'concurrency': 20, 'hot_seats': 60, 'seats_per_user': [1, 4], 'polls': 2},
+    'flash-sale': {'users': 300, 'concurrency': 60, 'hot_seats': 20, 'seats_per_user': [2, 4], 'polls': 3},
+}
+
+DEFAULTS = {
+    'name': 'custom',
+    'showtime_id': None,
+    'users': 50,
+    'concurrency': 10,
+    'hot_seats': 0,  # 0 = any seat; N = every user fights over the first N seats of the map
+    'seats_per_user': [1, 4],
+    'polls': 2,
+    'think_time_ms': [0, 100],
+    'payment': {'redirect': 0.7, 'webhook': 0.3},
+    'timeout': 30,
+    'seed': None,
+}
+
+STEPS = ('select_seats', 'get_seat_status', 'reserve_seats', 'create_booking', 'payment_page', 'payment_success', 'webhook')
+
+class FunnelUser:
+
+    def __init__(self, base_url, user, timeout, record):
+        self.base_url = base_url.rstrip('/')
+        self.user = user
+        self.timeout = timeout
+        self.record = record
+        self.http = requests.Session()
+        self.http.cookies.set(settings.SESSION_COOKIE_NAME, self._session_key(user))
+
+    @staticmethod
+    def _session_key(user):
+
+        # Log in by writing the session straight into the shared session store (no password round trip)
+        session = import_module(settings.SESSION_ENGINE).SessionStore()
+        session[SESSION_KEY] = str(user.pk)
+        session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+        session[HASH_SESSION_KEY] = user.get_session_auth_hash()
+        session.save()
+        return session.session_key
+
+    def call(self, step, method, path, **kwargs):
+
+        headers = kwargs.pop('headers', {})
+        if method == 'POST' and 'csrftoken' in self.http.cookies:
+            headers['X-CSRFToken'] = self.http.cookies['csrftoken']
+
+        started = time.perf_counter()
+        try:
+            response = self.http.request(
+                method, f'{self.base_url}{path}', headers=headers, timeout=self.timeout, allow_redirects=False, **kwargs
+            )
+        except requests.RequestException as e:
+            self.record(step, time.perf_counter() - started, None)
+            logger.error(f"Load test {step} failed for {self.user.username}: {e}")
+            return None
+        self.record(step, time.perf_counter() - started, response.status_code)
+        return response
+
+class FlashSaleLoadTest:
+
+    USERNAME_PREFIX = 'loadtest-'
+
+    def __init__(self, base_url, scenario):
+        self.base_url = base_url
+        self.scenario = scenario
+        self.rng = random.Random(scenario['seed'])
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.statuses = defaultdict(Counter)
+        self.outcomes = Counter()
+
+    @staticmethod
+    def load_scenario(name_or_path, **overrides):
+
+        if name_or_path in SCENARIOS:
+            scenario = {**DEFAULTS, 'name': name_or_path, **SCENARIOS[name_or_path]}
+        elif name_or_path:
+            with open(name_or_path) as handle:
+                scenario = {**DEFAULTS, **json.load(handle)}
+        else:
+            scenario = dict(DEFAULTS)
+
+        scenario.update({key: value for key, value in overrides.items() if value is not None})
+        unknown = set(scenario) - set(DEFAULTS)
+        if unknown:
+            raise ValueError(f"Unknown scenario keys: {', '.join(sorted(unknown))}")
+        return scenario
+
+    def record(self, step, seconds, status):
+
+        with self._lock:
+            self.samples[step].append(seconds * 1000)
+            self.statuses[step][status or 'error'] += 1
+
+    def users(self):
+
+        users = []
+        for i in range(self.scenario['users']):
+            user, created = User.objects.get_or_create(
+                username=f'{self.USERNAME_PREFIX}{i}', defaults={'email': f'{self.USERNAME_PREFIX}{i}@example.com'}
+            )
+            if created or not user.profile.is_email_verified:
+                user.profile.is_email_verified = True
+                user.profile.save()
+            users.append(user)
+        return users
+
+    def _pick_seats(self, status):
+
+        taken = set(status.get('booked_seats', [])) | set(status.get('reserved_seats', []))
+        low, high = self.scenario['seats_per_user']
+        with self._lock:
+            count = self.rng.randint(low, high)
+            pool = self._seat_map[:self.scenario['hot_seats']] if self.scenario['hot_seats'] else self._seat_map
+            free = [seat for seat in pool if seat not in taken] or pool
+            return self.rng.sample(free, min(count, len(free))), self.rng.random()
+
+    def _think(self):
+        low, high = self.scenario['think_time_ms']
+        with self._lock:
+            pause = self.rng.uniform(low, high)
+        time.sleep(pause / 1000)
+
+    def _webhook(self, client, order_id, payment_id):
+
+        body = json.dumps({
+            'event': 'payment.captured',
+            'payload': {'payment': {'entity': {'id': payment_id, 'order_id': order_id}}},
+        })
+        headers = {'Content-Type': 'application/json'}
+        secret = getattr(settings, 'RAZORPAY_WEBHOOK_SECRET', None)
+        if secret:
+            headers['X-Razorpay-Signature'] = hmac.new(secret.encode(), body.encode(), hashlib.sha256).hexdigest()
+        return client.call('webhook', 'POST', '/bookings/razorpay-webhook/', data=body, headers=headers)
+
+    def run_user(self, user):
+
+        client = FunnelUser(self.base_url, user, self.scenario['timeout'], self.record)
+        showtime_id = self.showtime_id
+
+        response = client.call('select_seats', 'GET', f'/bookings/select-seats/{showtime_id}/')
+        if response is None or response.status_code != 200:
+            return 'select_failed'
+
+        status = {}
+        for _ in range(max(self.scenario['polls'], 1)):
+            response = client.call('get_seat_status', 'GET', f'/bookings/api/seat-status/{showtime_id}/')
+            if response is not None and response.status_code == 200:
+                status = response.json()
+            self._think()
+
+        seat_ids, payment_roll = self._pick_seats(status)
+        payload = json.dumps({'seat_ids': seat_ids})
+        response = client.call('reserve_seats', 'POST', f'/bookings/api/reserve-seats/{showtime_id}/',
+                               data=payload, headers={'Content-Type': 'application/json'})
+        if response is None or response.status_code != 200:
+            return 'reserve_failed'
+
+        response = client.call('create_booking', 'POST', f'/bookings/api/create-booking/{showtime_id}/',
+                               data=payload, headers={'Content-Type': 'application/json'})
+        if response is None:
+            return 'create_failed'
+        if response.status_code == 400:
+            return 'seat_conflict'
+        if response.status_code != 200:
+            return 'create_failed'
+        booking = response.json()
+
+        self._think()
+        response = client.call('payment_page', 'GET', f"/bookings/{booking['booking_id']}/payment/")
+        if response is None or response.status_code != 200:
+            return 'payment_page_failed'
+
+        payment_id = f"pay_loadtest_{booking['booking_id']}"
+        if payment_roll < self.scenario['payment'].get('webhook', 0):
+            response = self._webhook(client, booking['order_id'], payment_id)
+            return 'confirmed' if response is not None and response.status_code == 200 else 'payment_failed'
+
+        response = client.call('payment_success', 'GET', f"/bookings/{booking['booking_id']}/payment/success/", params={
+            'razorpay_payment_id': payment_id,
+            'razorpay_order_id': booking['order_id'],
+            'razorpay_signature': 'loadtest',
+        })
+        if response is None or response.status_code != 302:
+            return 'payment_failed'
+        return 'confirmed' if '/detail/' in response.headers.get('Location', '') else 'collision'
+
+    def scrape_metrics(self):
+
+        # Server-side DB/cache totals from /metrics; None when the endpoint is unreachable
+        headers = {}
+        token = getattr(settings, 'METRICS_TOKEN', None)
+        if token:
+            headers['Authorization'] = f'Bearer {token}'
+        try:
+            response = requests.get(f"{self.base_url.rstrip('/')}/metrics", headers=headers, timeout=10)
+            response.raise_for_status()
+        except requests.RequestException:
+            return None
+
+        totals = Counter()
+        for line in response.text.splitlines():
+            if line.startswith('#') or ' ' not in line:
+                continue
+            series, value = line.rsplit(' ', 1)
+            name = series.split('{', 1)[0]
+            if name in ('moviebooking_db_queries_total', 'moviebooking_db_query_seconds_total'):
+                totals[name] += float(value)
+            elif name == 'moviebooking_cache_requests_total':
+                totals['cache_' + ('hits' if 'result="hit"' in series else 'misses')] += float(value)
+        return totals
+
+    @staticmethod
+    def _percentile(values, pct):
+        return values[max(math.ceil(pct / 100 * len(values)) - 1, 0)]
+
+    def run(self, showtime, seat_map):
+
+        self.showtime_id = showtime.id
+        self._seat_map = seat_map
+        users = self.users()
+        before = self.scrape_metrics()
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.scenario['concurrency']) as pool:
+            for outcome in pool.map(self.run_user, users):
+                self.outcomes[outcome] += 1
+        elapsed = time.perf_counter() - started
+
+        after = self.scrape_metrics()
+        requests_made = sum(len(samples) for samples in self.samples.values())
+        steps = {}
+        for step in STEPS:
+            samples = sorted(self.samples.get(step, []))
+            if not samples:
+                continue
+            steps[step] = {
+                'requests': len(samples),
+                'p50_ms': round(self._percentile(samples, 50), 2),
+                'p95_ms': round(self._percentile(samples, 95), 2),
+                'p99_ms': round(self._percentile(samples, 99), 2),
+                'max_ms': round(samples[-1], 2),
+                'statuses': {str(code): count for code, count in self.statuses[step].items()},
+            }
+
+        violations = SeatInvariants.double_bookings(showtime.id)
+        return {
+            'scenario': self.scenario,
+            'showtime_id': showtime.id,
+            'elapsed_seconds': round(elapsed, 3),
+            'throughput': {
+                'requests_per_second': round(requests_made / elapsed, 2) if elapsed else 0,
+                'funnels_per_second': round(len(users) / elapsed, 2) if elapsed else 0,
+                'confirmed_per_second': round(self.outcomes['confirmed'] / elapsed, 2) if elapsed else 0,
+            },
+            'outcomes': dict(self.outcomes),
+            'steps': steps,
+            'double_bookings': {'count': len(violations), 'seats': violations},
+            'server': {key: round(after[key] - before.get(key, 0), 4) for key in after} if before is not None and after is not None else None,
+        }
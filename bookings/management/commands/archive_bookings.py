@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from bookings.archive import BookingArchiver
+
+class Command(BaseCommand):
+    help = 'Move finished bookings of past showtimes (and their transactions) into the archive tables, in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None,
+                            help='Archive showtimes older than N days (default: BOOKING_ARCHIVE_AFTER_DAYS)')
+        parser.add_argument('--batch-size', type=int, default=None, help='Bookings moved per transaction')
+        parser.add_argument('--max-batches', type=int, default=None, help='Stop after N batches')
+        parser.add_argument('--dry-run', action='store_true', help='Only count what would be archived')
+
+    def handle(self, *args, **options):
+
+        if options['dry_run']:
+            cutoff = BookingArchiver.cutoff(options['days'])
+            count = BookingArchiver.candidates(cutoff).count()
+            self.stdout.write(f"📦 {count} bookings for showtimes before {cutoff} would be archived")
+            return
+
+        result = BookingArchiver.run(options['days'], options['batch_size'], options['max_batches'])
+        self.stdout.write(self.style.SUCCESS(
+            f"✅ Archived {result['bookings']} bookings and {result['transactions']} transactions "
+            f"for showtimes before {result['cutoff']} in {result['batches']} batches"
+        ))
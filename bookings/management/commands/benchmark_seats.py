@@ -0,0 +1,231 @@
+import json
+import logging
+import math
+import platform
+import random
+import statistics
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from bookings.models import Booking
+from bookings.seat_store import BACKENDS, CacheKeyBuilder, SeatStore, forget_showtime
+from movies.models import Movie
+from movies.theater_models import City, Theater, Screen, Showtime
+
+class Rollback(Exception):
+    pass
+
+class Command(BaseCommand):
+    help = 'Benchmark seat engines with identical workloads across seat-map sizes and booking counts (rolled back afterwards)'
+
+    SEATS_PER_ROW = 20
+    USER_BASE = 10 ** 9  # Reservation user ids, far away from real users
+
+    def add_arguments(self, parser):
+        parser.add_argument('--seats', default='120,500,1000', help='Comma separated seat-map sizes')
+        parser.add_argument('--bookings', default='0,1000,5000', help='Comma separated booking counts per showtime')
+        parser.add_argument('--impl', default=','.join(BACKENDS),
+                            help=f"Comma separated seat engines: {', '.join(BACKENDS)} or a dotted path to a SeatStore class")
+        parser.add_argument('--iterations', type=int, default=50, help='Timed calls per operation')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--output', help='Write the JSON results here instead of stdout')
+
+    def _implementations(self, names):
+
+        engines = {}
+        for name in names:
+            try:
+                engines[name] = import_string(BACKENDS.get(name, name))
+            except ImportError as e:
+                raise CommandError(f"Unknown seat engine '{name}': {e}")
+        return engines
+
+    def _layout(self, seats):
+
+        # Same generator every engine uses, sized to the requested seat count (+1 column for the walkway)
+        return SeatStore.generate_seat_layout(
+            rows=math.ceil(seats / self.SEATS_PER_ROW), cols=self.SEATS_PER_ROW + 1
+        )
+
+    def _store(self, engine, layout):
+
+        # A private instance serving the benchmark layout, so the engine's shared instance is left alone
+        store = engine(getattr(settings, 'SEAT_STORE', {}).get('OPTIONS'))
+        store.generate_seat_layout = lambda rows=10, cols=12: [
+            [dict(seat) if seat else None for seat in row] for row in layout
+        ]
+        return store
+
+    def _seat_ids(self, layout):
+        return [seat['seat_id'] for row in layout for seat in row if seat]
+
+    def _seed_showtime(self, movie, screen, day):
+        return Showtime.objects.create(movie=movie, screen=screen, date=day, start_time='14:00', end_time='16:00')
+
+    def _seed_bookings(self, user, showtime, seat_ids, count, offset, rng):
+
+        # Holding bookings only ever use the first half of the map, so the second half stays free to reserve
+        held = seat_ids[:len(seat_ids) // 2]
+        now = timezone.now()
+        bookings = []
+        for i in range(count):
+            roll = rng.random()
+            status = 'CONFIRMED' if roll < 0.2 else 'PENDING' if roll < 0.25 else rng.choice(['CANCELLED', 'EXPIRED'])
+            pool = held if status in ('CONFIRMED', 'PENDING') else seat_ids
+            seats = rng.sample(pool, min(rng.randint(1, 4), len(pool)))
+            bookings.append(Booking(
+                booking_number=f'SEATBENCH-{showtime.id}-{offset + i}',
+                user=user,
+                showtime=showtime,
+                seats=seats,
+                total_seats=len(seats),
+                base_price=200 * len(seats),
+                total_amount=250 * len(seats),
+                status=status,
+                expires_at=now + timedelta(minutes=10) if status == 'PENDING' else None,
+            ))
+        Booking.objects.bulk_create(bookings, batch_size=2000)
+
+    def _forget(self, showtime_id, seat_ids, iterations):
+        forget_showtime(showtime_id, range(self.USER_BASE, self.USER_BASE + iterations), seat_ids)
+
+    def _drop_available(self, store, showtime_id):
+
+        # Cold read: whatever the engine derives availability from has to be rebuilt
+        cache.delete(CacheKeyBuilder.available_seats(showtime_id))
+        store.invalidate(showtime_id)
+
+    def _time(self, call, iterations, before=None):
+
+        samples = []
+        results = []
+        for i in range(iterations):
+            if before:
+                before(i)
+            started = time.perf_counter()
+            results.append(call(i))
+            samples.append((time.perf_counter() - started) * 1000)
+
+        samples.sort()
+        return {
+            'iterations': iterations,
+            'mean_ms': round(statistics.fmean(samples), 4),
+            'median_ms': round(statistics.median(samples), 4),
+            'p95_ms': round(samples[max(math.ceil(0.95 * len(samples)) - 1, 0)], 4),
+            'max_ms': round(samples[-1], 4),
+            'ok': sum(1 for result in results if result is not False),
+        }
+
+    def _run(self, store, showtime_id, seat_ids, iterations):
+
+        free = seat_ids[len(seat_ids) // 2:]
+        iterations = min(iterations, len(free))
+        user = lambda i: self.USER_BASE + i
+        seat = lambda i: [free[i]]
+
+        self._forget(showtime_id, seat_ids, iterations)
+        store.get_seat_layout(showtime_id)
+
+        operations = {
+            'get_available_seats': self._time(
+                lambda i: store.get_available_seats(showtime_id), iterations,
+                before=lambda i: self._drop_available(store, showtime_id)
+            ),
+            'get_available_seats_cached': self._time(lambda i: store.get_available_seats(showtime_id), iterations),
+            'get_reserved_seats': self._time(lambda i: store.get_reserved_seats(showtime_id), iterations),
+            'reserve_seats': self._time(lambda i: store.reserve_seats(showtime_id, seat(i), user(i)), iterations),
+            'release_seats': self._time(lambda i: store.release_seats(showtime_id, seat(i), user(i)), iterations),
+        }
+        operations['is_seat_still_available_for_user'] = self._time(
+            lambda i: store.is_seat_still_available_for_user(showtime_id, seat(i), user(i)), iterations
+        )
+
+        # Last, because confirming sells the seats for good
+        operations['confirm_seats'] = self._time(
+            lambda i: store.confirm_seats(showtime_id, seat(i)), iterations,
+            before=lambda i: store.reserve_seats(showtime_id, seat(i), user(i))
+        )
+
+        self._forget(showtime_id, seat_ids, iterations)
+        return operations
+
+    def handle(self, *args, **options):
+
+        seat_sizes = sorted(int(size) for size in options['seats'].split(',') if size.strip())
+        booking_counts = sorted(int(count) for count in options['bookings'].split(',') if count.strip())
+        engines = self._implementations([name.strip() for name in options['impl'].split(',') if name.strip()])
+        rng = random.Random(options['seed'])
+        results = []
+
+        # Benchmark the engine, not the console: some engines log every call at INFO
+        logging.disable(logging.INFO)
+        try:
+            with transaction.atomic():
+                user = User.objects.create_user(username='seat-benchmark')
+                city = City.objects.create(name='Seat Benchmark City')
+                theater = Theater.objects.create(name='Seat Benchmark Theater', city=city, address='-')
+                movie = Movie.objects.create(
+                    title='Seat Benchmark Movie', description='-', release_date=timezone.now().date(), duration=120
+                )
+                day = timezone.now().date() + timedelta(days=1)
+
+                for seats in seat_sizes:
+                    screen = Screen.objects.create(theater=theater, name=f'Benchmark {seats}', total_seats=seats)
+
+                    for name, engine in engines.items():
+                        layout = self._layout(seats)
+                        seat_ids = self._seat_ids(layout)
+                        showtime = self._seed_showtime(movie, screen, day)
+                        store = self._store(engine, layout)
+                        seeded = 0
+
+                        for count in booking_counts:
+                            self._seed_bookings(user, showtime, seat_ids, count - seeded, seeded, rng)
+                            seeded = count
+
+                            operations = self._run(store, showtime.id, seat_ids, options['iterations'])
+                            for operation, stats in operations.items():
+                                results.append({
+                                    'implementation': name,
+                                    'seats': len(seat_ids),
+                                    'bookings': count,
+                                    'operation': operation,
+                                    **stats,
+                                })
+                            self.stderr.write(
+                                f'📊 {name:>10} | {len(seat_ids):>5} seats | {count:>5} bookings | ' +
+                                ' | '.join(f"{op} {stats['median_ms']:.3f}ms" for op, stats in operations.items())
+                            )
+
+                raise Rollback()
+        except Rollback:
+            pass
+        finally:
+            logging.disable(logging.NOTSET)
+
+        report = {
+            'meta': {
+                'generated_at': timezone.now().isoformat(),
+                'python': platform.python_version(),
+                'database': connection.vendor,
+                'cache_backend': settings.CACHES['default']['BACKEND'],
+                'iterations': options['iterations'],
+                'seed': options['seed'],
+                'implementations': {name: f'{engine.__module__}.{engine.__qualname__}' for name, engine in engines.items()},
+            },
+            'results': results,
+        }
+
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(report, handle, indent=2)
+            self.stderr.write(self.style.SUCCESS(f"✅ {len(results)} results written to {options['output']}"))
+        else:
+            self.stdout.write(json.dumps(report, indent=2))
@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from bookings.query_plans import BookingHotQueries, QueryPlan
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the hot Booking queries and fail if any of them stops using its index (SQLite or Postgres)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--showtime', type=int, default=0, help='Showtime id to plan against (plans rarely depend on it)')
+        parser.add_argument('--user', type=int, default=0, help='User id to plan against')
+        parser.add_argument('--plans', action='store_true', help='Print the full plan for every query')
+
+    def handle(self, *args, **options):
+
+        if not QueryPlan.supported():
+            raise CommandError(f'No plan parser for the {connection.vendor} backend')
+
+        failed = []
+        for name, (queryset, indexes) in BookingHotQueries.all(options['showtime'], options['user']).items():
+            result = QueryPlan.check(queryset, indexes)
+            if result['skipped']:
+                self.stdout.write(self.style.WARNING(
+                    f"⏭️ {name}: skipped, {connection.vendor} can't use partial index {' or '.join(result['expected'])}"
+                ))
+                continue
+            if result['ok']:
+                self.stdout.write(self.style.SUCCESS(f"✅ {name}: {', '.join(result['indexes'])}"))
+            else:
+                failed.append(name)
+                reason = 'full table scan' if result['full_scan'] else f"uses {', '.join(result['indexes']) or 'no index'}"
+                self.stdout.write(self.style.ERROR(f"❌ {name}: {reason}, expected {' or '.join(result['expected'])}"))
+            if options['plans'] or not result['ok']:
+                self.stdout.write(f"   {result['plan']}".replace('\n', '\n   '))
+
+        if failed:
+            raise CommandError(f"{len(failed)} hot queries not served by their index: {', '.join(failed)}")
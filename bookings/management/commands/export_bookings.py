@@ -0,0 +1,46 @@
+import sys
+from django.core.management.base import BaseCommand, CommandError
+from bookings.exports import ExportService
+
+class Command(BaseCommand):
+    help = 'Stream bookings or transactions to CSV/JSONL (optionally gzipped) with constant memory'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(ExportService.DATASETS))
+        parser.add_argument('--format', default='csv', choices=ExportService.FORMATS)
+        parser.add_argument('--gzip', action='store_true', help='Gzip the output')
+        parser.add_argument('--output', '-o', default=None, help='File path (default: stdout)')
+        parser.add_argument('--date-from', default=None, help='YYYY-MM-DD, inclusive')
+        parser.add_argument('--date-to', default=None, help='YYYY-MM-DD, inclusive')
+        parser.add_argument('--status', default=None)
+        parser.add_argument('--movie', type=int, default=None, help='Movie id')
+        parser.add_argument('--theater', type=int, default=None, help='Theater id')
+
+    def handle(self, *args, **options):
+
+        filters = {
+            'date_from': options['date_from'],
+            'date_to': options['date_to'],
+            'status': options['status'],
+            'movie_id': options['movie'],
+            'theater_id': options['theater'],
+        }
+        chunks = ExportService.stream(
+            options['dataset'], fmt=options['format'], compress=options['gzip'], filters=filters
+        )
+
+        if not options['output']:
+            if options['gzip'] and sys.stdout.isatty():
+                raise CommandError('Refusing to write gzip data to a terminal; use --output')
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
+            return
+
+        written = 0
+        with open(options['output'], 'wb') as handle:
+            for chunk in chunks:
+                handle.write(chunk)
+                written += len(chunk)
+
+        self.stderr.write(self.style.SUCCESS(f"✅ Exported {options['dataset']} to {options['output']} ({written} bytes)"))
@@ -0,0 +1,98 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from bookings.loadtest import FlashSaleLoadTest, SCENARIOS
+from bookings.models import Booking
+from bookings.seat_store import forget_showtime
+from bookings.utils import SeatManager
+from movies.theater_models import Showtime
+
+class Command(BaseCommand):
+    help = (
+        'Drive the booking funnel against a running local server with simulated users. '
+        'Run it with the same settings (database, cache) as the server.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument('--scenario', default='medium',
+                            help=f"Built-in scenario ({', '.join(SCENARIOS)}) or path to a JSON scenario file")
+        parser.add_argument('--showtime', type=int, help='Showtime id (default: scenario value or the next active showtime)')
+        parser.add_argument('--users', type=int)
+        parser.add_argument('--concurrency', type=int)
+        parser.add_argument('--hot-seats', type=int, help='Contention: users only pick from the first N seats')
+        parser.add_argument('--seed', type=int)
+        parser.add_argument('--reset', action='store_true',
+                            help="Delete earlier load-test bookings on the showtime before starting")
+        parser.add_argument('--output', help='Write the JSON report here')
+
+    def _showtime(self, showtime_id):
+
+        showtimes = Showtime.objects.filter(is_active=True)
+        if showtime_id:
+            showtime = showtimes.filter(id=showtime_id).first()
+        else:
+            showtime = showtimes.filter(date__gte=timezone.localdate()).order_by('date', 'start_time').first()
+        if showtime is None:
+            raise CommandError('No active showtime to load test; create one or pass --showtime')
+        return showtime
+
+    def handle(self, *args, **options):
+
+        try:
+            scenario = FlashSaleLoadTest.load_scenario(
+                options['scenario'],
+                showtime_id=options['showtime'],
+                users=options['users'],
+                concurrency=options['concurrency'],
+                hot_seats=options['hot_seats'],
+                seed=options['seed'],
+            )
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Invalid scenario: {e}")
+
+        showtime = self._showtime(scenario['showtime_id'])
+        if options['reset']:
+            deleted, _ = Booking.objects.filter(
+                showtime=showtime, user__username__startswith=FlashSaleLoadTest.USERNAME_PREFIX
+            ).delete()
+            forget_showtime(showtime.id)
+            self.stdout.write(f'🧹 Removed {deleted} rows from earlier load-test runs')
+
+        seat_map = [seat['seat_id'] for row in SeatManager.get_seat_layout(showtime.id) for seat in row if seat]
+        self.stdout.write(
+            f"🚀 {scenario['name']}: {scenario['users']} users, concurrency {scenario['concurrency']}, "
+            f"hot seats {scenario['hot_seats'] or 'all'} on showtime {showtime.id} ({len(seat_map)} seats)"
+        )
+
+        report = FlashSaleLoadTest(options['base_url'], scenario).run(showtime, seat_map)
+
+        throughput = report['throughput']
+        self.stdout.write(
+            f"⏱️  {report['elapsed_seconds']}s | {throughput['requests_per_second']} req/s | "
+            f"{throughput['funnels_per_second']} funnels/s | {throughput['confirmed_per_second']} confirmed/s"
+        )
+        self.stdout.write(f"📋 Outcomes: {report['outcomes']}")
+        for step, stats in report['steps'].items():
+            self.stdout.write(
+                f"   {step:<17} n={stats['requests']:<5} p50 {stats['p50_ms']:>8.1f}ms  "
+                f"p95 {stats['p95_ms']:>8.1f}ms  p99 {stats['p99_ms']:>8.1f}ms  {stats['statuses']}"
+            )
+        if report['server'] is not None:
+            self.stdout.write(f"🗄️  Server: {report['server']}")
+        else:
+            self.stdout.write(self.style.WARNING('⚠️ /metrics unreachable, no server-side DB/cache counts'))
+
+        if report['double_bookings']['count']:
+            self.stdout.write(self.style.ERROR(
+                f"❌ {report['double_bookings']['count']} seats in more than one CONFIRMED booking: "
+                f"{report['double_bookings']['seats']}"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS('✅ No double bookings'))
+
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(report, handle, indent=2, default=str)
+            self.stdout.write(f"📄 Report written to {options['output']}")
@@ -0,0 +1,20 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from bookings.rollups import SalesRollup
+
+class Command(BaseCommand):
+    help = 'Rebuild DailySalesRollup rows from confirmed bookings (backfill / reconciliation)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=None, help='Only rebuild the last N days (default: all time)')
+
+    def handle(self, *args, **options):
+        start_date = None
+        if options['days'] is not None:
+            start_date = timezone.localdate() - timedelta(days=options['days'])
+
+        count = SalesRollup.rebuild(start_date=start_date)
+
+        scope = f"last {options['days']} days" if start_date else 'all time'
+        self.stdout.write(self.style.SUCCESS(f'✅ Rebuilt {count} rollup rows ({scope})'))
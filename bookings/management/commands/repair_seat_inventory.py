@@ -0,0 +1,19 @@
+from datetime import date
+from django.core.management.base import BaseCommand
+from bookings.inventory import SeatInventory
+
+class Command(BaseCommand):
+    help = 'Recompute Showtime.available_seats from PENDING/CONFIRMED bookings and fix drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--all', action='store_true', help='Include past showtimes (default: today onwards)')
+        parser.add_argument('--dry-run', action='store_true', help='Only report how many showtimes drifted')
+
+    def handle(self, *args, **options):
+        drifted = SeatInventory.repair(
+            from_date=date.min if options['all'] else None,
+            dry_run=options['dry_run']
+        )
+
+        verb = 'would be repaired' if options['dry_run'] else 'repaired'
+        self.stdout.write(self.style.SUCCESS(f'✅ {drifted} showtimes {verb}'))
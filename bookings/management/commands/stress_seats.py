@@ -0,0 +1,122 @@
+import json
+import logging
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import override_settings
+from bookings.seat_store import BACKENDS
+from bookings.stress import SeatContentionStress
+from bookings.utils import SeatManager
+from moviebooking.redis_client import get_redis_connection, is_local
+
+class Command(BaseCommand):
+    help = (
+        'Fire concurrent hold/create/confirm attempts at overlapping seats of one showtime and check that no seat '
+        'is confirmed twice and no hold outlives its booking. Uses the configured database (SQLite WAL by default, '
+        'Postgres when DATABASE_URL is set) and cache.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--attempts', type=int, default=2000)
+        parser.add_argument('--processes', type=int, default=2)
+        parser.add_argument('--threads', type=int, default=8, help='Threads per process')
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--hot-seats', type=int, default=12, help='Every attempt picks from the first N seats')
+        parser.add_argument('--seats-per-attempt', default='1,3', help='min,max seats per attempt')
+        parser.add_argument('--confirm-ratio', type=float, default=0.8, help='Share of holds that go on to payment')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--backend', help='Seat engine to drive (legacy, locks, lua, db); defaults to SEAT_STORE')
+        parser.add_argument('--keep', action='store_true', help='Keep the stress showtime, bookings and users')
+        parser.add_argument('--allow-violations', action='store_true',
+                            help='Exit 0 even when invariants are broken (throughput runs)')
+        parser.add_argument('--output', help='Write the JSON report here')
+
+    def _database(self):
+
+        database = {'vendor': connection.vendor}
+        if connection.vendor == 'sqlite':
+            with connection.cursor() as cursor:
+                cursor.execute('PRAGMA journal_mode')
+                database['journal_mode'] = cursor.fetchone()[0]
+        return database
+
+    def handle(self, *args, **options):
+
+        try:
+            low, high = (int(value) for value in options['seats_per_attempt'].split(','))
+        except ValueError:
+            raise CommandError('--seats-per-attempt must look like 1,3')
+        if options['attempts'] < 1 or options['processes'] < 1 or options['threads'] < 1 or options['users'] < 1:
+            raise CommandError('--attempts, --processes, --threads and --users must be positive')
+        if options['processes'] > 1 and is_local(get_redis_connection()):
+            raise CommandError('The in-process Redis stand-in is not shared across processes; use --processes 1')
+
+        config = getattr(settings, 'SEAT_STORE', {})
+        backend = options['backend'] or config.get('BACKEND', 'legacy')
+        if backend not in BACKENDS:
+            raise CommandError(f"Unknown seat engine '{backend}', expected one of {', '.join(BACKENDS)}")
+        # Every showtime on one engine for the run; forked workers inherit the override
+        with override_settings(SEAT_STORE={**config, 'BACKEND': backend, 'CANDIDATE': None}):
+            self._stress(backend, options, low, high)
+
+    def _stress(self, backend, options, low, high):
+
+        showtime, user_ids = SeatContentionStress.prepare(options['users'])
+        seat_map = [seat['seat_id'] for row in SeatManager.get_seat_layout(showtime.id) for seat in row if seat]
+        hot_seats = seat_map[:options['hot_seats']] if options['hot_seats'] else seat_map
+        database = self._database()
+        self.stdout.write(
+            f"🚀 {options['attempts']} attempts, {options['processes']} processes × {options['threads']} threads, "
+            f"{len(hot_seats)} hot seats on showtime {showtime.id} ({database}, {backend} seat engine)"
+        )
+
+        stress = SeatContentionStress(
+            showtime.id, user_ids, hot_seats, seats_per_attempt=(low, high), confirm_ratio=options['confirm_ratio']
+        )
+        logging.disable(logging.INFO)
+        try:
+            report = stress.run(options['attempts'], options['processes'], options['threads'], options['seed'])
+        finally:
+            logging.disable(logging.NOTSET)
+            if not options['keep']:
+                SeatContentionStress.teardown(showtime, user_ids)
+
+        report['database'] = database
+        report['cache_backend'] = settings.CACHES['default']['BACKEND']
+        report['seat_store'] = backend
+        report['showtime_id'] = showtime.id
+
+        throughput = report['throughput']
+        self.stdout.write(
+            f"⏱️  {report['elapsed_seconds']}s | {throughput['attempts_per_second']} attempts/s | "
+            f"{throughput['confirmed_per_second']} confirmed/s | "
+            f"{throughput['conflicts_resolved_per_second']} resolved/s"
+        )
+        self.stdout.write(f"📋 Outcomes: {report['outcomes']}")
+        for name, stats in report['latency_ms'].items():
+            self.stdout.write(f"   {name:<12} n={stats['count']:<6} p50 {stats['p50']:>8.1f}ms  "
+                              f"p95 {stats['p95']:>8.1f}ms  p99 {stats['p99']:>8.1f}ms")
+
+        invariants = report['invariants']
+        if invariants['double_bookings']['count']:
+            self.stdout.write(self.style.ERROR(
+                f"❌ {invariants['double_bookings']['count']} seats in more than one CONFIRMED booking: "
+                f"{invariants['double_bookings']['seats']}"
+            ))
+        if invariants['orphan_holds']['count']:
+            self.stdout.write(self.style.ERROR(
+                f"❌ {invariants['orphan_holds']['count']} holds without a live booking: "
+                f"shared list {invariants['orphan_holds']['reserved_list']}, "
+                f"per user {invariants['orphan_holds']['user_reservations']}"
+            ))
+        if invariants['ok']:
+            self.stdout.write(self.style.SUCCESS('✅ No double bookings or orphaned holds'))
+
+        if options['output']:
+            with open(options['output'], 'w') as handle:
+                json.dump(report, handle, indent=2, default=str)
+            self.stdout.write(f"📄 Report written to {options['output']}")
+
+        if not invariants['ok'] and not options['allow_violations']:
+            raise CommandError('Seat invariants violated')
@@ -0,0 +1,9 @@
+from django.core.management.base import BaseCommand
+from bookings.occupancy import OccupancyAnalytics
+
+class Command(BaseCommand):
+    help = 'Build the occupancy snapshot ahead of the first dashboard read (run after deploys and cache flushes)'
+
+    def handle(self, *args, **options):
+        snapshot = OccupancyAnalytics.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"✅ Occupancy snapshot built for {len(snapshot['ids'])} showtimes"))
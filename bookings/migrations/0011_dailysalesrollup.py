@@ -0,0 +1,40 @@
+# Generated by Django 4.2 on 2026-10-19 02:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0009_review_feed_indexes'),
+        ('bookings', '0010_remove_booking_qr_code_remove_booking_qr_code_base64'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailySalesRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField()),
+                ('bookings', models.IntegerField(default=0)),
+                ('seats', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12)),
+                ('city', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='movies.city')),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='movies.movie')),
+                ('theater', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='daily_sales', to='movies.theater')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='dailysalesrollup',
+            index=models.Index(fields=['movie', 'date'], name='bookings_da_movie_i_f2c648_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dailysalesrollup',
+            index=models.Index(fields=['theater', 'date'], name='bookings_da_theater_507bae_idx'),
+        ),
+        migrations.AlterUniqueTogether(
+            name='dailysalesrollup',
+            unique_together={('date', 'movie', 'theater')},
+        ),
+    ]
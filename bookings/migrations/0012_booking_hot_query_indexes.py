@@ -0,0 +1,43 @@
+# Generated by Django 4.2 on 2026-10-19 03:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0011_dailysalesrollup'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='booking',
+            name='expires_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='booking',
+            name='status',
+            field=models.CharField(choices=[('PENDING', 'Pending Payment'), ('CONFIRMED', 'Confirmed'), ('CANCELLED', 'Cancelled'), ('EXPIRED', 'Expired'), ('FAILED', 'Failed')], default='PENDING', max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['showtime', 'status', 'expires_at'], name='booking_showtime_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['user', 'showtime', 'status'], name='booking_user_showtime_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['status', 'created_at', 'total_amount'], name='booking_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('status', 'CONFIRMED')), fields=['showtime'], name='booking_confirmed_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('status', 'PENDING')), fields=['expires_at'], name='booking_pending_expiry_idx'),
+        ),
+    ]
@@ -0,0 +1,77 @@
+# Generated by Django 4.2 on 2026-10-19 03:42
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0010_showtime_available_seats_counter'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('bookings', '0012_booking_hot_query_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingArchive',
+            fields=[
+                ('booking_number', models.CharField(editable=False, max_length=20, unique=True)),
+                ('seats', models.JSONField()),
+                ('total_seats', models.IntegerField(default=1)),
+                ('base_price', models.DecimalField(decimal_places=2, default=0.0, max_digits=8)),
+                ('convenience_fee', models.DecimalField(decimal_places=2, default=30.0, max_digits=8)),
+                ('tax_amount', models.DecimalField(decimal_places=2, default=0.0, max_digits=8)),
+                ('total_amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('status', models.CharField(choices=[('PENDING', 'Pending Payment'), ('CONFIRMED', 'Confirmed'), ('CANCELLED', 'Cancelled'), ('EXPIRED', 'Expired'), ('FAILED', 'Failed')], default='PENDING', max_length=20)),
+                ('payment_method', models.CharField(blank=True, max_length=50)),
+                ('payment_id', models.CharField(blank=True, db_index=True, max_length=100)),
+                ('razorpay_order_id', models.CharField(blank=True, db_index=True, max_length=100, null=True, unique=True)),
+                ('payment_initiated_at', models.DateTimeField(blank=True, null=True)),
+                ('payment_received_at', models.DateTimeField(blank=True, null=True)),
+                ('refund_notification_sent', models.BooleanField(default=False, help_text='Track if refund notification email was sent')),
+                ('confirmation_email_sent', models.BooleanField(default=False, help_text='Track if confirmation email was sent')),
+                ('failure_email_sent', models.BooleanField(default=False, help_text='Track if payment failure email was sent')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('confirmed_at', models.DateTimeField(blank=True, null=True)),
+                ('expires_at', models.DateTimeField(blank=True, null=True)),
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('showtime_date', models.DateField()),
+                ('archived_at', models.DateTimeField()),
+                ('showtime', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_bookings', to='movies.showtime')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_bookings', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+        migrations.CreateModel(
+            name='TransactionArchive',
+            fields=[
+                ('transaction_id', models.CharField(max_length=100, unique=True)),
+                ('amount', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('status', models.CharField(choices=[('INITIATED', 'Initiated'), ('SUCCESS', 'Success'), ('FAILED', 'Failed'), ('PENDING', 'Pending')], default='INITIATED', max_length=20)),
+                ('payment_gateway', models.CharField(default='RAZORPAY', max_length=50)),
+                ('gateway_response', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('booking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='transactions', to='bookings.bookingarchive')),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.AddIndex(
+            model_name='bookingarchive',
+            index=models.Index(fields=['user', 'created_at'], name='archive_user_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookingarchive',
+            index=models.Index(fields=['status', 'created_at', 'total_amount'], name='archive_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bookingarchive',
+            index=models.Index(fields=['showtime_date'], name='archive_showtime_date_idx'),
+        ),
+    ]
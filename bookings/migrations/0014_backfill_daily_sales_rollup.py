@@ -0,0 +1,56 @@
+# Generated manually: 0011 created DailySalesRollup empty, and the dashboard reads every total from it
+
+import logging
+
+from django.db import migrations
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+
+logger = logging.getLogger(__name__)
+
+
+def backfill_rollups(apps, schema_editor):
+    # Same aggregation as SalesRollup.rebuild(), against the historical models
+    DailySalesRollup = apps.get_model('bookings', 'DailySalesRollup')
+
+    fresh = {}
+    for name in ('Booking', 'BookingArchive'):
+        rows = apps.get_model('bookings', name).objects.filter(status='CONFIRMED').annotate(
+            day=TruncDate('created_at')
+        ).values(
+            'day',
+            'showtime__movie_id',
+            'showtime__screen__theater_id',
+            'showtime__screen__theater__city_id',
+        ).annotate(
+            booking_count=Count('id'),
+            seat_count=Sum('total_seats'),
+            revenue_total=Sum('total_amount'),
+        ).order_by()
+
+        for row in rows:
+            rollup = fresh.setdefault((row['day'], row['showtime__movie_id'], row['showtime__screen__theater_id']), DailySalesRollup(
+                date=row['day'],
+                movie_id=row['showtime__movie_id'],
+                theater_id=row['showtime__screen__theater_id'],
+                city_id=row['showtime__screen__theater__city_id'],
+            ))
+            rollup.bookings += row['booking_count']
+            rollup.seats += row['seat_count'] or 0
+            rollup.revenue += row['revenue_total'] or 0
+
+    DailySalesRollup.objects.all().delete()
+    DailySalesRollup.objects.bulk_create(fresh.values(), batch_size=1000)
+
+    logger.info(f"Backfilled {len(fresh)} daily sales rollup rows")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0013_booking_archive'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rollups, migrations.RunPython.noop),
+    ]
@@ -5,7 +5,7 @@ import uuid
 from django.utils import timezone
 from decimal import Decimal
 
-class Booking(models.Model):
+class BookingRecord(models.Model):
     BOOKING_STATUS=(
         ('PENDING', 'Pending Payment'),
         ('CONFIRMED', 'Confirmed'),
@@ -15,8 +15,6 @@ class Booking(models.Model):
     )
 
     booking_number=models.CharField(max_length=20, unique=True, editable=False)
-    user=models.ForeignKey(User,on_delete=models.CASCADE)
-    showtime=models.ForeignKey(Showtime,on_delete=models.CASCADE)
     seats=models.JSONField() 
     total_seats=models.IntegerField(default=1)
     
@@ -27,7 +25,7 @@ class Booking(models.Model):
     total_amount = models.DecimalField(max_digits=10, decimal_places=2)
     
 
-    status = models.CharField(max_length=20, choices=BOOKING_STATUS, default='PENDING', db_index=True)
+    status = models.CharField(max_length=20, choices=BOOKING_STATUS, default='PENDING')
     payment_method = models.CharField(max_length=50, blank=True)
     payment_id = models.CharField(max_length=100, blank=True, db_index=True)
     razorpay_order_id = models.CharField(max_length=100, blank=True, unique=True, db_index=True, null=True)
@@ -41,14 +39,46 @@ class Booking(models.Model):
     
     created_at = models.DateTimeField(auto_now_add=True)
     confirmed_at = models.DateTimeField(null=True, blank=True)
-    expires_at = models.DateTimeField(null=True, blank=True, db_index=True)
+    expires_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
-        ordering=['-created_at']
+        abstract = True
 
     def __str__(self):
         return f"{self.booking_number} - {self.user.username}"
 
+    def get_seats_display(self):
+
+        if isinstance(self.seats, list):
+            return ", ".join(self.seats)
+        return str(self.seats)
+
+    def get_formatted_total(self):
+        return f"₹{self.total_amount:.2f}"
+
+    def is_expired(self):
+
+        if self.status == 'PENDING' and self.expires_at:
+            return timezone.now() > self.expires_at
+        return False
+
+class Booking(BookingRecord):
+
+    user=models.ForeignKey(User,on_delete=models.CASCADE)
+    showtime=models.ForeignKey(Showtime,on_delete=models.CASCADE)
+
+    class Meta:
+        ordering=['-created_at']
+        # One per hot query (see bookings/query_plans.py); status and expires_at lead no other lookup,
+        # so their single-column indexes went with these
+        indexes = [
+            models.Index(fields=['showtime', 'status', 'expires_at'], name='booking_showtime_status_idx'),
+            models.Index(fields=['user', 'showtime', 'status'], name='booking_user_showtime_idx'),
+            models.Index(fields=['status', 'created_at', 'total_amount'], name='booking_status_created_idx'),
+            models.Index(fields=['showtime'], condition=models.Q(status='CONFIRMED'), name='booking_confirmed_idx'),
+            models.Index(fields=['expires_at'], condition=models.Q(status='PENDING'), name='booking_pending_expiry_idx'),
+        ]
+
     def save(self, *args, **kwargs): 
         if not self.booking_number:
             date_str=timezone.now().strftime('%Y%m%d')
@@ -68,22 +98,25 @@ class Booking(models.Model):
         
         super().save(*args, **kwargs)
 
-    def get_seats_display(self):
+class BookingArchive(BookingRecord):
 
-        if isinstance(self.seats, list):
-            return ", ".join(self.seats)
-        return str(self.seats)
-
-    def get_formatted_total(self):
-        return f"₹{self.total_amount:.2f}"
-
-    def is_expired(self):
+    # Finished bookings of past showtimes, moved out of Booking by bookings.archive.BookingArchiver.
+    # Rows keep their Booking id, so old links and exports still resolve.
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_bookings')
+    showtime = models.ForeignKey(Showtime, on_delete=models.CASCADE, related_name='archived_bookings')
+    showtime_date = models.DateField()
+    archived_at = models.DateTimeField()
 
-        if self.status == 'PENDING' and self.expires_at:
-            return timezone.now() > self.expires_at
-        return False
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['user', 'created_at'], name='archive_user_created_idx'),
+            models.Index(fields=['status', 'created_at', 'total_amount'], name='archive_status_created_idx'),
+            models.Index(fields=['showtime_date'], name='archive_showtime_date_idx'),
+        ]
 
-class Transaction(models.Model):
+class TransactionRecord(models.Model):
 
     TRANSACTION_STATUS = (
         ('INITIATED', 'Initiated'),
@@ -92,13 +125,45 @@ class Transaction(models.Model):
         ('PENDING', 'Pending'),
     )
     
-    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='transactions')
     transaction_id = models.CharField(max_length=100, unique=True)
     amount = models.DecimalField(max_digits=10, decimal_places=2)
     status = models.CharField(max_length=20, choices=TRANSACTION_STATUS, default='INITIATED')
     payment_gateway = models.CharField(max_length=50, default='RAZORPAY')
     gateway_response = models.JSONField(default=dict)  # Store gateway response
     created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        abstract = True
     
     def __str__(self):
-        return f"{self.transaction_id} - {self.status}"
\ No newline at end of file
+        return f"{self.transaction_id} - {self.status}"
+
+class Transaction(TransactionRecord):
+
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='transactions')
+
+class TransactionArchive(TransactionRecord):
+
+    id = models.BigIntegerField(primary_key=True)
+    booking = models.ForeignKey(BookingArchive, on_delete=models.CASCADE, related_name='transactions')
+
+class DailySalesRollup(models.Model):
+
+    date = models.DateField()  # Local date of Booking.created_at, same as the dashboard's created_at__date filters
+    movie = models.ForeignKey('movies.Movie', on_delete=models.CASCADE, related_name='daily_sales')
+    theater = models.ForeignKey('movies.Theater', on_delete=models.CASCADE, related_name='daily_sales')
+    city = models.ForeignKey('movies.City', on_delete=models.CASCADE, related_name='daily_sales')
+
+    bookings = models.IntegerField(default=0)
+    seats = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    class Meta:
+        unique_together = ('date', 'movie', 'theater')
+        indexes = [
+            models.Index(fields=['movie', 'date']),
+            models.Index(fields=['theater', 'date']),
+        ]
+
+    def __str__(self):
+        return f"{self.date} - movie {self.movie_id} @ theater {self.theater_id}: {self.bookings} bookings"
@@ -0,0 +1,217 @@
+import logging
+import time
+from datetime import timedelta
+
+import numpy as np
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q, Sum
+from django.utils import timezone
+from moviebooking.redis_client import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+class OccupancyAnalytics:
+
+    SNAPSHOT_KEY = 'occupancy_snapshot'
+    DIRTY_KEY = "moviebooking:v2:occupancy:dirty"
+    REBUILD_SECONDS = 3600  # Full rebuild at most hourly, so the window slides and lost marks heal
+    REBUILDING_KEY = 'occupancy_snapshot_rebuilding'
+    REBUILDING_TIMEOUT = 300
+
+    # Snapshot columns, one numpy array each, all aligned on 'ids'
+    COLUMNS = ('ids', 'screen', 'theater', 'weekday', 'hour', 'capacity', 'sold', 'held')
+
+    @staticmethod
+    def window_start():
+        return timezone.localdate() - timedelta(days=getattr(settings, 'OCCUPANCY_WINDOW_DAYS', 90))
+
+    @staticmethod
+    def mark_dirty(showtime_id):
+
+        try:
+            get_redis_connection("default").sadd(OccupancyAnalytics.DIRTY_KEY, showtime_id)
+        except Exception as e:
+            logger.error(f"Occupancy dirty mark failed for showtime {showtime_id}: {e}")
+
+    @staticmethod
+    def _schedule(showtime_ids=None):
+
+        from movies.theater_models import Showtime
+
+        showtimes = Showtime.objects.filter(date__gte=OccupancyAnalytics.window_start())
+        if showtime_ids is not None:
+            showtimes = showtimes.filter(id__in=showtime_ids)
+
+        return list(showtimes.order_by().values_list(
+            'id', 'screen_id', 'screen__theater_id', 'date', 'start_time', 'screen__total_seats'
+        ))
+
+    @staticmethod
+    def _seat_counts(showtime_ids=None):
+
+        # One GROUP BY for every showtime in scope; held = unexpired PENDING bookings
+        from .models import Booking
+
+        bookings = Booking.objects.filter(showtime__date__gte=OccupancyAnalytics.window_start())
+        if showtime_ids is not None:
+            bookings = bookings.filter(showtime_id__in=showtime_ids)
+
+        rows = bookings.order_by().values('showtime_id').annotate(
+            sold=Sum('total_seats', filter=Q(status='CONFIRMED')),
+            held=Sum('total_seats', filter=Q(status='PENDING', expires_at__gt=timezone.now())),
+        )
+        return {row['showtime_id']: (row['sold'] or 0, row['held'] or 0) for row in rows}
+
+    @staticmethod
+    def _columns(schedule, counts):
+
+        n = len(schedule)
+        columns = {name: np.zeros(n, dtype=np.int64) for name in OccupancyAnalytics.COLUMNS}
+        for i, (showtime_id, screen_id, theater_id, day, start, capacity) in enumerate(schedule):
+            sold, held = counts.get(showtime_id, (0, 0))
+            columns['ids'][i] = showtime_id
+            columns['screen'][i] = screen_id
+            columns['theater'][i] = theater_id
+            columns['weekday'][i] = day.weekday()
+            columns['hour'][i] = start.hour
+            columns['capacity'][i] = capacity or 0
+            columns['sold'][i] = sold
+            columns['held'][i] = held
+        return columns
+
+    @staticmethod
+    def rebuild():
+
+        schedule = OccupancyAnalytics._schedule()
+        snapshot = OccupancyAnalytics._columns(schedule, OccupancyAnalytics._seat_counts())
+        snapshot['built_at'] = time.time()
+        cache.set(OccupancyAnalytics.SNAPSHOT_KEY, snapshot, timeout=None)
+        cache.delete(OccupancyAnalytics.REBUILDING_KEY)
+
+        logger.info(f"Occupancy snapshot rebuilt for {len(schedule)} showtimes")
+        return snapshot
+
+    @staticmethod
+    def refresh():
+
+        snapshot = cache.get(OccupancyAnalytics.SNAPSHOT_KEY)
+        if snapshot is None or time.time() - snapshot['built_at'] > OccupancyAnalytics.REBUILD_SECONDS:
+            get_redis_connection("default").delete(OccupancyAnalytics.DIRTY_KEY)
+            OccupancyAnalytics.rebuild()
+            return None
+
+        # Drain the dirty set atomically, then recompute only those showtimes
+        redis_conn = get_redis_connection("default")
+        pipe = redis_conn.pipeline(transaction=True)
+        pipe.smembers(OccupancyAnalytics.DIRTY_KEY)
+        pipe.delete(OccupancyAnalytics.DIRTY_KEY)
+        members, _ = pipe.execute()
+        dirty = sorted(int(member) for member in members)
+        if not dirty:
+            return 0
+
+        fresh = OccupancyAnalytics._columns(
+            OccupancyAnalytics._schedule(dirty), OccupancyAnalytics._seat_counts(dirty)
+        )
+
+        # Drop the stale rows (including deleted or out-of-window showtimes) and append the fresh ones
+        keep = ~np.isin(snapshot['ids'], dirty)
+        for name in OccupancyAnalytics.COLUMNS:
+            snapshot[name] = np.concatenate([snapshot[name][keep], fresh[name]])
+        cache.set(OccupancyAnalytics.SNAPSHOT_KEY, snapshot, timeout=None)
+
+        return len(dirty)
+
+    @staticmethod
+    def snapshot():
+
+        snapshot = cache.get(OccupancyAnalytics.SNAPSHOT_KEY)
+        if snapshot is not None:
+            return snapshot
+
+        # Cold (evicted, or a deploy that skipped warm_occupancy): one worker rebuilds it while readers get an
+        # empty snapshot with built_at=None. Without Celery nobody else would, so the request builds it itself.
+        from .tasks import refresh_occupancy
+        if not hasattr(refresh_occupancy, 'delay'):
+            return OccupancyAnalytics.rebuild()
+
+        if cache.add(OccupancyAnalytics.REBUILDING_KEY, 1, timeout=OccupancyAnalytics.REBUILDING_TIMEOUT):
+            try:
+                refresh_occupancy.delay()
+            except Exception as e:
+                logger.error(f"Occupancy rebuild could not be queued: {e}")
+                cache.delete(OccupancyAnalytics.REBUILDING_KEY)
+        return {**OccupancyAnalytics._columns([], {}), 'built_at': None}
+
+    @staticmethod
+    def _rates(sold, capacity):
+        return np.round(np.divide(sold, capacity, out=np.zeros(len(sold)), where=capacity > 0), 4)
+
+    @staticmethod
+    def _group(keys, sold, held, capacity):
+
+        # Per-group sums via one sort (np.unique) and np.bincount, no Python loop over showtimes
+        labels, inverse = np.unique(keys, return_inverse=True)
+        totals = [np.bincount(inverse, weights=column, minlength=len(labels)) for column in (sold, held, capacity)]
+        rates = OccupancyAnalytics._rates(totals[0], totals[2])
+
+        return [
+            {'id': int(label), 'sold': int(s), 'held': int(h), 'capacity': int(c), 'fill_rate': float(r)}
+            for label, s, h, c, r in zip(labels, *totals, rates)
+        ]
+
+    @staticmethod
+    def report(theater_id=None, screen_id=None):
+
+        snapshot = OccupancyAnalytics.snapshot()
+        mask = np.ones(len(snapshot['ids']), dtype=bool)
+        if theater_id:
+            mask &= snapshot['theater'] == int(theater_id)
+        if screen_id:
+            mask &= snapshot['screen'] == int(screen_id)
+
+        column = {name: snapshot[name][mask] for name in OccupancyAnalytics.COLUMNS}
+        sold, held, capacity = column['sold'], column['held'], column['capacity']
+        free = np.maximum(capacity - sold - held, 0)
+
+        # weekday x hour heatmaps: np.add.at scatters every showtime into its cell in one call
+        heat_sold = np.zeros((7, 24))
+        heat_capacity = np.zeros((7, 24))
+        np.add.at(heat_sold, (column['weekday'], column['hour']), sold)
+        np.add.at(heat_capacity, (column['weekday'], column['hour']), capacity)
+        heat_rate = np.round(np.divide(heat_sold, heat_capacity, out=np.zeros((7, 24)), where=heat_capacity > 0), 4)
+
+        return {
+            'totals': {
+                'showtimes': int(mask.sum()),
+                'sold': int(sold.sum()),
+                'held': int(held.sum()),
+                'free': int(free.sum()),
+                'capacity': int(capacity.sum()),
+                'fill_rate': round(float(sold.sum() / capacity.sum()), 4) if capacity.sum() else 0.0,
+            },
+            'by_screen': OccupancyAnalytics._group(column['screen'], sold, held, capacity),
+            'by_theater': OccupancyAnalytics._group(column['theater'], sold, held, capacity),
+            'by_weekday': OccupancyAnalytics._group(column['weekday'], sold, held, capacity),
+            'by_hour': OccupancyAnalytics._group(column['hour'], sold, held, capacity),
+            'heatmap': {
+                'weekdays': ['Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun'],
+                'hours': list(range(24)),
+                'fill_rate': heat_rate.tolist(),
+                'sold': heat_sold.astype(int).tolist(),
+            },
+            'built_at': snapshot['built_at'],
+        }
+
+    @staticmethod
+    def showtime(showtime_id):
+
+        snapshot = OccupancyAnalytics.snapshot()
+        index = np.flatnonzero(snapshot['ids'] == int(showtime_id))
+        if not len(index):
+            return None
+
+        i = index[0]
+        capacity, sold, held = (int(snapshot[name][i]) for name in ('capacity', 'sold', 'held'))
+        return {'sold': sold, 'held': held, 'free': max(capacity - sold - held, 0), 'capacity': capacity}
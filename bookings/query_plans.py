@@ -0,0 +1,102 @@
+import re
+
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import Booking
+from .seat_store import SeatStore
+
+class QueryPlan:
+
+    # Plan lines naming the index a table is read through, per vendor
+    INDEX_PATTERNS = {
+        'sqlite': re.compile(r'USING (?:COVERING )?INDEX (\w+)'),
+        'postgresql': re.compile(r'(?:Index (?:Only )?Scan using|Bitmap Index Scan on) (\w+)'),
+    }
+    FULL_SCAN_PATTERNS = {
+        'sqlite': r'SCAN {table}\b(?! USING)',
+        'postgresql': r'Seq Scan on {table}\b',
+    }
+    # SQLite only matches a partial index against literal WHERE terms and Django binds every value,
+    # so it can never use these; a query that only a partial index serves is skipped there, not checked
+    PARTIAL_INDEXES = {'booking_confirmed_idx', 'booking_pending_expiry_idx'}
+
+    @staticmethod
+    def supported():
+        return connection.vendor in QueryPlan.INDEX_PATTERNS
+
+    @staticmethod
+    def explain(queryset):
+
+        if connection.vendor == 'postgresql':
+            # Small tables are planned as sequential scans whatever the indexes; ask whether an index *can* serve it
+            with transaction.atomic(), connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                return queryset.explain()
+        return queryset.explain()
+
+    @staticmethod
+    def expected(indexes):
+
+        if connection.vendor == 'sqlite':
+            return set(indexes) - QueryPlan.PARTIAL_INDEXES
+        return set(indexes)
+
+    @staticmethod
+    def check(queryset, indexes):
+
+        expected = QueryPlan.expected(indexes)
+        if not expected:
+            return {'plan': '', 'indexes': [], 'expected': sorted(indexes), 'full_scan': False, 'skipped': True, 'ok': True}
+
+        plan = QueryPlan.explain(queryset)
+        used = set(QueryPlan.INDEX_PATTERNS[connection.vendor].findall(plan))
+        table = re.escape(queryset.model._meta.db_table)
+        full_scan = bool(re.search(QueryPlan.FULL_SCAN_PATTERNS[connection.vendor].format(table=table), plan))
+        return {
+            'plan': plan,
+            'indexes': sorted(used),
+            'expected': sorted(expected),
+            'full_scan': full_scan,
+            'skipped': False,
+            'ok': bool(used & expected) and not full_scan,
+        }
+
+class BookingHotQueries:
+
+    # The Booking lookups behind the seat map, booking, expiry sweep and dashboard, each with the index meant to serve it.
+    # Keep these in step with the call sites when either side changes.
+    @staticmethod
+    def all(showtime_id=0, user_id=0):
+
+        now = timezone.now()
+        return {
+            'seat_map_confirmed': (  # SeatStore.booked_seats
+                SeatStore.confirmed_bookings(showtime_id).values_list('seats', flat=True),
+                {'booking_confirmed_idx', 'booking_showtime_status_idx'},
+            ),
+            'seat_recheck': (  # SeatStore.is_seat_still_available_for_user
+                SeatStore.confirmed_bookings(showtime_id).exclude(user_id=user_id),
+                {'booking_confirmed_idx', 'booking_showtime_status_idx'},
+            ),
+            'seat_map_pending': (  # SeatStore.pending_bookings
+                SeatStore.pending_bookings(showtime_id).values_list('seats', flat=True),
+                {'booking_showtime_status_idx'},
+            ),
+            'user_pending_for_showtime': (  # create_booking, BookingService.force_expire_booking
+                Booking.objects.filter(user_id=user_id, showtime_id=showtime_id, status='PENDING').order_by(),
+                {'booking_user_showtime_idx'},
+            ),
+            'expiry_sweep': (  # cleanup_expired_bookings and the Celery expiry tasks
+                Booking.objects.filter(status='PENDING', expires_at__lt=now),
+                {'booking_pending_expiry_idx'},
+            ),
+            'dashboard_revenue': (  # AnalyticsEngine time series
+                Booking.objects.filter(status='CONFIRMED', created_at__date__gte=now.date())
+                .annotate(day=TruncDate('created_at')).values('day')
+                .annotate(revenue=Sum('total_amount'), bookings=Count('id')).order_by('day'),
+                {'booking_status_created_idx'},
+            ),
+        }
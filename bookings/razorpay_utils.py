@@ -1,11 +1,14 @@
 
 import time
+import uuid
 import razorpay
 from django.conf import settings
 import logging
 from urllib3.util.retry import Retry
 from requests.adapters import HTTPAdapter
 
+from moviebooking.metrics import GATEWAY_LATENCY
+
 logger = logging.getLogger(__name__)
 
 class RazorpayClient:
@@ -60,7 +63,7 @@ class RazorpayClient:
         
         if self.is_mock:
 
-            order_id = f"order_mock_{int(time.time())}"
+            order_id = f"order_mock_{int(time.time())}_{uuid.uuid4().hex[:8]}"  # Unique under concurrent checkouts
             logger.info(f"🎭 [RAZORPAY_ORDER_MOCK] Mock order created: {order_id}")
             return {
                 'success': True,
@@ -79,7 +82,8 @@ class RazorpayClient:
             try:
                 logger.info(f"💳 [RAZORPAY_ORDER] Attempt {retry_count + 1}/{max_retries}")
 
-                order = self.client.order.create(data=data)
+                with GATEWAY_LATENCY.time(operation='create_order'):
+                    order = self.client.order.create(data=data)
                 logger.info(
                     f"✅ [RAZORPAY_ORDER] Order created successfully: {order['id']} | "
                     f"Amount: {order['amount']} | Status: {order.get('status', 'created')}"
@@ -135,15 +139,14 @@ class RazorpayClient:
             return True
         except Exception as e:
 
-            import logging
-            logger = logging.getLogger(__name__)
             logger.warning(f"Payment signature verification failed: {str(e)}")
             return False
     
     def fetch_payment(self, payment_id):
 
         try:
-            payment = self.client.payment.fetch(payment_id)
+            with GATEWAY_LATENCY.time(operation='fetch_payment'):
+                payment = self.client.payment.fetch(payment_id)
             return payment
         except:
             return None
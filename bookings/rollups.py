@@ -0,0 +1,108 @@
+import logging
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .archive import BookingArchiver
+from .models import Booking, BookingArchive, DailySalesRollup
+
+logger = logging.getLogger(__name__)
+
+class SalesRollup:
+
+    @staticmethod
+    def _invalidate_reports():
+
+        # Cached admin reports are built from the rollup; drop them once the change is visible
+        from custom_admin.analytics import AnalyticsEngine
+        transaction.on_commit(AnalyticsEngine.invalidate)
+
+    @staticmethod
+    def apply(booking, sign):
+
+        # sign=+1 when a booking becomes CONFIRMED, -1 when it leaves CONFIRMED
+        from movies.theater_models import Showtime
+
+        row = Showtime.objects.filter(id=booking.showtime_id).values_list(
+            'movie_id', 'screen__theater_id', 'screen__theater__city_id'
+        ).first()
+        if not row:
+            return
+
+        movie_id, theater_id, city_id = row
+        day = timezone.localdate(booking.created_at) if booking.created_at else timezone.localdate()
+
+        with transaction.atomic():
+            rollup, _ = DailySalesRollup.objects.get_or_create(
+                date=day,
+                movie_id=movie_id,
+                theater_id=theater_id,
+                defaults={'city_id': city_id},
+            )
+            DailySalesRollup.objects.filter(pk=rollup.pk).update(
+                bookings=F('bookings') + sign,
+                seats=F('seats') + sign * (booking.total_seats or 0),
+                revenue=F('revenue') + sign * (booking.total_amount or 0),
+            )
+
+        SalesRollup._invalidate_reports()
+
+    @staticmethod
+    def rebuild(start_date=None, end_date=None):
+
+        # Recompute rollups for a date range (all time when no bounds) from Booking in one GROUP BY,
+        # plus one over the archive when the range reaches back into it
+        rollups = DailySalesRollup.objects.all()
+        if start_date:
+            rollups = rollups.filter(date__gte=start_date)
+        if end_date:
+            rollups = rollups.filter(date__lte=end_date)
+
+        with transaction.atomic():
+            # Read and swap under one lock, so an apply() racing the rebuild is neither lost nor counted twice:
+            # it either commits before the GROUP BY sees its booking or waits and lands on the fresh rows.
+            # On SQLite the DELETE going first takes the database write lock.
+            if connection.vendor == 'postgresql':
+                with connection.cursor() as cursor:
+                    cursor.execute(f'LOCK TABLE {connection.ops.quote_name(DailySalesRollup._meta.db_table)} IN SHARE ROW EXCLUSIVE MODE')
+            rollups.delete()
+
+            models = [Booking, BookingArchive] if BookingArchiver.reaches(start_date) else [Booking]
+            fresh = {}
+            for model in models:
+                bookings = model.objects.filter(status='CONFIRMED')
+                if start_date:
+                    bookings = bookings.filter(created_at__date__gte=start_date)
+                if end_date:
+                    bookings = bookings.filter(created_at__date__lte=end_date)
+
+                rows = bookings.annotate(day=TruncDate('created_at')).values(
+                    'day',
+                    'showtime__movie_id',
+                    'showtime__screen__theater_id',
+                    'showtime__screen__theater__city_id',
+                ).annotate(
+                    booking_count=Count('id'),
+                    seat_count=Sum('total_seats'),
+                    revenue_total=Sum('total_amount'),
+                ).order_by()
+
+                for row in rows:
+                    rollup = fresh.setdefault((row['day'], row['showtime__movie_id'], row['showtime__screen__theater_id']), DailySalesRollup(
+                        date=row['day'],
+                        movie_id=row['showtime__movie_id'],
+                        theater_id=row['showtime__screen__theater_id'],
+                        city_id=row['showtime__screen__theater__city_id'],
+                    ))
+                    rollup.bookings += row['booking_count']
+                    rollup.seats += row['seat_count'] or 0
+                    rollup.revenue += row['revenue_total'] or 0
+            fresh = list(fresh.values())
+            DailySalesRollup.objects.bulk_create(fresh, batch_size=1000)
+
+        SalesRollup._invalidate_reports()
+
+        logger.info(f"Rebuilt {len(fresh)} daily sales rollup rows")
+        return len(fresh)
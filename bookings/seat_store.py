@@ -0,0 +1,791 @@
+import logging
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.db import connection, transaction
+from django.db.models import F
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from moviebooking.l1cache import L1Cache
+from moviebooking.redis_client import Script, get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+class CacheKeyBuilder:
+
+    # One key scheme for every seat engine, so invalidation always hits the keys the views read
+    VERSION = "v2"
+    PREFIX = "moviebooking"
+
+    @staticmethod
+    def seat_layout(showtime_id):
+        return f"{CacheKeyBuilder.PREFIX}:{CacheKeyBuilder.VERSION}:seat_layout:{showtime_id}"
+
+    @staticmethod
+    def available_seats(showtime_id):
+        return f"{CacheKeyBuilder.PREFIX}:{CacheKeyBuilder.VERSION}:available_seats:{showtime_id}"
+
+    @staticmethod
+    def reserved_seats(showtime_id):
+        return f"{CacheKeyBuilder.PREFIX}:{CacheKeyBuilder.VERSION}:reserved_seats:{showtime_id}"
+
+    @staticmethod
+    def seat_lock(showtime_id, seat_id):
+        return f"{CacheKeyBuilder.PREFIX}:{CacheKeyBuilder.VERSION}:seat_lock:{showtime_id}:{seat_id}"
+
+    @staticmethod
+    def user_reservation(showtime_id, user_id):
+        return f"{CacheKeyBuilder.PREFIX}:{CacheKeyBuilder.VERSION}:user_res:{showtime_id}:{user_id}"
+
+    @staticmethod
+    def seat_holds(showtime_id):
+        return f"{CacheKeyBuilder.PREFIX}:{CacheKeyBuilder.VERSION}:seat_holds:{showtime_id}"
+
+    @staticmethod
+    def sold_seats(showtime_id):
+        return f"{CacheKeyBuilder.PREFIX}:{CacheKeyBuilder.VERSION}:sold_seats:{showtime_id}"
+
+class CacheTimeouts:
+
+    SEAT_LAYOUT = 3600  # 1 hour (static data)
+    AVAILABLE_SEATS = 300  # 5 minutes (dynamic)
+    RESERVED_SEATS = 720  # 12 minutes
+    SEAT_LOCK = 720  # 12 minutes
+
+class CacheInvalidator:
+
+
+    @staticmethod
+    def invalidate_showtime_cache(showtime_id):
+
+        # Derived state only: holds belong to live bookings and are released through the seat store
+        try:
+            cache.delete_many([
+                CacheKeyBuilder.seat_layout(showtime_id),
+                CacheKeyBuilder.available_seats(showtime_id),
+            ])
+            L1Cache.invalidate('seat_layout', CacheKeyBuilder.seat_layout(showtime_id))
+            get_seat_store(showtime_id).invalidate(showtime_id)
+            logger.info(f"Cache invalidated for showtime {showtime_id}")
+        except Exception as e:
+            logger.error(f"Cache invalidation error for showtime {showtime_id}: {e}")
+
+    @staticmethod
+    def invalidate_on_booking_confirmed(booking):
+
+        CacheInvalidator.invalidate_showtime_cache(booking.showtime.id)
+        logger.info(f"Cache invalidated for confirmed booking {booking.booking_number}")
+
+    @staticmethod
+    def invalidate_on_booking_expired(booking):
+
+        CacheInvalidator.invalidate_showtime_cache(booking.showtime.id)
+        logger.info(f"Cache invalidated for expired booking {booking.booking_number}")
+
+class SeatStore:
+
+    # The contract every seat engine implements. Holds cover the gap between picking seats and the PENDING
+    # booking row; the payment-time check against CONFIRMED bookings stays the final word for all of them.
+    name = None
+
+    def __init__(self, options=None):
+        self.options = options or {}
+        self.hold_timeout = self.options.get('HOLD_TIMEOUT', settings.SEAT_RESERVATION_TIMEOUT)
+
+    @staticmethod
+    def generate_seat_layout(rows=10, cols=12):
+
+        layout = []
+        for row in range(rows):
+            row_letter = chr(65 + row)  # A, B, C...
+            row_seats = []
+            for col in range(1, cols + 1):
+                if col == 7:
+                    row_seats.append(None)  # Walkway
+                else:
+                    seat_number = col if col < 7 else col - 1
+                    row_seats.append({
+                        'seat_id': f"{row_letter}{seat_number}",
+                        'row': row_letter,
+                        'number': seat_number,
+                        'available': True,
+                        'type': 'standard',
+                        'price': 200.00,
+                    })
+            layout.append(row_seats)
+        return layout
+
+    def get_seat_layout(self, showtime_id):
+
+        # Static per showtime, so served from the in-process L1 and shared: callers must not mutate it
+        return L1Cache.get(
+            'seat_layout', CacheKeyBuilder.seat_layout(showtime_id),
+            loader=self.generate_seat_layout, timeout=CacheTimeouts.SEAT_LAYOUT
+        )
+
+    def seat_ids(self, showtime_id):
+        return [seat['seat_id'] for row in self.get_seat_layout(showtime_id) for seat in row if seat and seat['available']]
+
+    @staticmethod
+    def confirmed_bookings(showtime_id):
+
+        # Unordered: the default -created_at ordering steers SQLite onto the dashboard's status/created_at index
+        from .models import Booking
+        return Booking.objects.filter(showtime_id=showtime_id, status='CONFIRMED').order_by()
+
+    @staticmethod
+    def booked_seats(showtime_id, pending=False):
+
+        seats = set()
+        for seats_list in SeatStore.confirmed_bookings(showtime_id).values_list('seats', flat=True):
+            seats.update(seats_list)
+        if pending:
+            seats.update(seat for seats_list in SeatStore.pending_bookings(showtime_id).values_list('seats', flat=True)
+                         for seat in seats_list)
+        return seats
+
+    @staticmethod
+    def pending_bookings(showtime_id):
+
+        from .models import Booking
+        return Booking.objects.filter(showtime_id=showtime_id, status='PENDING', expires_at__gt=timezone.now()).order_by()
+
+    def get_available_seats(self, showtime_id):
+
+        cache_key = CacheKeyBuilder.available_seats(showtime_id)
+        available_seats = cache.get(cache_key)
+
+        if available_seats is None:
+            booked = self.booked_seats(showtime_id)
+            available_seats = [seat_id for seat_id in self.seat_ids(showtime_id) if seat_id not in booked]
+            cache.set(cache_key, available_seats, timeout=CacheTimeouts.AVAILABLE_SEATS)
+
+        return available_seats
+
+    def get_reserved_seats(self, showtime_id):
+        return list(self.holds(showtime_id))
+
+    def reserve_seats(self, showtime_id, seat_ids, user_id):
+        raise NotImplementedError
+
+    def release_seats(self, showtime_id, seat_ids=None, user_id=None):
+        raise NotImplementedError
+
+    def confirm_seats(self, showtime_id, seat_ids, user_id=None):
+        raise NotImplementedError
+
+    def holds(self, showtime_id):
+
+        # seat -> holder's user id (None when the engine does not record it), held by this engine's own state
+        raise NotImplementedError
+
+    def user_holds(self, showtime_id, user_id):
+        return sorted(seat for seat, holder in self.holds(showtime_id).items() if holder == user_id)
+
+    def hold_ttl(self, showtime_id, user_id):
+
+        # Seconds left on the user's hold, 0 when there is none
+        raise NotImplementedError
+
+    def invalidate(self, showtime_id):
+        pass
+
+    def lock_showtime(self, showtime_id):
+
+        # Engines that hold seats atomically in Redis need no database lock
+        pass
+
+    def is_seat_still_available_for_user(self, showtime_id, seat_ids, user_id):
+
+        confirmed_bookings = self.confirmed_bookings(showtime_id).exclude(user_id=user_id) # Don't check against the user's own current booking attempt
+
+        for booking in confirmed_bookings:
+            for seat in seat_ids:
+                if seat in booking.seats:
+                    return False
+
+        return True
+
+class CacheListSeatStore(SeatStore):
+
+    # The original engine: one hold list per showtime in the cache (read-modify-write, not atomic),
+    # plus a per-user reservation entry. Availability and holds also consult live PENDING bookings.
+    name = 'legacy'
+    AVAILABLE_TIMEOUT = 30
+
+    def get_available_seats(self, showtime_id):
+
+        cache_key = CacheKeyBuilder.available_seats(showtime_id)
+        available_seats = cache.get(cache_key)
+
+        if available_seats is None:
+            taken = self.booked_seats(showtime_id, pending=True)
+            available_seats = [seat_id for seat_id in self.seat_ids(showtime_id) if seat_id not in taken]
+            cache.set(cache_key, available_seats, timeout=self.AVAILABLE_TIMEOUT)
+
+        return available_seats
+
+    def get_reserved_seats(self, showtime_id):
+
+        redis_reserved = cache.get(CacheKeyBuilder.reserved_seats(showtime_id)) or []
+        db_reserved = []
+        for seats_list in self.pending_bookings(showtime_id).values_list('seats', flat=True):
+            db_reserved.extend(seats_list)
+        return list(set(redis_reserved + db_reserved))
+
+    def reserve_seats(self, showtime_id, seat_ids, user_id):
+
+        available_seats = self.get_available_seats(showtime_id)
+        reserved_seats = self.get_reserved_seats(showtime_id)
+
+        user_reservation_key = CacheKeyBuilder.user_reservation(showtime_id, user_id)
+        existing_user_res = cache.get(user_reservation_key)
+        my_seats = existing_user_res.get('seat_ids', []) if existing_user_res else []
+
+        for seat_id in seat_ids:
+            if seat_id not in available_seats or (seat_id in reserved_seats and seat_id not in my_seats):
+                return False
+
+        new_reserved = list(set(reserved_seats + seat_ids))
+        cache.set(CacheKeyBuilder.reserved_seats(showtime_id), new_reserved, timeout=self.hold_timeout)
+        cache.set(user_reservation_key, {
+            'seat_ids': seat_ids,
+            'reserved_at': time.time()
+        }, timeout=self.hold_timeout)
+        return True
+
+    def release_seats(self, showtime_id, seat_ids=None, user_id=None):
+
+        cache_key = CacheKeyBuilder.reserved_seats(showtime_id)
+        reserved_seats = cache.get(cache_key) or []
+
+        if user_id:
+            cache.delete(CacheKeyBuilder.user_reservation(showtime_id, user_id))
+
+        if seat_ids:
+            for sid in seat_ids:
+                if sid in reserved_seats:
+                    reserved_seats.remove(sid)
+
+        cache.set(cache_key, reserved_seats, timeout=self.hold_timeout)
+        return True
+
+    def confirm_seats(self, showtime_id, seat_ids, user_id=None):
+
+        self.release_seats(showtime_id, seat_ids, user_id=user_id)
+
+        cache_key = CacheKeyBuilder.available_seats(showtime_id)
+        available_seats = cache.get(cache_key)
+
+        if available_seats is not None:
+            for sid in seat_ids:
+                if sid in available_seats:
+                    available_seats.remove(sid)
+            cache.set(cache_key, available_seats, timeout=3600)
+
+        return True
+
+    def holds(self, showtime_id):
+
+        # The shared list does not say who holds what
+        return {seat: None for seat in cache.get(CacheKeyBuilder.reserved_seats(showtime_id)) or []}
+
+    def user_holds(self, showtime_id, user_id):
+        return sorted((cache.get(CacheKeyBuilder.user_reservation(showtime_id, user_id)) or {}).get('seat_ids', []))
+
+    def hold_ttl(self, showtime_id, user_id):
+        return cache.ttl(CacheKeyBuilder.user_reservation(showtime_id, user_id)) or 0
+
+# KEYS: seat lock keys; ARGV: owner, ttl. Refuses if any seat is held by someone else.
+LOCK_SEATS = Script("""
+for _, key in ipairs(KEYS) do
+    local holder = redis.call('GET', key)
+    if holder and holder ~= ARGV[1] then
+        return 0
+    end
+end
+for _, key in ipairs(KEYS) do
+    redis.call('SET', key, ARGV[1], 'EX', ARGV[2])
+end
+return 1
+""")
+
+@LOCK_SEATS.local
+def _lock_seats(redis_conn, keys, args):
+
+    owner, ttl = str(args[0]).encode('utf-8'), int(args[1])
+    if any(redis_conn.get(key) not in (None, owner) for key in keys):
+        return 0
+    for key in keys:
+        redis_conn.set(key, owner, ex=ttl)
+    return 1
+
+# KEYS: seat lock keys; ARGV: owner. Deletes only the locks this owner holds.
+UNLOCK_SEATS = Script("""
+local released = 0
+for _, key in ipairs(KEYS) do
+    if redis.call('GET', key) == ARGV[1] then
+        released = released + redis.call('DEL', key)
+    end
+end
+return released
+""")
+
+@UNLOCK_SEATS.local
+def _unlock_seats(redis_conn, keys, args):
+
+    owner = str(args[0]).encode('utf-8')
+    return sum(redis_conn.delete(key) for key in keys if redis_conn.get(key) == owner)
+
+class SeatLockStore(SeatStore):
+
+    # One Redis key per seat holding the owner's user id, taken and dropped for a whole selection in one script
+    name = 'locks'
+
+    def lock_seats(self, showtime_id, seat_ids, user_id, timeout=None):
+
+        # All-or-nothing in one round trip: either every seat is (re)locked for this user or none is
+        try:
+            keys = [CacheKeyBuilder.seat_lock(showtime_id, seat_id) for seat_id in seat_ids]
+            acquired = bool(LOCK_SEATS(get_redis_connection("default"), keys=keys, args=[user_id, timeout or self.hold_timeout]))
+            logger.debug(f"Seat locks {'acquired' if acquired else 'refused'}: {seat_ids} for user {user_id}")
+            return acquired
+        except Exception as e:
+            logger.error(f"Error acquiring seat locks for {seat_ids}: {e}")
+            return False
+
+    def unlock_seats(self, showtime_id, seat_ids, user_id=None):
+
+        # One round trip: owner-checked script for a user, a single multi-key DEL otherwise
+        if not seat_ids:
+            return 0
+        try:
+            redis_conn = get_redis_connection("default")
+            keys = [CacheKeyBuilder.seat_lock(showtime_id, seat_id) for seat_id in seat_ids]
+            if user_id:
+                released = UNLOCK_SEATS(redis_conn, keys=keys, args=[user_id])
+            else:
+                released = redis_conn.delete(*keys)
+            logger.debug(f"Seats unlocked: {released} of {len(seat_ids)} for showtime {showtime_id}")
+            return released
+        except Exception as e:
+            logger.error(f"Error unlocking seats {seat_ids}: {e}")
+            return 0
+
+    def reserve_seats(self, showtime_id, seat_ids, user_id):
+
+        available_seats = self.get_available_seats(showtime_id)
+        for seat_id in seat_ids:
+            if seat_id not in available_seats:
+                logger.warning(f"Seat {seat_id} not available for showtime {showtime_id}")
+                return False
+
+        if not self.lock_seats(showtime_id, seat_ids, user_id):
+            logger.warning(f"Failed to lock seats {seat_ids} for user {user_id}")
+            return False
+        return True
+
+    def release_seats(self, showtime_id, seat_ids=None, user_id=None):
+
+        try:
+            if not seat_ids and user_id:
+                seat_ids = self.user_holds(showtime_id, user_id)
+            self.unlock_seats(showtime_id, seat_ids, user_id)
+            return True
+        except Exception as e:
+            logger.error(f"Error releasing seats: {e}")
+            return False
+
+    def confirm_seats(self, showtime_id, seat_ids, user_id=None):
+
+        self.unlock_seats(showtime_id, seat_ids)
+        cache.delete(CacheKeyBuilder.available_seats(showtime_id))
+        return True
+
+    def holds(self, showtime_id):
+
+        # One MGET over the whole seat map
+        seat_ids = self.seat_ids(showtime_id)
+        holders = get_redis_connection("default").mget([CacheKeyBuilder.seat_lock(showtime_id, seat) for seat in seat_ids])
+        return {seat: int(holder) for seat, holder in zip(seat_ids, holders) if holder is not None}
+
+    def hold_ttl(self, showtime_id, user_id):
+
+        seats = self.user_holds(showtime_id, user_id)
+        if not seats:
+            return 0
+        return max(get_redis_connection("default").ttl(CacheKeyBuilder.seat_lock(showtime_id, seats[0])), 0)
+
+# KEYS: holds hash, sold bitmap; ARGV: owner, now (ms), ttl (ms), then seat, bitmap offset pairs.
+# Holds are 'owner:deadline_ms' hash fields, so one hash per showtime carries every hold and its expiry.
+HOLD_SEATS = Script("""
+if redis.call('EXISTS', KEYS[2]) == 0 then
+    return -1
+end
+local now = tonumber(ARGV[2])
+for i = 4, #ARGV, 2 do
+    if redis.call('GETBIT', KEYS[2], ARGV[i + 1]) == 1 then
+        return 0
+    end
+    local hold = redis.call('HGET', KEYS[1], ARGV[i])
+    if hold then
+        local sep = string.find(hold, ':', 1, true)
+        if string.sub(hold, 1, sep - 1) ~= ARGV[1] and tonumber(string.sub(hold, sep + 1)) > now then
+            return 0
+        end
+    end
+end
+local value = ARGV[1] .. ':' .. (now + tonumber(ARGV[3]))
+for i = 4, #ARGV, 2 do
+    redis.call('HSET', KEYS[1], ARGV[i], value)
+end
+if redis.call('PTTL', KEYS[1]) < tonumber(ARGV[3]) then
+    redis.call('PEXPIRE', KEYS[1], ARGV[3])
+end
+return 1
+""")
+
+def _parse_hold(hold):
+
+    owner, deadline = hold.decode('utf-8').split(':')
+    return int(owner), int(deadline)
+
+@HOLD_SEATS.local
+def _hold_seats(redis_conn, keys, args):
+
+    holds_key, sold_key = keys
+    owner, now, ttl = int(args[0]), int(args[1]), int(args[2])
+    if not redis_conn.exists(sold_key):
+        return -1
+    pairs = list(zip(args[3::2], args[4::2]))
+    for seat, offset in pairs:
+        if redis_conn.getbit(sold_key, int(offset)):
+            return 0
+        hold = redis_conn.hget(holds_key, seat)
+        if hold is not None:
+            holder, deadline = _parse_hold(hold)
+            if holder != owner and deadline > now:
+                return 0
+    redis_conn.hset(holds_key, mapping={seat: f"{owner}:{now + ttl}" for seat, _ in pairs})
+    if redis_conn.pttl(holds_key) < ttl:
+        redis_conn.pexpire(holds_key, ttl)
+    return 1
+
+# KEYS: holds hash; ARGV: owner ('' for anyone), then seats (none: every seat the owner holds).
+DROP_HOLDS = Script("""
+local seats = {}
+if #ARGV > 1 then
+    for i = 2, #ARGV do
+        seats[#seats + 1] = ARGV[i]
+    end
+elseif ARGV[1] ~= '' then
+    local fields = redis.call('HKEYS', KEYS[1])
+    for i = 1, #fields do
+        seats[#seats + 1] = fields[i]
+    end
+end
+local released = 0
+for _, seat in ipairs(seats) do
+    local hold = redis.call('HGET', KEYS[1], seat)
+    if hold and (ARGV[1] == '' or string.sub(hold, 1, string.find(hold, ':', 1, true) - 1) == ARGV[1]) then
+        released = released + redis.call('HDEL', KEYS[1], seat)
+    end
+end
+return released
+""")
+
+@DROP_HOLDS.local
+def _drop_holds(redis_conn, keys, args):
+
+    holds_key = keys[0]
+    owner = str(args[0])
+    seats = args[1:] if len(args) > 1 else (list(redis_conn.hgetall(holds_key)) if owner else [])
+    released = 0
+    for seat in seats:
+        hold = redis_conn.hget(holds_key, seat)
+        if hold is not None and (not owner or str(_parse_hold(hold)[0]) == owner):
+            released += redis_conn.hdel(holds_key, seat)
+    return released
+
+# KEYS: holds hash, sold bitmap; ARGV: seat, bitmap offset pairs. A missing bitmap is rebuilt from the database.
+SELL_SEATS = Script("""
+local sold = redis.call('EXISTS', KEYS[2]) == 1
+for i = 1, #ARGV, 2 do
+    redis.call('HDEL', KEYS[1], ARGV[i])
+    if sold then
+        redis.call('SETBIT', KEYS[2], ARGV[i + 1], 1)
+    end
+end
+return 1
+""")
+
+@SELL_SEATS.local
+def _sell_seats(redis_conn, keys, args):
+
+    holds_key, sold_key = keys
+    sold = redis_conn.exists(sold_key)
+    for seat, offset in zip(args[0::2], args[1::2]):
+        redis_conn.hdel(holds_key, seat)
+        if sold:
+            redis_conn.setbit(sold_key, int(offset), 1)
+    return 1
+
+# KEYS: holds hash, sold bitmap; ARGV: bitmap ttl, bitmap, then seat, hold pairs. Never overwrites newer state.
+SEED_SEATS = Script("""
+if redis.call('SET', KEYS[2], ARGV[2], 'EX', ARGV[1], 'NX') then
+    for i = 3, #ARGV, 2 do
+        redis.call('HSETNX', KEYS[1], ARGV[i], ARGV[i + 1])
+    end
+    return 1
+end
+return 0
+""")
+
+@SEED_SEATS.local
+def _seed_seats(redis_conn, keys, args):
+
+    holds_key, sold_key = keys
+    if not redis_conn.set(sold_key, args[1], ex=int(args[0]), nx=True):
+        return 0
+    for seat, hold in zip(args[2::2], args[3::2]):
+        if redis_conn.hget(holds_key, seat) is None:
+            redis_conn.hset(holds_key, seat, hold)
+    return 1
+
+class ScriptedSeatStore(SeatStore):
+
+    # Everything for a showtime in two Redis keys: a hash of holds with their deadlines and a bitmap of sold
+    # seats (bit = position in the seat map). Reads are one round trip, writes one script; the database is only
+    # read to rebuild the bitmap when it is missing (first use, invalidation or expiry).
+    name = 'lua'
+    SOLD_TIMEOUT = CacheTimeouts.AVAILABLE_SEATS
+
+    def offsets(self, showtime_id):
+        return {seat_id: offset for offset, seat_id in enumerate(self.seat_ids(showtime_id))}
+
+    @staticmethod
+    def now_ms():
+        return int(time.time() * 1000)
+
+    def seed(self, showtime_id):
+
+        # Sold seats from CONFIRMED bookings, holds from live PENDING ones (covers showtimes moved onto this engine)
+        offsets = self.offsets(showtime_id)
+        bitmap = bytearray(len(offsets) // 8 + 1)
+        for seat in self.booked_seats(showtime_id):
+            if seat in offsets:
+                bitmap[offsets[seat] // 8] |= 1 << (7 - offsets[seat] % 8)
+        args = [self.SOLD_TIMEOUT, bytes(bitmap)]
+        for user_id, seats, expires_at in self.pending_bookings(showtime_id).values_list('user_id', 'seats', 'expires_at'):
+            for seat in seats:
+                args += [seat, f"{user_id}:{int(expires_at.timestamp() * 1000)}"]
+        SEED_SEATS(
+            get_redis_connection("default"),
+            keys=[CacheKeyBuilder.seat_holds(showtime_id), CacheKeyBuilder.sold_seats(showtime_id)], args=args
+        )
+
+    def snapshot(self, showtime_id):
+
+        redis_conn = get_redis_connection("default")
+        for _ in range(2):
+            pipe = redis_conn.pipeline(transaction=False)
+            pipe.get(CacheKeyBuilder.sold_seats(showtime_id))
+            pipe.hgetall(CacheKeyBuilder.seat_holds(showtime_id))
+            sold, holds = pipe.execute()
+            if sold is not None:
+                break
+            self.seed(showtime_id)
+        now = self.now_ms()
+        live = {}
+        for seat, hold in holds.items():
+            holder, deadline = _parse_hold(hold)
+            if deadline > now:
+                live[seat.decode('utf-8')] = holder
+        return sold or b'', live
+
+    def get_available_seats(self, showtime_id):
+
+        sold, holds = self.snapshot(showtime_id)
+        return [
+            seat_id for offset, seat_id in enumerate(self.seat_ids(showtime_id))
+            if seat_id not in holds and not (offset // 8 < len(sold) and sold[offset // 8] >> (7 - offset % 8) & 1)
+        ]
+
+    def reserve_seats(self, showtime_id, seat_ids, user_id):
+
+        offsets = self.offsets(showtime_id)
+        if any(seat_id not in offsets for seat_id in seat_ids):
+            return False
+        args = [user_id, 0, self.hold_timeout * 1000]
+        for seat_id in seat_ids:
+            args += [seat_id, offsets[seat_id]]
+        keys = [CacheKeyBuilder.seat_holds(showtime_id), CacheKeyBuilder.sold_seats(showtime_id)]
+        try:
+            redis_conn = get_redis_connection("default")
+            for _ in range(2):
+                args[1] = self.now_ms()
+                result = HOLD_SEATS(redis_conn, keys=keys, args=args)
+                if result != -1:
+                    return result == 1
+                self.seed(showtime_id)
+        except Exception as e:
+            logger.error(f"Error holding seats {seat_ids} for user {user_id}: {e}")
+        return False
+
+    def release_seats(self, showtime_id, seat_ids=None, user_id=None):
+
+        if not seat_ids and not user_id:
+            return True
+        try:
+            DROP_HOLDS(
+                get_redis_connection("default"),
+                keys=[CacheKeyBuilder.seat_holds(showtime_id)], args=[user_id or ''] + list(seat_ids or [])
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Error releasing seats: {e}")
+            return False
+
+    def confirm_seats(self, showtime_id, seat_ids, user_id=None):
+
+        offsets = self.offsets(showtime_id)
+        args = []
+        for seat_id in seat_ids:
+            if seat_id in offsets:
+                args += [seat_id, offsets[seat_id]]
+        try:
+            SELL_SEATS(
+                get_redis_connection("default"),
+                keys=[CacheKeyBuilder.seat_holds(showtime_id), CacheKeyBuilder.sold_seats(showtime_id)], args=args
+            )
+            return True
+        except Exception as e:
+            logger.error(f"Error confirming seats: {e}")
+            return False
+
+    def holds(self, showtime_id):
+        return self.snapshot(showtime_id)[1]
+
+    def hold_ttl(self, showtime_id, user_id):
+
+        deadlines = []
+        for hold in get_redis_connection("default").hgetall(CacheKeyBuilder.seat_holds(showtime_id)).values():
+            holder, deadline = _parse_hold(hold)
+            if holder == user_id:
+                deadlines.append(deadline)
+        return max((max(deadlines, default=0) - self.now_ms()) // 1000, 0)
+
+    def invalidate(self, showtime_id):
+
+        # Sold seats come back when a confirmed booking is cancelled; rebuild the bitmap on next use
+        get_redis_connection("default").delete(CacheKeyBuilder.sold_seats(showtime_id))
+
+class DatabaseSeatStore(SeatStore):
+
+    # No cache at all: the PENDING booking row is the hold. For SQLite development and as a baseline.
+    name = 'db'
+
+    def get_seat_layout(self, showtime_id):
+        return self.generate_seat_layout()
+
+    def get_available_seats(self, showtime_id):
+
+        taken = self.booked_seats(showtime_id, pending=True)
+        return [seat_id for seat_id in self.seat_ids(showtime_id) if seat_id not in taken]
+
+    def lock_showtime(self, showtime_id):
+
+        from movies.theater_models import Showtime
+
+        # Serialises reservations for the showtime until the caller's transaction (which inserts the booking) ends.
+        # SQLite has no row locks: a no-op UPDATE takes its database write lock instead.
+        showtimes = Showtime.objects.filter(pk=showtime_id)
+        if connection.features.has_select_for_update:
+            list(showtimes.select_for_update().values_list('pk', flat=True))
+        else:
+            showtimes.update(id=F('id'))
+
+    def reserve_seats(self, showtime_id, seat_ids, user_id):
+
+        # Outside a transaction the lock only covers the check; callers that insert the booking wrap both
+        with transaction.atomic():
+            self.lock_showtime(showtime_id)
+            taken = self.booked_seats(showtime_id)
+            for seats in self.pending_bookings(showtime_id).exclude(user_id=user_id).values_list('seats', flat=True):
+                taken.update(seats)
+        seat_map = set(self.seat_ids(showtime_id))
+        return all(seat_id in seat_map and seat_id not in taken for seat_id in seat_ids)
+
+    def release_seats(self, showtime_id, seat_ids=None, user_id=None):
+        return True
+
+    def confirm_seats(self, showtime_id, seat_ids, user_id=None):
+        return True
+
+    def holds(self, showtime_id):
+        return {
+            seat: user_id
+            for user_id, seats in self.pending_bookings(showtime_id).values_list('user_id', 'seats')
+            for seat in seats
+        }
+
+    def hold_ttl(self, showtime_id, user_id):
+
+        expires_at = self.pending_bookings(showtime_id).filter(user_id=user_id).order_by('-expires_at').values_list(
+            'expires_at', flat=True
+        ).first()
+        return max(int((expires_at - timezone.now()).total_seconds()), 0) if expires_at else 0
+
+BACKENDS = {
+    'legacy': 'bookings.seat_store.CacheListSeatStore',
+    'locks': 'bookings.seat_store.SeatLockStore',
+    'lua': 'bookings.seat_store.ScriptedSeatStore',
+    'db': 'bookings.seat_store.DatabaseSeatStore',
+}
+
+_stores = {}
+
+def load_seat_store(name, options=None):
+
+    # A backend name from BACKENDS or a dotted path to a SeatStore subclass
+    return import_string(BACKENDS.get(name, name))(options)
+
+def get_seat_store(showtime_id=None):
+
+    # The A/B split is by showtime, never by user: everyone booking a showtime must go through the same engine
+    config = getattr(settings, 'SEAT_STORE', {})
+    name = config.get('BACKEND', 'legacy')
+    if config.get('CANDIDATE') and showtime_id is not None and int(showtime_id) % 100 < config.get('CANDIDATE_PERCENT', 0):
+        name = config['CANDIDATE']
+    store = _stores.get(name)
+    if store is None:
+        store = _stores[name] = load_seat_store(name, config.get('OPTIONS'))
+    return store
+
+def forget_showtime(showtime_id, user_ids=(), seat_ids=None):
+
+    # Drop whatever any engine keeps for a showtime (benchmarks, stress runs, tests)
+    if seat_ids is None:
+        seat_ids = SeatStore().seat_ids(showtime_id)
+    cache.delete_many(
+        [CacheKeyBuilder.seat_layout(showtime_id), CacheKeyBuilder.available_seats(showtime_id),
+         CacheKeyBuilder.reserved_seats(showtime_id)] +
+        [CacheKeyBuilder.user_reservation(showtime_id, user_id) for user_id in user_ids]
+    )
+    L1Cache.invalidate('seat_layout', CacheKeyBuilder.seat_layout(showtime_id))
+    try:
+        get_redis_connection("default").delete(
+            CacheKeyBuilder.seat_holds(showtime_id), CacheKeyBuilder.sold_seats(showtime_id),
+            *[CacheKeyBuilder.seat_lock(showtime_id, seat_id) for seat_id in seat_ids]
+        )
+    except NotImplementedError:
+        pass
+
+@receiver(setting_changed)
+def _reset_seat_stores(setting, **kwargs):
+    if setting == 'SEAT_STORE':
+        _stores.clear()
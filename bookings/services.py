@@ -145,7 +145,7 @@ class BookingService:
             booking.save()
             
 
-            SeatManager.confirm_seats(booking.showtime.id, booking.seats)
+            SeatManager.confirm_seats(booking.showtime.id, booking.seats, user_id=booking.user_id)
             
 
             from .email_utils import send_booking_confirmation_email
@@ -215,7 +215,7 @@ class BookingService:
                 user=booking.user,
                 showtime=booking.showtime,
                 status='PENDING'
-            ).exclude(id=booking.id)
+            ).exclude(id=booking.id).order_by()
             
             if other_pending.exists():
                 logger.warning(f"Found {other_pending.count()} other PENDING bookings for user {booking.user.id} - expiring them too")
@@ -236,16 +236,14 @@ class BookingService:
             logger.info(f"SeatManager.release_seats returned: {released}")
             
 
-            from django.core.cache import cache
-            cache_key = f"reserved_seats_{booking.showtime.id}"
-            reserved_after = cache.get(cache_key) or []
-            still_locked = [seat for seat in booking.seats if seat in reserved_after]
+            holds_after = SeatManager.holds(booking.showtime.id)
+            still_locked = [seat for seat in booking.seats if seat in holds_after and holds_after[seat] in (None, booking.user.id)]
             
             if still_locked:
                 logger.error(f"SEATS STILL LOCKED AFTER RELEASE: {still_locked}")
 
-                cache.delete(cache_key)
-                logger.info(f"Force deleted reserved_seats cache key")
+                SeatManager.release_seats(booking.showtime.id, still_locked)
+                logger.info(f"Force released {len(still_locked)} held seats")
             else:
                 logger.info(f"All seats successfully released for booking {booking.booking_number}")
             
@@ -0,0 +1,76 @@
+import logging
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from bookings.models import Booking
+from movies.theater_models import Showtime
+from moviebooking.metrics import BOOKINGS_CREATED, BOOKING_RELEASES
+
+logger = logging.getLogger(__name__)
+
+@receiver(post_init, sender=Booking)
+def remember_booking_status(sender, instance, **kwargs):
+    instance._status_at_load = instance.status
+
+def mark_showtime_dirty(showtime_id):
+    from bookings.occupancy import OccupancyAnalytics
+    transaction.on_commit(lambda: OccupancyAnalytics.mark_dirty(showtime_id))
+
+@receiver(post_save, sender=Booking)
+def track_booking_confirmation(sender, instance, created, **kwargs):
+    previous_status = None if created else instance._status_at_load
+    instance._status_at_load = instance.status
+
+    if previous_status != instance.status:
+        from bookings.inventory import SeatInventory
+        SeatInventory.adjust(
+            instance.showtime_id,
+            SeatInventory.delta(previous_status, instance.status, instance.total_seats or 0)
+        )
+        mark_showtime_dirty(instance.showtime_id)
+
+    if created:
+        BOOKINGS_CREATED.inc()
+    elif previous_status == 'PENDING' and instance.status in ('EXPIRED', 'FAILED', 'CANCELLED'):
+        BOOKING_RELEASES.inc(status=instance.status)
+
+    was_confirmed = previous_status == 'CONFIRMED'
+    is_confirmed = instance.status == 'CONFIRMED'
+    if was_confirmed == is_confirmed:
+        return
+
+    from bookings.rollups import SalesRollup
+    SalesRollup.apply(instance, 1 if is_confirmed else -1)
+
+    if not is_confirmed:
+        return
+
+    showtime_id = instance.showtime_id
+
+    def record():
+        from movies.trending import TrendingTracker
+
+        row = Showtime.objects.filter(id=showtime_id).values_list(
+            'movie_id', 'screen__theater__city_id'
+        ).first()
+        if row:
+            TrendingTracker.record_booking(movie_id=row[0], city_id=row[1])
+
+    transaction.on_commit(record)
+
+@receiver(post_delete, sender=Booking)
+def untrack_deleted_booking(sender, instance, **kwargs):
+    from bookings.inventory import SeatInventory
+    SeatInventory.adjust(
+        instance.showtime_id,
+        SeatInventory.delta(instance._status_at_load, None, instance.total_seats or 0)
+    )
+    mark_showtime_dirty(instance.showtime_id)
+    if instance._status_at_load == 'CONFIRMED':
+        from bookings.rollups import SalesRollup
+        SalesRollup.apply(instance, -1)
+
+@receiver(post_save, sender=Showtime)
+@receiver(post_delete, sender=Showtime)
+def track_schedule_change(sender, instance, **kwargs):
+    mark_showtime_dirty(instance.id)
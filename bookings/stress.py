@@ -0,0 +1,242 @@
+import logging
+import math
+import multiprocessing
+import random
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.db import connection, connections, transaction
+from django.utils import timezone
+
+from .models import Booking
+from .seat_store import forget_showtime
+from .services import BookingService
+from .utils import SeatManager
+
+logger = logging.getLogger(__name__)
+
+class SeatInvariants:
+
+    @staticmethod
+    def double_bookings(showtime_id):
+
+        # seat -> ids of every CONFIRMED booking holding it, for seats held more than once
+        owners = defaultdict(list)
+        for booking_id, seats in Booking.objects.filter(
+            showtime_id=showtime_id, status='CONFIRMED'
+        ).values_list('id', 'seats'):
+            for seat in seats:
+                owners[seat].append(booking_id)
+        return {seat: ids for seat, ids in owners.items() if len(ids) > 1}
+
+    @staticmethod
+    def orphan_holds(showtime_id, user_ids=()):
+
+        # Holds are only legitimate while a live PENDING booking owns the seat
+        live = defaultdict(set)
+        for user_id, seats in Booking.objects.filter(
+            showtime_id=showtime_id, status='PENDING', expires_at__gt=timezone.now()
+        ).values_list('user_id', 'seats'):
+            live[user_id].update(seats)
+        all_live = set().union(*live.values())
+
+        # Asked through the engine serving the showtime, whatever its key layout
+        shared = sorted(set(SeatManager.holds(showtime_id)) - all_live)
+        per_user = {}
+        for user_id in user_ids:
+            stale = sorted(set(SeatManager.user_holds(showtime_id, user_id)) - live[user_id])
+            if stale:
+                per_user[user_id] = stale
+        return {'reserved_list': shared, 'user_reservations': per_user}
+
+    @staticmethod
+    def check(showtime_id, user_ids=()):
+
+        doubles = SeatInvariants.double_bookings(showtime_id)
+        orphans = SeatInvariants.orphan_holds(showtime_id, user_ids)
+        return {
+            'double_bookings': {'count': len(doubles), 'seats': doubles},
+            'orphan_holds': {
+                'count': len(orphans['reserved_list']) + sum(len(seats) for seats in orphans['user_reservations'].values()),
+                **orphans,
+            },
+            'ok': not doubles and not orphans['reserved_list'] and not orphans['user_reservations'],
+        }
+
+class SeatContentionStress:
+
+    USERNAME_PREFIX = 'stress-'
+
+    def __init__(self, showtime_id, user_ids, hot_seats, seats_per_attempt=(1, 3), confirm_ratio=0.8):
+        self.showtime_id = showtime_id
+        self.user_ids = list(user_ids)
+        self.hot_seats = list(hot_seats)
+        self.seats_per_attempt = seats_per_attempt
+        self.confirm_ratio = confirm_ratio
+
+    @staticmethod
+    def prepare(users):
+
+        from movies.models import Movie
+        from movies.theater_models import City, Theater, Screen, Showtime
+
+        # Committed fixtures: worker processes only see what the parent has committed
+        run = int(time.time() * 1000)
+        with transaction.atomic():
+            city = City.objects.create(name=f'Stress City {run}')
+            theater = Theater.objects.create(name=f'Stress Theater {run}', city=city, address='-')
+            screen = Screen.objects.create(theater=theater, name='Stress Screen')
+            movie = Movie.objects.create(
+                title=f'Stress Movie {run}', description='-',
+                release_date=timezone.now().date(), duration=120
+            )
+            showtime = Showtime.objects.create(
+                movie=movie, screen=screen, date=timezone.now().date() + timedelta(days=1),
+                start_time='14:00', end_time='16:00'
+            )
+            user_ids = []
+            for i in range(users):
+                user, _ = User.objects.get_or_create(username=f'{SeatContentionStress.USERNAME_PREFIX}{i}')
+                user_ids.append(user.id)
+        return showtime, user_ids
+
+    @staticmethod
+    def teardown(showtime, user_ids):
+
+        theater = showtime.screen.theater
+        forget_showtime(showtime.id, user_ids)
+        movie = showtime.movie
+        showtime.delete()
+        movie.delete()
+        theater.city.delete()
+        User.objects.filter(id__in=user_ids).delete()
+
+    def confirm(self, booking):
+
+        # Same checks and locking as the payment_success view
+        if not SeatManager.is_seat_still_available_for_user(self.showtime_id, booking.seats, booking.user_id):
+            booking.status = 'FAILED'
+            booking.save()
+            SeatManager.release_seats(self.showtime_id, booking.seats, user_id=booking.user_id)
+            return 'confirm_conflict'
+
+        with transaction.atomic():
+            queryset = Booking.objects.select_for_update() if connection.vendor != 'sqlite' else Booking.objects
+            booking = queryset.get(id=booking.id)
+            if booking.status != 'PENDING':
+                return 'confirm_conflict'
+            booking.status = 'CONFIRMED'
+            booking.payment_id = f'pay_stress_{booking.id}'
+            booking.payment_method = 'RAZORPAY'
+            booking.payment_received_at = booking.confirmed_at = timezone.now()
+            booking.save()
+
+        SeatManager.confirm_seats(self.showtime_id, booking.seats, user_id=booking.user_id)
+        return 'confirmed'
+
+    def attempt(self, user, showtime, rng, timings):
+
+        low, high = self.seats_per_attempt
+        seats = rng.sample(self.hot_seats, min(rng.randint(low, high), len(self.hot_seats)))
+
+        started = time.perf_counter()
+        booking, created, _ = BookingService.create_booking_with_seats(user, showtime, seats)
+        timings['hold_create'].append((time.perf_counter() - started) * 1000)
+        if not created:
+            return 'hold_conflict'
+
+        if rng.random() >= self.confirm_ratio:
+            BookingService.cancel_booking(booking, reason='Stress test abandon')
+            return 'abandoned'
+
+        started = time.perf_counter()
+        outcome = self.confirm(booking)
+        timings['confirm'].append((time.perf_counter() - started) * 1000)
+        return outcome
+
+    def _thread(self, attempts, seed, showtime, users):
+
+        rng = random.Random(seed)
+        outcomes = Counter()
+        timings = defaultdict(list)
+        try:
+            for _ in range(attempts):
+                try:
+                    outcomes[self.attempt(users[rng.choice(self.user_ids)], showtime, rng, timings)] += 1
+                except Exception as e:
+                    outcomes['error'] += 1
+                    logger.error(f"Stress attempt failed: {e}")
+        finally:
+            connection.close()
+        return outcomes, dict(timings)
+
+    def run_worker(self, attempts, threads, seed):
+
+        from movies.theater_models import Showtime
+
+        # Loaded once per worker and only read by its threads
+        showtime = Showtime.objects.get(id=self.showtime_id)
+        users = {user.id: user for user in User.objects.filter(id__in=self.user_ids)}
+
+        shares = [attempts // threads + (1 if i < attempts % threads else 0) for i in range(threads)]
+        outcomes = Counter()
+        timings = defaultdict(list)
+        with ThreadPoolExecutor(max_workers=threads) as pool:
+            for thread_outcomes, thread_timings in pool.map(
+                self._thread, shares, [seed * 1000 + i for i in range(threads)], [showtime] * threads, [users] * threads
+            ):
+                outcomes.update(thread_outcomes)
+                for name, samples in thread_timings.items():
+                    timings[name].extend(samples)
+        return outcomes, dict(timings)
+
+    def run(self, attempts, processes=1, threads=4, seed=0):
+
+        started = time.perf_counter()
+        if processes <= 1:
+            results = [self.run_worker(attempts, threads, seed)]
+        else:
+            # Forked children must not share the parent's DB socket
+            connections.close_all()
+            shares = [attempts // processes + (1 if i < attempts % processes else 0) for i in range(processes)]
+            with multiprocessing.get_context('fork').Pool(processes) as pool:
+                results = pool.starmap(_process_worker, [
+                    (self, share, threads, seed + i + 1) for i, share in enumerate(shares)
+                ])
+        elapsed = time.perf_counter() - started
+
+        outcomes = Counter()
+        timings = defaultdict(list)
+        for worker_outcomes, worker_timings in results:
+            outcomes.update(worker_outcomes)
+            for name, samples in worker_timings.items():
+                timings[name].extend(samples)
+
+        resolved = outcomes['confirmed'] + outcomes['hold_conflict'] + outcomes['confirm_conflict']
+        return {
+            'attempts': attempts,
+            'processes': processes,
+            'threads': threads,
+            'elapsed_seconds': round(elapsed, 3),
+            'outcomes': dict(outcomes),
+            'throughput': {
+                'attempts_per_second': round(attempts / elapsed, 2) if elapsed else 0,
+                'confirmed_per_second': round(outcomes['confirmed'] / elapsed, 2) if elapsed else 0,
+                'conflicts_resolved_per_second': round(resolved / elapsed, 2) if elapsed else 0,
+            },
+            'latency_ms': {name: _summary(samples) for name, samples in timings.items() if samples},
+            'invariants': SeatInvariants.check(self.showtime_id, self.user_ids),
+        }
+
+def _summary(samples):
+
+    samples = sorted(samples)
+    rank = lambda pct: samples[max(math.ceil(pct / 100 * len(samples)) - 1, 0)]
+    return {'count': len(samples), 'p50': round(rank(50), 2), 'p95': round(rank(95), 2), 'p99': round(rank(99), 2)}
+
+def _process_worker(stress, attempts, threads, seed):
+    connections.close_all()
+    return stress.run_worker(attempts, threads, seed)
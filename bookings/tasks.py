@@ -68,16 +68,37 @@ def send_showtime_reminders():
 @shared_task
 def cleanup_old_data():
 
-    from .models import Booking
-    from datetime import date
-    
+    from .archive import BookingArchiver
 
-    old_date = date.today() - timedelta(days=30)
-    old_bookings = Booking.objects.filter(
-        showtime__date__lt=old_date
-    )
-    
-    count = old_bookings.count()
+    result = BookingArchiver.run()
 
-    
-    return f"Found {count} old bookings to archive"
\ No newline at end of file
+    return f"Archived {result['bookings']} bookings for showtimes before {result['cutoff']}"
+
+@shared_task
+def rebuild_sales_rollup(days=3):
+
+    from .rollups import SalesRollup
+
+    # Reconcile the recent window in case an incremental update was lost
+    start_date = timezone.localdate() - timedelta(days=days)
+    count = SalesRollup.rebuild(start_date=start_date)
+
+    return f"Rebuilt {count} sales rollup rows since {start_date}"
+
+@shared_task
+def refresh_occupancy():
+
+    from .occupancy import OccupancyAnalytics
+
+    refreshed = OccupancyAnalytics.refresh()
+    if refreshed is None:
+        return "Rebuilt occupancy snapshot"
+    return f"Refreshed occupancy for {refreshed} showtimes"
+
+@shared_task
+def repair_seat_inventory():
+
+    from .inventory import SeatInventory
+
+    drifted = SeatInventory.repair()
+    return f"Repaired available_seats on {drifted} showtimes"
@@ -10,7 +10,7 @@ except ImportError:
 
 from django.utils import timezone
 from datetime import timedelta
-from django_redis import get_redis_connection
+from moviebooking.redis_client import get_redis_connection
 import logging
 
 logger = logging.getLogger(__name__)
@@ -35,7 +35,7 @@ def release_expired_bookings(self):
 
         from .models import Booking
         from .services import BookingService
-        from .utils_enhanced import CacheInvalidator
+        from .seat_store import CacheInvalidator
         
 
         expired_bookings = Booking.objects.filter(
@@ -115,19 +115,11 @@ def send_showtime_reminders():
 def cleanup_old_data():
 
     try:
-        from .models import Booking
-        from datetime import date
-        
+        from .archive import BookingArchiver
 
-        old_date = date.today() - timedelta(days=30)
-        old_bookings = Booking.objects.filter(
-            showtime__date__lt=old_date
-        )
-        
-        count = old_bookings.count()
-        
+        archived = BookingArchiver.run()
 
-        result = f"Found {count} old bookings to archive"
+        result = f"Archived {archived['bookings']} bookings for showtimes before {archived['cutoff']}"
         logger.info(result)
         return result
         
@@ -140,7 +132,7 @@ def warm_cache_for_upcoming_shows():
 
     try:
         from movies.theater_models import Showtime
-        from .utils_enhanced import SeatManager
+        from .utils import SeatManager
         
 
         now = timezone.now()
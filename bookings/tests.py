@@ -1,9 +1,38 @@
 
-from django.test import TestCase, Client
+import csv
+import gzip
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from datetime import timedelta
+from unittest import mock
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, Client, LiveServerTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from moviebooking.l1cache import L1Cache
+from moviebooking.localredis import LocalRedis
+from moviebooking.redis_client import Script, get_redis_connection, is_local
 from django.contrib.auth.models import User
-from .models import Booking
-from movies.models import Movie
+from .models import Booking, BookingArchive, DailySalesRollup, Transaction, TransactionArchive
+from .archive import BookingArchiver
+from .exports import ExportService
+from .loadtest import FlashSaleLoadTest
+from .services import BookingService
+from .stress import SeatContentionStress, SeatInvariants
+from .seat_store import CacheInvalidator, CacheKeyBuilder, SeatLockStore, forget_showtime, get_seat_store
+from .utils import PriceCalculator, SeatManager
+from .inventory import SeatInventory
+from .occupancy import OccupancyAnalytics
+from .rollups import SalesRollup
+from .query_plans import BookingHotQueries, QueryPlan
+from movies.models import Movie, Genre, Language
 from movies.theater_models import Showtime, Theater, Screen, City
+from moviebooking.performance import PerformanceRecorder, profiled
 from django.utils import timezone
 
 class BookingAuthenticationTests(TestCase):
@@ -1704,3 +1733,998 @@ class ModelRelationshipTests(TestCase):
         
         showtime_bookings = Booking.objects.filter(showtime=self.showtime)
         self.assertEqual(showtime_bookings.count(), 2)
+
+class ExportTests(TestCase):
+
+    def setUp(self):
+
+        self.user = User.objects.create_user(username='exporter', password='testpass123', email='e@example.com')
+        self.staff = User.objects.create_user(username='finance', password='testpass123', is_staff=True)
+        
+
+        self.movie = Movie.objects.create(
+            title='Export Movie',
+            description='Test',
+            release_date=timezone.now().date(),
+            duration=120
+        )
+        self.other_movie = Movie.objects.create(
+            title='Other Movie',
+            description='Test',
+            release_date=timezone.now().date(),
+            duration=120
+        )
+        
+
+        self.city = City.objects.create(name='Test City')
+        self.theater = Theater.objects.create(name='Test Theater', city=self.city, address='123 Test St')
+        self.screen = Screen.objects.create(theater=self.theater, name='Screen 1')
+        self.showtime = Showtime.objects.create(
+            movie=self.movie, screen=self.screen, date=timezone.now().date(), start_time='14:00', end_time='16:00'
+        )
+        self.other_showtime = Showtime.objects.create(
+            movie=self.other_movie, screen=self.screen, date=timezone.now().date(), start_time='18:00', end_time='20:00'
+        )
+        
+
+        self.confirmed = Booking.objects.create(
+            user=self.user, showtime=self.showtime, seats=['A1', 'A2'], total_seats=2,
+            base_price=400, total_amount=500, status='CONFIRMED'
+        )
+        Booking.objects.create(
+            user=self.user, showtime=self.showtime, seats=['A3'], total_seats=1,
+            base_price=200, total_amount=250, status='CANCELLED'
+        )
+        Booking.objects.create(
+            user=self.user, showtime=self.other_showtime, seats=['B1'], total_seats=1,
+            base_price=200, total_amount=250, status='CONFIRMED'
+        )
+        Transaction.objects.create(booking=self.confirmed, transaction_id='pay_123', amount=500, status='SUCCESS')
+
+    def test_csv_export_applies_filters(self):
+
+        output = b''.join(ExportService.stream('bookings', filters={'status': 'confirmed', 'movie_id': str(self.movie.id)}))
+        rows = list(csv.DictReader(io.StringIO(output.decode('utf-8'))))
+
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(rows[0]['booking_number'], self.confirmed.booking_number)
+        self.assertEqual(rows[0]['theater'], 'Test Theater')
+        self.assertEqual(rows[0]['total_amount'], '500.00')
+
+    def test_gzip_jsonl_round_trip(self):
+
+        output = b''.join(ExportService.stream('transactions', fmt='jsonl', compress=True))
+        lines = gzip.decompress(output).decode('utf-8').splitlines()
+
+        self.assertEqual(len(lines), 1)
+        record = json.loads(lines[0])
+        self.assertEqual(record['transaction_id'], 'pay_123')
+        self.assertEqual(record['booking_number'], self.confirmed.booking_number)
+        self.assertEqual(record['movie'], 'Export Movie')
+
+    def test_export_endpoint_streams_for_staff_only(self):
+
+        self.client.login(username='exporter', password='testpass123')
+        response = self.client.get('/custom-admin/api/export/bookings/')
+        self.assertEqual(response.status_code, 302)
+
+        self.client.login(username='finance', password='testpass123')
+        response = self.client.get('/custom-admin/api/export/bookings/', {'status': 'CONFIRMED'})
+
+        self.assertTrue(response.streaming)
+        self.assertIn('attachment;', response['Content-Disposition'])
+        body = b''.join(response.streaming_content).decode('utf-8').splitlines()
+        self.assertEqual(len(body), 3)  # header + two confirmed bookings
+
+        response = self.client.get('/custom-admin/api/export/users/')
+        self.assertEqual(response.status_code, 400)
+
+class OccupancyTests(TestCase):
+
+    def setUp(self):
+
+        cache.clear()
+        get_redis_connection("default").delete(OccupancyAnalytics.DIRTY_KEY)
+        self.user = User.objects.create_user(username='viewer', password='testpass123')
+        
+
+        self.movie = Movie.objects.create(
+            title='Occupancy Movie',
+            description='Test',
+            release_date=timezone.now().date(),
+            duration=120
+        )
+        self.city = City.objects.create(name='Test City')
+        self.theater = Theater.objects.create(name='Test Theater', city=self.city, address='123 Test St')
+        self.screen = Screen.objects.create(theater=self.theater, name='Screen 1', total_seats=100)
+        self.small_screen = Screen.objects.create(theater=self.theater, name='Screen 2', total_seats=40)
+        self.showtime = Showtime.objects.create(
+            movie=self.movie, screen=self.screen, date=timezone.now().date(), start_time='14:00', end_time='16:00'
+        )
+        self.late_showtime = Showtime.objects.create(
+            movie=self.movie, screen=self.small_screen, date=timezone.now().date(), start_time='21:00', end_time='23:00'
+        )
+        
+
+        self.book(self.showtime, 2, 'CONFIRMED')
+        self.book(self.showtime, 1, 'PENDING')
+        self.book(self.showtime, 5, 'CANCELLED')
+        self.book(self.late_showtime, 10, 'CONFIRMED')
+
+    def book(self, showtime, seats, status):
+
+        return Booking.objects.create(
+            user=self.user,
+            showtime=showtime,
+            seats=[f'A{i}' for i in range(seats)],
+            total_seats=seats,
+            base_price=200 * seats,
+            total_amount=250 * seats,
+            status=status
+        )
+
+    def test_snapshot_counts_sold_held_and_free_seats(self):
+
+        OccupancyAnalytics.rebuild()
+
+        self.assertEqual(
+            OccupancyAnalytics.showtime(self.showtime.id),
+            {'sold': 2, 'held': 1, 'free': 97, 'capacity': 100}
+        )
+        self.assertEqual(OccupancyAnalytics.showtime(self.late_showtime.id)['sold'], 10)
+
+    def test_report_aggregates_without_queries(self):
+
+        OccupancyAnalytics.rebuild()
+
+        with self.assertNumQueries(0):
+            report = OccupancyAnalytics.report()
+
+        weekday = timezone.now().date().weekday()
+        self.assertEqual(report['totals']['capacity'], 140)
+        self.assertEqual(report['totals']['sold'], 12)
+        self.assertEqual([row['fill_rate'] for row in report['by_screen']], [0.02, 0.25])
+        self.assertEqual(report['by_theater'][0]['sold'], 12)
+        self.assertEqual(report['heatmap']['fill_rate'][weekday][14], 0.02)
+        self.assertEqual(report['heatmap']['fill_rate'][weekday][21], 0.25)
+        self.assertEqual(report['heatmap']['sold'][weekday][13], 0)
+
+    def test_refresh_only_recomputes_dirty_showtimes(self):
+
+        OccupancyAnalytics.rebuild()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.book(self.late_showtime, 4, 'CONFIRMED')
+
+        with self.assertNumQueries(2):
+            self.assertEqual(OccupancyAnalytics.refresh(), 1)
+
+        self.assertEqual(OccupancyAnalytics.showtime(self.late_showtime.id)['sold'], 14)
+        self.assertEqual(OccupancyAnalytics.showtime(self.showtime.id)['sold'], 2)
+        self.assertEqual(OccupancyAnalytics.refresh(), 0)
+
+    def test_cold_snapshot_is_rebuilt_off_the_request(self):
+
+        with mock.patch('bookings.tasks.refresh_occupancy') as task:
+            with self.assertNumQueries(0):
+                report = OccupancyAnalytics.report()
+                OccupancyAnalytics.report()
+
+        self.assertIsNone(report['built_at'])
+        self.assertEqual(report['totals']['showtimes'], 0)
+        task.delay.assert_called_once_with()
+
+        OccupancyAnalytics.refresh()  # what the queued task runs
+        self.assertEqual(OccupancyAnalytics.report()['totals']['sold'], 12)
+        self.assertIsNone(cache.get(OccupancyAnalytics.REBUILDING_KEY))
+
+    def test_warm_command_builds_the_snapshot(self):
+
+        out = io.StringIO()
+        call_command('warm_occupancy', stdout=out)
+
+        self.assertIn('2 showtimes', out.getvalue())
+        with self.assertNumQueries(0):
+            self.assertEqual(OccupancyAnalytics.showtime(self.showtime.id)['sold'], 2)
+
+class SeatInventoryTests(TestCase):
+
+    def setUp(self):
+
+        self.user = User.objects.create_user(username='buyer', password='testpass123')
+        
+
+        self.movie = Movie.objects.create(
+            title='Inventory Movie',
+            description='Test',
+            release_date=timezone.now().date(),
+            duration=120
+        )
+        self.city = City.objects.create(name='Test City')
+        self.theater = Theater.objects.create(name='Test Theater', city=self.city, address='123 Test St')
+        self.screen = Screen.objects.create(theater=self.theater, name='Screen 1', total_seats=120)
+        self.showtime = Showtime.objects.create(
+            movie=self.movie, screen=self.screen, date=timezone.now().date(), start_time='14:00', end_time='16:00'
+        )
+
+    def book(self, seats, status='PENDING'):
+
+        return Booking.objects.create(
+            user=self.user,
+            showtime=self.showtime,
+            seats=[f'A{i}' for i in range(seats)],
+            total_seats=seats,
+            base_price=200 * seats,
+            total_amount=250 * seats,
+            status=status
+        )
+
+    def available(self):
+        return Showtime.objects.values_list('available_seats', flat=True).get(pk=self.showtime.pk)
+
+    def test_new_showtime_starts_at_screen_capacity(self):
+        self.assertEqual(self.available(), 120)
+
+    def test_explicit_available_seats_is_kept(self):
+
+        showtime = Showtime.objects.create(
+            movie=self.movie, screen=self.screen, date=timezone.now().date(),
+            start_time='18:00', end_time='20:00', available_seats=60
+        )
+        self.assertEqual(Showtime.objects.values_list('available_seats', flat=True).get(pk=showtime.pk), 60)
+
+    def test_unset_counter_starts_from_screen_capacity(self):
+
+        # bulk_create skips save(), leaving the counter NULL
+        showtime, = Showtime.objects.bulk_create([Showtime(
+            movie=self.movie, screen=self.screen, date=timezone.now().date(), start_time='18:00', end_time='20:00'
+        )])
+        self.assertFalse(showtime.is_sold_out)
+
+        SeatInventory.adjust(showtime.pk, -3)
+        self.assertEqual(Showtime.objects.values_list('available_seats', flat=True).get(pk=showtime.pk), 117)
+
+    def test_lifecycle_transitions_move_the_counter(self):
+
+        booking = self.book(3)
+        self.assertEqual(self.available(), 117)
+
+        booking.status = 'CONFIRMED'
+        booking.save()
+        self.assertEqual(self.available(), 117)
+
+        booking.status = 'CANCELLED'
+        booking.save()
+        self.assertEqual(self.available(), 120)
+
+        expired = self.book(2)
+        expired.status = 'EXPIRED'
+        expired.save()
+        self.assertEqual(self.available(), 120)
+
+        confirmed = self.book(4, status='CONFIRMED')
+        self.assertEqual(self.available(), 116)
+        Booking.objects.get(pk=confirmed.pk).delete()
+        self.assertEqual(self.available(), 120)
+
+    def test_repair_fixes_drift(self):
+
+        self.book(5, status='CONFIRMED')
+        self.book(1, status='FAILED')
+        Showtime.objects.filter(pk=self.showtime.pk).update(available_seats=42)
+
+        self.assertEqual(SeatInventory.repair(dry_run=True), 1)
+        self.assertEqual(self.available(), 42)
+        self.assertEqual(SeatInventory.repair(), 1)
+        self.assertEqual(self.available(), 115)
+        self.assertEqual(SeatInventory.repair(), 0)
+
+class SeatBenchmarkTests(TestCase):
+
+    def test_emits_json_for_every_implementation_and_rolls_back(self):
+
+        handle, path = tempfile.mkstemp(suffix='.json')
+        os.close(handle)
+        self.addCleanup(os.remove, path)
+
+        call_command(
+            'benchmark_seats', seats='120', bookings='0,50', iterations=3, output=path, stderr=io.StringIO()
+        )
+
+        with open(path) as results_file:
+            report = json.load(results_file)
+        rows = {(row['implementation'], row['bookings'], row['operation']): row for row in report['results']}
+
+        self.assertEqual(set(report['meta']['implementations']), {'legacy', 'locks', 'lua', 'db'})
+        for engine in ('legacy', 'locks', 'lua', 'db'):
+            self.assertEqual(rows[(engine, 50, 'reserve_seats')]['ok'], 3)
+            self.assertEqual(rows[(engine, 0, 'confirm_seats')]['seats'], 120)
+            self.assertIn((engine, 50, 'is_seat_still_available_for_user'), rows)
+        self.assertFalse(Booking.objects.exists())
+        self.assertFalse(Showtime.objects.exists())
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class LoadTestHarnessTests(LiveServerTestCase):
+
+    def setUp(self):
+
+        cache.clear()
+        movie = Movie.objects.create(
+            title='Load Movie', description='Test', release_date=timezone.now().date(), duration=120
+        )
+        city = City.objects.create(name='Test City')
+        theater = Theater.objects.create(name='Test Theater', city=city, address='123 Test St')
+        screen = Screen.objects.create(theater=theater, name='Screen 1')
+        self.showtime = Showtime.objects.create(
+            movie=movie, screen=screen, date=timezone.now().date() + timedelta(days=1),
+            start_time='14:00', end_time='16:00'
+        )
+
+    def test_scenario_file_overrides_defaults(self):
+
+        scenario = FlashSaleLoadTest.load_scenario('flash-sale', users=5)
+        self.assertEqual(scenario['users'], 5)
+        self.assertEqual(scenario['hot_seats'], 20)
+
+        with self.assertRaises(ValueError):
+            FlashSaleLoadTest.load_scenario(None, hot_seat=3)
+
+    def test_think_times_follow_the_seed(self):
+
+        def pauses():
+            test = FlashSaleLoadTest(self.live_server_url, FlashSaleLoadTest.load_scenario('low', seed=11))
+            with mock.patch('bookings.loadtest.time.sleep') as sleep:
+                for _ in range(3):
+                    test._think()
+            return [call.args[0] for call in sleep.call_args_list]
+
+        self.assertEqual(pauses(), pauses())
+
+    def test_funnel_confirms_bookings_without_double_booking(self):
+
+        scenario = FlashSaleLoadTest.load_scenario(
+            'low', users=3, concurrency=1, think_time_ms=[0, 0], payment={'redirect': 1.0}, seed=7
+        )
+        seat_map = [seat['seat_id'] for row in SeatManager.get_seat_layout(self.showtime.id) for seat in row if seat]
+
+        report = FlashSaleLoadTest(self.live_server_url, scenario).run(self.showtime, seat_map)
+
+        self.assertEqual(report['outcomes'], {'confirmed': 3})
+        self.assertEqual(report['steps']['payment_success']['statuses'], {'302': 3})
+        self.assertEqual(report['double_bookings']['count'], 0)
+        self.assertEqual(Booking.objects.filter(showtime=self.showtime, status='CONFIRMED').count(), 3)
+
+class SeatContentionStressTests(TransactionTestCase):
+
+    def setUp(self):
+
+        cache.clear()
+        movie = Movie.objects.create(
+            title='Stress Test Movie', description='Test', release_date=timezone.now().date(), duration=120
+        )
+        city = City.objects.create(name='Test City')
+        theater = Theater.objects.create(name='Test Theater', city=city, address='123 Test St')
+        screen = Screen.objects.create(theater=theater, name='Screen 1')
+        self.showtime = Showtime.objects.create(
+            movie=movie, screen=screen, date=timezone.now().date() + timedelta(days=1),
+            start_time='14:00', end_time='16:00'
+        )
+        self.showtime.refresh_from_db()
+        self.user = User.objects.create_user(username='dup', password='testpass123')
+
+    def test_double_bookings_are_reported(self):
+
+        for number in ('BOOK-DUP-1', 'BOOK-DUP-2'):
+            Booking.objects.create(
+                booking_number=number, user=self.user, showtime=self.showtime, seats=['A1', 'A2'],
+                total_seats=2, base_price=400, total_amount=500, status='CONFIRMED'
+            )
+
+        violations = SeatInvariants.double_bookings(self.showtime.id)
+        self.assertEqual(sorted(violations), ['A1', 'A2'])
+
+    @override_settings(SEAT_STORE={'BACKEND': 'legacy'})  # the db engine has no holds outside booking rows
+    def test_holds_without_a_live_booking_are_reported(self):
+
+        booking, created, _ = BookingService.create_booking_with_seats(self.user, self.showtime, ['A1'])
+        self.assertTrue(created)
+        self.assertTrue(SeatInvariants.check(self.showtime.id, [self.user.id])['ok'])
+
+        # A hold the booking never picked up
+        SeatManager.reserve_seats(self.showtime.id, ['B2'], self.user.id)
+        result = SeatInvariants.check(self.showtime.id, [self.user.id])
+
+        self.assertFalse(result['ok'])
+        self.assertEqual(result['orphan_holds']['reserved_list'], ['B2'])
+        self.assertEqual(result['orphan_holds']['user_reservations'], {self.user.id: ['B2']})
+
+    def test_confirming_drops_the_user_reservation(self):
+
+        booking, created, _ = BookingService.create_booking_with_seats(self.user, self.showtime, ['C3'])
+        self.assertTrue(created)
+
+        SeatManager.confirm_seats(self.showtime.id, booking.seats, user_id=self.user.id)
+        booking.status = 'CONFIRMED'
+        booking.save()
+
+        self.assertEqual(SeatManager.user_holds(self.showtime.id, self.user.id), [])
+        self.assertEqual(SeatInvariants.check(self.showtime.id, [self.user.id])['orphan_holds']['count'], 0)
+
+    def test_command_reports_throughput_and_cleans_up(self):
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'stress.json')
+            call_command(
+                'stress_seats', attempts=30, processes=1, threads=1, users=4, hot_seats=6,
+                seed=3, output=path, stdout=io.StringIO()
+            )
+            with open(path) as handle:
+                report = json.load(handle)
+
+        self.assertEqual(sum(report['outcomes'].values()), 30)
+        self.assertNotIn('error', report['outcomes'])
+        self.assertGreater(report['outcomes']['confirmed'], 0)
+        self.assertTrue(report['invariants']['ok'])
+        self.assertEqual(report['database']['vendor'], connection.vendor)
+        self.assertIn('attempts_per_second', report['throughput'])
+        self.assertIn('hold_create', report['latency_ms'])
+        self.assertFalse(Showtime.objects.filter(id=report['showtime_id']).exists())
+        self.assertFalse(User.objects.filter(username__startswith=SeatContentionStress.USERNAME_PREFIX).exists())
+
+    def test_worker_threads_leave_the_shared_stress_object_alone(self):
+
+        stress = SeatContentionStress(self.showtime.id, [self.user.id], ['A1', 'A2', 'A3'])
+        report = stress.run(4, threads=2, seed=5)
+
+        self.assertEqual(sum(report['outcomes'].values()), 4)
+        self.assertFalse(hasattr(stress, 'showtime'))
+
+@override_settings(SEAT_STORE={'BACKEND': 'db'})
+class CreateBookingConcurrencyTests(TransactionTestCase):
+
+    def setUp(self):
+
+        cache.clear()
+        movie = Movie.objects.create(title='Race Movie', description='Test', release_date=timezone.now().date(), duration=120)
+        city = City.objects.create(name='Test City')
+        theater = Theater.objects.create(name='Test Theater', city=city, address='123 Test St')
+        screen = Screen.objects.create(theater=theater, name='Screen 1')
+        self.showtime = Showtime.objects.create(
+            movie=movie, screen=screen, date=timezone.now().date() + timedelta(days=1), start_time='14:00', end_time='16:00'
+        )
+        self.clients = []
+        for number in range(2):
+            client = Client()
+            client.force_login(User.objects.create_user(username=f'racer{number}', password='testpass123'))
+            self.clients.append(client)
+
+    def test_two_users_cannot_both_hold_the_same_seat(self):
+
+        barrier = threading.Barrier(len(self.clients))
+        statuses = []
+        calculate = PriceCalculator.calculate_booking_amount
+
+        def slow_calculate(*args, **kwargs):
+            # Widen the window between the seat check and the booking insert
+            time.sleep(0.3)
+            return calculate(*args, **kwargs)
+
+        def book(client):
+            try:
+                barrier.wait()
+                response = client.post(
+                    f'/bookings/api/create-booking/{self.showtime.id}/', json.dumps({'seat_ids': ['A1']}),
+                    content_type='application/json'
+                )
+                statuses.append(response.status_code)
+            finally:
+                connection.close()
+
+        with mock.patch.object(PriceCalculator, 'calculate_booking_amount', side_effect=slow_calculate):
+            threads = [threading.Thread(target=book, args=(client,)) for client in self.clients]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(statuses.count(200), 1, statuses)
+        self.assertEqual(Booking.objects.filter(showtime=self.showtime, status='PENDING').count(), 1)
+
+LOCAL_CACHES = {
+    'default': {
+        'BACKEND': 'moviebooking.localredis.LocalRedisCache',
+        'LOCATION': 'local://bookings-tests',
+        'KEY_PREFIX': 'moviebooking',
+    }
+}
+
+class LocalRedisTests(TestCase):
+
+    def setUp(self):
+        self.now = [1000.0]
+        self.redis = LocalRedis(clock=lambda: self.now[0])
+
+    def test_ttl_and_setnx_follow_the_clock(self):
+
+        self.assertTrue(self.redis.set('lock', 'user-1', ex=10))
+        self.assertFalse(self.redis.setnx('lock', 'user-2'))
+        self.assertIsNone(self.redis.set('lock', 'user-2', nx=True))
+        self.assertEqual(self.redis.ttl('lock'), 10)
+
+        self.now[0] += 10.5
+        self.assertIsNone(self.redis.get('lock'))
+        self.assertEqual(self.redis.ttl('lock'), -2)
+        self.assertTrue(self.redis.setnx('lock', 'user-2'))
+        self.assertEqual(self.redis.get('lock'), b'user-2')
+        self.assertEqual(self.redis.ttl('lock'), -1)
+
+    def test_sorted_sets_and_pipelines(self):
+
+        self.redis.zadd('queue', {'a': 3, 'b': 1, 'c': 2})
+        self.redis.zincrby('queue', 5, 'b')
+        self.assertEqual(self.redis.zrevrange('queue', 0, 1, withscores=True), [(b'b', 6.0), (b'a', 3.0)])
+        self.assertEqual(self.redis.zrangebyscore('queue', '(2', '+inf'), [b'a', b'b'])
+        self.assertEqual(self.redis.zremrangebyscore('queue', '-inf', 2), 1)
+
+        trips = self.redis.stats['round_trips']
+        pipe = self.redis.pipeline(transaction=True)
+        pipe.hincrby('counts', 'movie:1', 2)
+        pipe.expire('counts', 60)
+        pipe.hgetall('counts')
+        pipe.delete('counts')
+        self.assertEqual(pipe.execute(), [2, True, {b'movie:1': b'2'}, 1])
+        self.assertEqual(self.redis.stats['round_trips'], trips + 1)
+        self.assertEqual(self.redis.exists('counts'), 0)
+
+    def test_script_runs_its_python_twin_atomically(self):
+
+        release = Script("""
+            if redis.call('get', KEYS[1]) == ARGV[1] then return redis.call('del', KEYS[1]) end
+            return 0
+        """)
+
+        @release.local
+        def release_local(redis_conn, keys, args):
+            return redis_conn.delete(keys[0]) if redis_conn.get(keys[0]) == str(args[0]).encode() else 0
+
+        self.redis.set('lock', '7')
+        trips = self.redis.stats['round_trips']
+        self.assertEqual(release(self.redis, keys=['lock'], args=[8]), 0)
+        self.assertEqual(release(self.redis, keys=['lock'], args=[7]), 1)
+        self.assertEqual(self.redis.stats['round_trips'], trips + 2)
+
+    @override_settings(CACHES=LOCAL_CACHES)
+    def test_seat_engine_runs_on_the_local_backend(self):
+
+        store = SeatLockStore()
+        cache.clear()
+        self.assertTrue(is_local(get_redis_connection()))
+        self.assertTrue(store.lock_seats(1, ['A1'], 10))
+        self.assertFalse(store.lock_seats(1, ['A1'], 11))
+        store.unlock_seats(1, ['A1'], 10)
+        self.assertTrue(store.lock_seats(1, ['A1'], 11))
+
+        cache.set('seat_reservation_1_10', {'seat_ids': ['A1']}, timeout=600)
+        self.assertEqual(cache.get('seat_reservation_1_10'), {'seat_ids': ['A1']})
+        self.assertEqual(cache.ttl('seat_reservation_1_10'), 600)
+        self.assertEqual(cache.ttl('missing'), 0)
+        cache.set('hits', 1)
+        self.assertEqual(cache.incr('hits', 2), 3)
+
+class SeatLockRoundTripTests(TestCase):
+
+    SHOWTIME_ID = 4242
+
+    def setUp(self):
+
+        cache.clear()
+        self.manager = SeatLockStore()
+        self.seats = self.manager.get_available_seats(self.SHOWTIME_ID)
+        # The first EVALSHA of a script the server has not seen costs a SCRIPT LOAD retry; keep that out of the counts
+        self.manager.lock_seats(self.SHOWTIME_ID, self.seats[-1:], 0)
+        self.manager.unlock_seats(self.SHOWTIME_ID, self.seats[-1:], 0)
+
+    def round_trips(self, call):
+
+        with profiled() as profile:
+            result = call()
+        return result, profile.redis_round_trips
+
+    def assertConstantRoundTrips(self):
+
+        trips = {}
+        for user_id, count in ((10, 2), (11, 8)):
+            seats = self.seats[:count] if user_id == 10 else self.seats[10:10 + count]
+            reserved, reserve_trips = self.round_trips(lambda: self.manager.reserve_seats(self.SHOWTIME_ID, seats, user_id))
+            released, release_trips = self.round_trips(lambda: self.manager.release_seats(self.SHOWTIME_ID, seats, user_id))
+            self.manager.reserve_seats(self.SHOWTIME_ID, seats, user_id)
+            confirmed, confirm_trips = self.round_trips(lambda: self.manager.confirm_seats(self.SHOWTIME_ID, seats))
+            self.assertTrue(reserved and released and confirmed)
+            trips[count] = (reserve_trips, release_trips, confirm_trips)
+            self.manager.get_available_seats(self.SHOWTIME_ID)  # confirm dropped it; warm it again
+
+        self.assertEqual(trips[2], trips[8])
+        self.assertEqual(trips[2][0], 2)  # cached availability + one lock script
+        self.assertEqual(trips[2][1], 1)
+
+    def test_multi_seat_operations_take_constant_round_trips(self):
+        self.assertConstantRoundTrips()
+
+    @override_settings(CACHES=LOCAL_CACHES)
+    def test_multi_seat_operations_take_constant_round_trips_on_local_redis(self):
+
+        cache.clear()
+        self.seats = self.manager.get_available_seats(self.SHOWTIME_ID)
+        self.assertConstantRoundTrips()
+
+    def test_locking_is_all_or_nothing(self):
+
+        self.assertTrue(self.manager.reserve_seats(self.SHOWTIME_ID, [self.seats[2]], 10))
+        self.assertFalse(self.manager.reserve_seats(self.SHOWTIME_ID, self.seats[:3], 11))
+        self.assertTrue(self.manager.lock_seats(self.SHOWTIME_ID, self.seats[:2], 12))
+
+        # Only the owner's locks go; someone else's survive
+        self.assertEqual(self.manager.unlock_seats(self.SHOWTIME_ID, self.seats[:3], 10), 1)
+        self.assertFalse(self.manager.lock_seats(self.SHOWTIME_ID, self.seats[:1], 10))
+        self.manager.release_seats(self.SHOWTIME_ID, self.seats[:3])
+
+class SeatStoreTests(TestCase):
+
+    ENGINES = ('legacy', 'locks', 'lua', 'db')
+
+    def setUp(self):
+
+        cache.clear()
+        movie = Movie.objects.create(
+            title='Seat Store Movie', description='Test', release_date=timezone.now().date(), duration=120
+        )
+        city = City.objects.create(name='Test City')
+        theater = Theater.objects.create(name='Test Theater', city=city, address='123 Test St')
+        screen = Screen.objects.create(theater=theater, name='Screen 1')
+        self.showtime = Showtime.objects.create(
+            movie=movie, screen=screen, date=timezone.now().date() + timedelta(days=1),
+            start_time='14:00', end_time='16:00'
+        )
+        self.showtime.refresh_from_db()
+        self.alice = User.objects.create_user(username='alice', password='testpass123')
+        self.bob = User.objects.create_user(username='bob', password='testpass123')
+
+    def engine(self, name):
+        return override_settings(SEAT_STORE={'BACKEND': name})
+
+    def test_every_engine_keeps_holds_exclusive_through_the_booking_funnel(self):
+
+        for name in self.ENGINES:
+            with self.subTest(engine=name), self.engine(name):
+                cache.clear()
+                forget_showtime(self.showtime.id)
+                Booking.objects.all().delete()
+
+                booking, created, _ = BookingService.create_booking_with_seats(self.alice, self.showtime, ['A1', 'A2'])
+                self.assertTrue(created)
+                self.assertEqual(get_seat_store(self.showtime.id).name, name)
+                self.assertIn('A1', SeatManager.get_reserved_seats(self.showtime.id))
+                self.assertGreater(SeatManager.hold_ttl(self.showtime.id, self.alice.id), 0)
+                if name != 'legacy':  # the shared hold list does not record owners
+                    self.assertEqual(SeatManager.user_holds(self.showtime.id, self.alice.id), ['A1', 'A2'])
+
+                _, created, _ = BookingService.create_booking_with_seats(self.bob, self.showtime, ['A2', 'A3'])
+                self.assertFalse(created)
+
+                BookingService.cancel_booking(booking)
+                self.assertEqual(SeatInvariants.check(self.showtime.id, [self.alice.id])['orphan_holds']['count'], 0)
+                cache.delete(CacheKeyBuilder.available_seats(self.showtime.id))
+
+                booking, created, _ = BookingService.create_booking_with_seats(self.bob, self.showtime, ['A2', 'A3'])
+                self.assertTrue(created)
+                booking.status = 'CONFIRMED'
+                booking.save()
+                SeatManager.confirm_seats(self.showtime.id, booking.seats, user_id=self.bob.id)
+
+                available = SeatManager.get_available_seats(self.showtime.id)
+                self.assertNotIn('A2', available)
+                self.assertIn('A1', available)
+                self.assertFalse(SeatManager.reserve_seats(self.showtime.id, ['A3'], self.alice.id))
+                self.assertTrue(SeatInvariants.check(self.showtime.id, [self.alice.id, self.bob.id])['ok'])
+
+    @override_settings(CACHES=LOCAL_CACHES)
+    def test_scripted_engine_runs_on_the_local_backend(self):
+
+        with self.engine('lua'):
+            cache.clear()
+            self.assertTrue(SeatManager.reserve_seats(self.showtime.id, ['B1', 'B2'], self.alice.id))
+            self.assertFalse(SeatManager.reserve_seats(self.showtime.id, ['B2'], self.bob.id))
+            self.assertTrue(SeatManager.reserve_seats(self.showtime.id, ['B2'], self.alice.id))
+            self.assertEqual(SeatManager.holds(self.showtime.id), {'B1': self.alice.id, 'B2': self.alice.id})
+
+            SeatManager.release_seats(self.showtime.id, user_id=self.alice.id)
+            self.assertEqual(SeatManager.holds(self.showtime.id), {})
+            SeatManager.reserve_seats(self.showtime.id, ['B1'], self.bob.id)
+            SeatManager.confirm_seats(self.showtime.id, ['B1'], user_id=self.bob.id)
+            self.assertNotIn('B1', SeatManager.get_available_seats(self.showtime.id))
+            self.assertFalse(SeatManager.reserve_seats(self.showtime.id, ['B1'], self.alice.id))
+
+    def test_scripted_engine_rebuilds_from_bookings(self):
+
+        # Sold seats and live holds come back from the database when the bitmap is gone
+        Booking.objects.create(
+            booking_number='STORE-SOLD', user=self.alice, showtime=self.showtime, seats=['C1'],
+            total_seats=1, base_price=200, total_amount=250, status='CONFIRMED'
+        )
+        Booking.objects.create(
+            booking_number='STORE-HELD', user=self.alice, showtime=self.showtime, seats=['C2'],
+            total_seats=1, base_price=200, total_amount=250, status='PENDING'
+        )
+        with self.engine('lua'):
+            CacheInvalidator.invalidate_showtime_cache(self.showtime.id)
+            available = SeatManager.get_available_seats(self.showtime.id)
+            self.assertNotIn('C1', available)
+            self.assertNotIn('C2', available)
+            self.assertEqual(SeatManager.holds(self.showtime.id), {'C2': self.alice.id})
+            self.assertFalse(SeatManager.reserve_seats(self.showtime.id, ['C2'], self.bob.id))
+
+    @override_settings(SEAT_STORE={'BACKEND': 'legacy'})
+    def test_invalidation_reaches_the_keys_the_views_read(self):
+
+        SeatManager.get_available_seats(self.showtime.id)
+        self.assertIsNotNone(cache.get(CacheKeyBuilder.available_seats(self.showtime.id)))
+        CacheInvalidator.invalidate_showtime_cache(self.showtime.id)
+        self.assertIsNone(cache.get(CacheKeyBuilder.available_seats(self.showtime.id)))
+
+    def test_candidate_engine_serves_a_stable_share_of_showtimes(self):
+
+        with override_settings(SEAT_STORE={'BACKEND': 'legacy', 'CANDIDATE': 'lua', 'CANDIDATE_PERCENT': 25}):
+            self.assertEqual(get_seat_store(124).name, 'lua')
+            self.assertEqual(get_seat_store(125).name, 'legacy')
+            self.assertIs(get_seat_store(224), get_seat_store(124))
+            self.assertEqual(get_seat_store().name, 'legacy')
+
+class BookingIndexPlanTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='planner', password='pass123')
+
+    def test_hot_queries_use_their_indexes(self):
+
+        self.assertTrue(QueryPlan.supported())
+        for name, (queryset, indexes) in BookingHotQueries.all(showtime_id=1, user_id=self.user.id).items():
+            with self.subTest(query=name):
+                result = QueryPlan.check(queryset, indexes)
+                if result['skipped']:
+                    self.skipTest(f"{connection.vendor} can't use partial index {result['expected']}")
+                self.assertFalse(result['full_scan'], result['plan'])
+                self.assertTrue(result['ok'], f"{name} used {result['indexes']}, expected {result['expected']}:\n{result['plan']}")
+
+    def test_plan_check_flags_a_full_scan(self):
+
+        result = QueryPlan.check(Booking.objects.filter(convenience_fee__gt=0), {'booking_status_created_idx'})
+        self.assertTrue(result['full_scan'], result['plan'])
+        self.assertFalse(result['ok'])
+
+    def test_command_reports_every_query(self):
+
+        out = io.StringIO()
+        call_command('explain_hot_queries', stdout=out)
+        for name, (queryset, indexes) in BookingHotQueries.all().items():
+            mark = '⏭️' if QueryPlan.check(queryset, indexes)['skipped'] else '✅'
+            self.assertIn(f'{mark} {name}', out.getvalue())
+
+    def test_partial_index_only_queries_are_skipped_not_substituted(self):
+
+        queryset, indexes = BookingHotQueries.all()['expiry_sweep']
+        result = QueryPlan.check(queryset, indexes)
+
+        self.assertEqual(result['skipped'], connection.vendor == 'sqlite')
+        self.assertEqual(result['expected'], ['booking_pending_expiry_idx'])
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage', BOOKING_ARCHIVE_AFTER_DAYS=30)
+class BookingArchiveTests(TestCase):
+
+    def setUp(self):
+
+        self.user = User.objects.create_user(username='archived', email='archived@example.com', password='testpass123')
+        self.user.profile.is_email_verified = True
+        self.user.profile.save()
+        movie = Movie.objects.create(title='Old Movie', description='Test', release_date=timezone.now().date(), duration=120)
+        city = City.objects.create(name='Test City')
+        theater = Theater.objects.create(name='Test Theater', city=city, address='123 Test St')
+        screen = Screen.objects.create(theater=theater, name='Screen 1')
+        self.old_showtime = Showtime.objects.create(
+            movie=movie, screen=screen, date=timezone.now().date() - timedelta(days=60), start_time='14:00', end_time='16:00'
+        )
+        self.showtime = Showtime.objects.create(
+            movie=movie, screen=screen, date=timezone.now().date(), start_time='14:00', end_time='16:00'
+        )
+
+        self.old_confirmed = self.book(self.old_showtime, 'CONFIRMED', days_ago=61)
+        self.old_cancelled = self.book(self.old_showtime, 'CANCELLED', days_ago=61)
+        self.old_pending = self.book(self.old_showtime, 'PENDING', days_ago=61)
+        self.current = self.book(self.showtime, 'CONFIRMED', days_ago=1)
+        Transaction.objects.create(booking=self.old_confirmed, transaction_id='pay_old', amount=300, status='SUCCESS')
+
+    def book(self, showtime, status, days_ago):
+
+        booking = Booking.objects.create(
+            user=self.user, showtime=showtime, seats=['A1'], total_seats=1, base_price=200, total_amount=300, status=status
+        )
+        Booking.objects.filter(pk=booking.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+        return booking
+
+    def test_finished_bookings_of_past_showtimes_move_in_batches(self):
+
+        result = BookingArchiver.run(batch_size=1)
+
+        self.assertEqual((result['bookings'], result['transactions'], result['batches']), (2, 1, 2))
+        self.assertEqual(set(Booking.objects.values_list('id', flat=True)), {self.old_pending.id, self.current.id})
+        archived = BookingArchive.objects.get(id=self.old_confirmed.id)
+        self.assertEqual(archived.booking_number, self.old_confirmed.booking_number)
+        self.assertEqual(archived.showtime_date, self.old_showtime.date)
+        self.assertEqual(archived.seats, ['A1'])
+        self.assertEqual(list(archived.transactions.values_list('transaction_id', flat=True)), ['pay_old'])
+        self.assertFalse(Transaction.objects.exists())
+        self.assertEqual(BookingArchiver.run()['bookings'], 0)
+
+    def test_dry_run_only_counts(self):
+
+        out = io.StringIO()
+        call_command('archive_bookings', '--dry-run', stdout=out)
+
+        self.assertIn('2 bookings', out.getvalue())
+        self.assertFalse(BookingArchive.objects.exists())
+
+    def test_my_bookings_and_detail_read_through_to_the_archive(self):
+
+        BookingArchiver.run()
+        self.client.login(username='archived', password='testpass123')
+
+        response = self.client.get('/bookings/my-bookings/')
+        self.assertEqual(
+            [booking.id for booking in response.context['bookings']],
+            [self.current.id, self.old_pending.id, self.old_cancelled.id, self.old_confirmed.id]
+        )
+        self.assertFalse(response.context['has_next'])
+        response = self.client.get(f'/bookings/detail/{self.old_confirmed.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, self.old_confirmed.booking_number)
+
+    def test_my_bookings_pages_in_sql_across_both_tables(self):
+
+        BookingArchiver.run()
+        expected = [self.current.id, self.old_pending.id, self.old_cancelled.id, self.old_confirmed.id]
+
+        first, has_more = BookingArchiver.for_user(self.user, per_page=3)
+        self.assertEqual([booking.id for booking in first], expected[:3])
+        self.assertTrue(has_more)
+        self.assertIsInstance(first[2], BookingArchive)
+
+        # the UNION page, then one load for the only table it touches
+        with self.assertNumQueries(2):
+            last, has_more = BookingArchiver.for_user(self.user, page=2, per_page=3)
+        self.assertEqual([booking.id for booking in last], expected[3:])
+        self.assertFalse(has_more)
+
+    def test_rollup_rebuild_and_series_include_archived_sales(self):
+
+        BookingArchiver.run()
+        SalesRollup.rebuild()
+
+        self.assertEqual(DailySalesRollup.objects.get(date=timezone.localdate() - timedelta(days=61)).bookings, 1)
+        self.assertTrue(BookingArchiver.reaches(timezone.localdate() - timedelta(days=61)))
+        self.assertFalse(BookingArchiver.reaches(timezone.localdate()))
+
+        from custom_admin.analytics import AnalyticsEngine
+        spec = AnalyticsEngine.normalize({})
+        day = timezone.localdate() - timedelta(days=61)
+        series = AnalyticsEngine.series(spec, day, day, bucket='hour')
+        self.assertEqual(sum(point['bookings'] for point in series), 1)
+
+class QueryBudgetMixin:
+
+    # Big enough that an N+1 shows up as dozens of extra queries, small enough to seed quickly
+    CITIES = 4
+    THEATERS_PER_CITY = 3
+    SCREENS_PER_THEATER = 2
+    MOVIES = 8
+    DAYS = 3
+    BOOKINGS = 30
+
+    def seed(self):
+
+        cache.clear()
+        self.customer = User.objects.create_user(username='regular', email='regular@example.com', password='testpass123')
+        self.customer.profile.is_email_verified = True
+        self.customer.profile.save()
+        self.staff = User.objects.create_user(username='boxoffice', password='testpass123', is_staff=True)
+        other = User.objects.create_user(username='other', password='testpass123')
+
+        language = Language.objects.create(name='English', code='en')
+        genres = [Genre.objects.create(name=f'Genre {i}', slug=f'genre-{i}') for i in range(4)]
+        self.movies = []
+        for i in range(self.MOVIES):
+            movie = Movie.objects.create(
+                title=f'Seeded Movie {i}',
+                description='Test',
+                release_date=timezone.now().date() - timedelta(days=i),
+                duration=120,
+                language=language
+            )
+            movie.genres.set(genres[i % 4:i % 4 + 2])
+            self.movies.append(movie)
+
+        self.showtimes = []
+        today = timezone.now().date()
+        for c in range(self.CITIES):
+            city = City.objects.create(name=f'City {c}')
+            for t in range(self.THEATERS_PER_CITY):
+                theater = Theater.objects.create(name=f'Theater {c}-{t}', city=city, address='1 Test St')
+                for s in range(self.SCREENS_PER_THEATER):
+                    screen = Screen.objects.create(theater=theater, name=f'Screen {s + 1}', total_seats=120)
+                    for day in range(self.DAYS):
+                        for slot, start in enumerate(('14:00', '19:00')):
+                            self.showtimes.append(Showtime.objects.create(
+                                movie=self.movies[(c + t + s + slot) % self.MOVIES],
+                                screen=screen,
+                                date=today + timedelta(days=day),
+                                start_time=start,
+                                end_time='22:00' if slot else '17:00'
+                            ))
+
+        statuses = ['CONFIRMED', 'CONFIRMED', 'PENDING', 'CANCELLED', 'EXPIRED']
+        self.bookings = []
+        for i in range(self.BOOKINGS):
+            for user in (self.customer, other):
+                self.bookings.append(Booking.objects.create(
+                    booking_number=f'BOOK-SEED-{user.username}-{i}',
+                    user=user,
+                    showtime=self.showtimes[(i * 7) % len(self.showtimes)],
+                    seats=[f'B{i + 1}'] if user is other else [f'A{i + 1}'],
+                    total_seats=1,
+                    base_price=200,
+                    total_amount=250,
+                    status=statuses[i % len(statuses)]
+                ))
+        self.booking = self.bookings[0]
+        self.showtime = self.showtimes[0]
+
+    def measure(self, url, user=None, cold=True):
+
+        # Cold cache is the worst case; sessions live in the cache, so log in again afterwards
+        if cold:
+            cache.clear()
+            L1Cache.clear()
+        if user is not None:
+            self.client.force_login(user)
+        PerformanceRecorder.reset()
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        self.assertEqual(response.status_code, 200, (url, response.get('Location')))
+
+        profile = PerformanceRecorder.report()[response.resolver_match.view_name]
+        return len(queries), profile['cache_calls']['max']
+
+    def assertWithinBudget(self, url, queries, cache_calls, user=None, cold=True):
+
+        used_queries, used_cache_calls = self.measure(url, user, cold)
+        self.assertLessEqual(used_queries, queries, f'{url} ran {used_queries} queries (budget {queries})')
+        self.assertLessEqual(used_cache_calls, cache_calls, f'{url} made {used_cache_calls} cache calls (budget {cache_calls})')
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class BookingViewQueryBudgetTests(QueryBudgetMixin, TestCase):
+
+    def setUp(self):
+        self.seed()
+
+    def test_select_seats(self):
+        self.assertWithinBudget(f'/bookings/select-seats/{self.showtime.id}/', queries=8, cache_calls=8, user=self.customer)
+
+    def test_get_seat_status(self):
+        self.assertWithinBudget(f'/bookings/api/seat-status/{self.showtime.id}/', queries=4, cache_calls=7, user=self.customer)
+
+    def test_my_bookings(self):
+        self.assertWithinBudget('/bookings/my-bookings/', queries=4, cache_calls=2, user=self.customer)
+
+    def test_booking_detail(self):
+        self.assertWithinBudget(f'/bookings/detail/{self.booking.id}/', queries=5, cache_calls=2, user=self.customer)
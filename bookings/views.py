@@ -1,6 +1,7 @@
 from django.shortcuts import render, redirect, get_object_or_404
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
+from django.db import transaction
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt, csrf_protect
 from django.views.decorators.http import require_http_methods, require_POST
@@ -12,10 +13,12 @@ from .email_utils import send_booking_confirmation_email
 from django.http import HttpResponse
 from movies.models import Movie
 from movies.theater_models import Showtime
-from .models import Booking, Transaction
+from .models import Booking, BookingArchive, Transaction
+from .archive import BookingArchiver
 from .utils import SeatManager, PriceCalculator
 from django.conf import settings
 from accounts.decorators import email_verified_required
+from moviebooking.metrics import BOOKING_CONFIRMATIONS
 
 logger = logging.getLogger(__name__)
 
@@ -27,25 +30,25 @@ def supports_select_for_update():
 @email_verified_required
 def select_seats(request, showtime_id):
 
-    showtime = get_object_or_404(Showtime, id=showtime_id, is_active=True)
+    showtime = get_object_or_404(Showtime.objects.select_related('movie', 'screen'), id=showtime_id, is_active=True)
     
     if showtime.date < timezone.now().date():
         messages.error(request, 'This showtime has already passed.')
         return redirect('movie_detail', slug=showtime.movie.slug)
     
-    seat_layout = SeatManager.get_seat_layout(showtime_id)
-    reserved_seats = SeatManager.get_reserved_seats(showtime_id)
-    available_seats = SeatManager.get_available_seats(showtime_id)
-    
-    for row in seat_layout:
-        for seat in row:
-            if seat:
-                if seat['seat_id'] in reserved_seats:
-                    seat['status'] = 'reserved'
-                elif seat['seat_id'] in available_seats:
-                    seat['status'] = 'available'
-                else:
-                    seat['status'] = 'booked'
+    reserved_seats = set(SeatManager.get_reserved_seats(showtime_id))
+    available_seats = set(SeatManager.get_available_seats(showtime_id))
+    
+    def status(seat_id):
+        if seat_id in reserved_seats:
+            return 'reserved'
+        return 'available' if seat_id in available_seats else 'booked'
+    
+    # The cached layout is shared, so annotate copies rather than the seats themselves
+    seat_layout = [
+        [dict(seat, status=status(seat['seat_id'])) if seat else seat for seat in row]
+        for row in SeatManager.get_seat_layout(showtime_id)
+    ]
     
     context = {
         'showtime': showtime,
@@ -152,9 +155,7 @@ def booking_summary(request, showtime_id):
         len(seat_ids)
     )
     
-    from django.core.cache import cache
-    cache_key = f"seat_reservation_{showtime_id}_{request.user.id}"
-    remaining_seconds = cache.ttl(cache_key)
+    remaining_seconds = SeatManager.hold_ttl(showtime_id, request.user.id)
     
     context = {
         'showtime': showtime,
@@ -177,39 +178,42 @@ def create_booking(request, showtime_id):
         data = json.loads(request.body)
         seat_ids = data.get('seat_ids', [])
         
-        existing_pending = Booking.objects.filter(
-            user=request.user,
-            showtime=showtime,
-            status='PENDING'
-        )
-        for old_booking in existing_pending:
-            logger.info(f"🧹 Cancelling existing PENDING booking {old_booking.booking_number} before creating new one")
-            old_booking.status = 'CANCELLED'
-            old_booking.save()
-            SeatManager.release_seats(showtime_id, old_booking.seats, user_id=request.user.id)
-        
-        success = SeatManager.reserve_seats(showtime_id, seat_ids, request.user.id)
-        
-        if not success:
-             print(f"⚠️ SAFETY CHECK FAILED: User {request.user.id} tried to book seats {seat_ids} for showtime {showtime_id} but they were already taken.")
-             return JsonResponse({
-                 'success': False,
-                 'error': 'Oh no! One or more of these seats were just taken by another user.'
-             }, status=400)
-        
-        price_details = PriceCalculator.calculate_booking_amount(showtime, len(seat_ids))
-        
-        booking = Booking.objects.create(
-            user=request.user,
-            showtime=showtime,
-            seats=seat_ids,
-            total_seats=len(seat_ids),
-            base_price=price_details['base_price'],
-            convenience_fee=price_details['convenience_fee'],
-            tax_amount=price_details['tax_amount'],
-            total_amount=price_details['total_amount'],
-            status='PENDING'
-        )
+        # The check and the insert share one transaction: with the db seat engine the PENDING row is the hold
+        with transaction.atomic():
+            SeatManager.lock_showtime(showtime_id)
+            existing_pending = Booking.objects.filter(
+                user=request.user,
+                showtime=showtime,
+                status='PENDING'
+            ).order_by()
+            for old_booking in existing_pending:
+                logger.info(f"🧹 Cancelling existing PENDING booking {old_booking.booking_number} before creating new one")
+                old_booking.status = 'CANCELLED'
+                old_booking.save()
+                SeatManager.release_seats(showtime_id, old_booking.seats, user_id=request.user.id)
+
+            success = SeatManager.reserve_seats(showtime_id, seat_ids, request.user.id)
+
+            if not success:
+                 print(f"⚠️ SAFETY CHECK FAILED: User {request.user.id} tried to book seats {seat_ids} for showtime {showtime_id} but they were already taken.")
+                 return JsonResponse({
+                     'success': False,
+                     'error': 'Oh no! One or more of these seats were just taken by another user.'
+                 }, status=400)
+
+            price_details = PriceCalculator.calculate_booking_amount(showtime, len(seat_ids))
+
+            booking = Booking.objects.create(
+                user=request.user,
+                showtime=showtime,
+                seats=seat_ids,
+                total_seats=len(seat_ids),
+                base_price=price_details['base_price'],
+                convenience_fee=price_details['convenience_fee'],
+                tax_amount=price_details['tax_amount'],
+                total_amount=price_details['total_amount'],
+                status='PENDING'
+            )
         
         order_data = razorpay_client.create_order(
             amount=booking.total_amount,
@@ -403,10 +407,11 @@ def payment_success(request, booking_id):
             booking.confirmed_at = timezone.now()
             
             booking.save()
+            BOOKING_CONFIRMATIONS.inc(path='redirect')
         
         logger.info(f"✅ Booking {booking.booking_number} confirmed and payment received")
         
-        SeatManager.confirm_seats(booking.showtime.id, booking.seats)
+        SeatManager.confirm_seats(booking.showtime.id, booking.seats, user_id=booking.user_id)
         
         session_key = f'payment_page_visited_{booking.id}'
         if session_key in request.session:
@@ -529,8 +534,9 @@ def razorpay_webhook(request):
                     booking.status = 'CONFIRMED'
                     booking.confirmed_at = timezone.now()
                     booking.save()
+                    BOOKING_CONFIRMATIONS.inc(path='webhook')
                     
-                    SeatManager.confirm_seats(booking.showtime.id, booking.seats)
+                    SeatManager.confirm_seats(booking.showtime.id, booking.seats, user_id=booking.user_id)
                     
                     from .email_utils import send_booking_confirmation_email
                     send_booking_confirmation_email(booking.id)
@@ -552,10 +558,16 @@ def razorpay_webhook(request):
 @email_verified_required
 def my_bookings(request):
 
-    bookings = Booking.objects.filter(user=request.user).order_by('-created_at')
-    
+    try:
+        page = max(int(request.GET.get('page', 1)), 1)
+    except ValueError:
+        page = 1
+    bookings, has_next = BookingArchiver.for_user(request.user, page=page)
+
     context = {
         'bookings': bookings,
+        'page': page,
+        'has_next': has_next,
         'now': timezone.now(),
     }
     
@@ -564,7 +576,11 @@ def my_bookings(request):
 @email_verified_required
 def booking_detail(request, booking_id):
 
-    booking = get_object_or_404(Booking, id=booking_id, user=request.user)
+    related = ('showtime__movie', 'showtime__screen__theater__city')
+    booking = Booking.objects.select_related(*related).filter(id=booking_id, user=request.user).first()
+    if booking is None:
+        # Archived bookings keep their id, so old ticket links still open
+        booking = get_object_or_404(BookingArchive.objects.select_related(*related), id=booking_id, user=request.user)
     
     context = {
         'booking': booking,
@@ -8,6 +8,7 @@ from django.views.decorators.http import require_POST
 
 from .models import Booking, Transaction
 from .services import BookingService, PaymentVerificationService
+from moviebooking.metrics import BOOKING_CONFIRMATIONS
 
 logger = logging.getLogger(__name__)
 
@@ -88,6 +89,7 @@ def handle_payment_captured(webhook_data):
         )
         
         if success:
+            BOOKING_CONFIRMATIONS.inc(path='webhook')
             Transaction.objects.create(
                 booking=booking,
                 transaction_id=payment_id,
@@ -213,6 +215,7 @@ def payment_callback(request):
         )
         
         if success:
+            BOOKING_CONFIRMATIONS.inc(path='callback')
             logger.info(f"Payment confirmed via callback for booking {booking.booking_number}")
             from django.shortcuts import redirect
             return redirect('booking_detail', booking_id=booking.id)
@@ -12,5 +12,8 @@ python manage.py collectstatic --no-input
 # Run migrations
 python manage.py migrate
 
+# Build the occupancy snapshot so the first dashboard read doesn't wait for it
+python manage.py warm_occupancy || true
+
 # Create superuser if it doesn't exist
 echo "from django.contrib.auth import get_user_model; User = get_user_model(); User.objects.filter(username='admin').exists() or User.objects.create_superuser('admin', 'admin@example.com', 'admin123', is_staff=True, is_superuser=True)" | python manage.py shell
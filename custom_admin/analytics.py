@@ -0,0 +1,334 @@
+import hashlib
+import json
+import logging
+from datetime import datetime, time, timedelta
+
+from django.core.cache import cache
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncDate, TruncHour, TruncWeek
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+logger = logging.getLogger(__name__)
+
+BUCKETS = ('day', 'week', 'hour')
+
+def _bucket_keys(start_date, end_date, bucket):
+
+    if bucket == 'hour':
+        tz = timezone.get_current_timezone()
+        current = timezone.make_aware(datetime.combine(start_date, time.min), tz)
+        last = timezone.make_aware(datetime.combine(end_date, time(23)), tz)
+        step = timedelta(hours=1)
+    elif bucket == 'week':
+        current = start_date - timedelta(days=start_date.weekday())  # Monday, like TruncWeek
+        last = end_date
+        step = timedelta(weeks=1)
+    else:
+        current = start_date
+        last = end_date
+        step = timedelta(days=1)
+
+    keys = []
+    while current <= last:
+        keys.append(current)
+        current += step
+    return keys
+
+def _normalize(value, bucket):
+
+    if bucket == 'hour':
+        return timezone.localtime(value) if timezone.is_aware(value) else timezone.make_aware(value)
+    if isinstance(value, datetime):
+        return timezone.localtime(value).date() if timezone.is_aware(value) else value.date()
+    return value
+
+def time_series(bookings, start_date, end_date, bucket='day', archived=None):
+
+    # One GROUP BY query for the whole range (plus one over the archive when the range reaches it);
+    # empty buckets are zero-filled here, so the query count does not depend on how many days are requested.
+    if bucket not in BUCKETS:
+        bucket = 'day'
+
+    trunc = {'day': TruncDate, 'week': TruncWeek, 'hour': TruncHour}[bucket]
+
+    totals = {}
+    for queryset in [bookings] if archived is None else [bookings, archived]:
+        rows = queryset.filter(
+            created_at__date__gte=start_date,
+            created_at__date__lte=end_date,
+        ).annotate(
+            bucket=trunc('created_at')
+        ).values('bucket').annotate(
+            revenue=Sum('total_amount'),
+            bookings=Count('id'),
+        ).order_by('bucket')
+
+        for row in rows:
+            total = totals.setdefault(_normalize(row['bucket'], bucket), {'revenue': 0, 'bookings': 0})
+            total['revenue'] += row['revenue'] or 0
+            total['bookings'] += row['bookings']
+
+    return [
+        {
+            'bucket': key,
+            'revenue': float(totals[key]['revenue'] or 0) if key in totals else 0.0,
+            'bookings': totals[key]['bookings'] if key in totals else 0,
+        }
+        for key in _bucket_keys(start_date, end_date, bucket)
+    ]
+
+def rollup_series(rollups, start_date, end_date, bucket='day'):
+
+    # Same output as time_series(), read from DailySalesRollup instead of scanning Booking.
+    # Rollups are per day, so hourly charts still have to go through time_series().
+    if bucket not in ('day', 'week'):
+        bucket = 'day'
+
+    trunc = TruncWeek('date') if bucket == 'week' else F('date')
+
+    rows = rollups.filter(
+        date__gte=start_date,
+        date__lte=end_date,
+    ).annotate(
+        bucket=trunc
+    ).values('bucket').annotate(
+        total_revenue=Sum('revenue'),
+        total_bookings=Sum('bookings'),
+    ).order_by('bucket')
+
+    totals = {_normalize(row['bucket'], bucket): row for row in rows}
+
+    return [
+        {
+            'bucket': key,
+            'revenue': float(totals[key]['total_revenue'] or 0) if key in totals else 0.0,
+            'bookings': (totals[key]['total_bookings'] or 0) if key in totals else 0,
+        }
+        for key in _bucket_keys(start_date, end_date, bucket)
+    ]
+
+class AnalyticsEngine:
+
+    SERIES_DAYS = 30
+    TOP_LIMIT = 5
+    RECENT_LIMIT = 5
+    CACHE_TIMEOUT = 60
+    VERSION_KEY = 'admin_analytics_version'
+
+    @staticmethod
+    def int_or_none(value):
+        try:
+            return int(value) if value not in (None, '') else None
+        except (TypeError, ValueError):
+            return None
+
+    @staticmethod
+    def normalize(params, movie_param='movie_id', theater_param='theater_id'):
+
+        # Every dashboard endpoint funnels its query string through here, so equal
+        # filters always produce the same spec (and hit the same cache entry)
+        today = timezone.localdate()
+        period = params.get('period', 'all')
+        date_from = parse_date(params.get('date_from') or '')
+        date_to = parse_date(params.get('date_to') or '')
+
+        if date_from or date_to:
+            period = 'custom'
+        elif period == 'today':
+            date_from = date_to = today
+        elif period == 'week':
+            date_from = today - timedelta(days=7)
+        elif period == 'month':
+            date_from = today - timedelta(days=30)
+        else:
+            period = 'all'
+
+        return {
+            'movie_id': AnalyticsEngine.int_or_none(params.get(movie_param)),
+            'theater_id': AnalyticsEngine.int_or_none(params.get(theater_param)),
+            'period': period,
+            'date_from': date_from.isoformat() if date_from else None,
+            'date_to': date_to.isoformat() if date_to else None,
+        }
+
+    @staticmethod
+    def rollup_filters(spec, with_period=True):
+
+        filters = Q()
+        if spec['movie_id']:
+            filters &= Q(movie_id=spec['movie_id'])
+        if spec['theater_id']:
+            filters &= Q(theater_id=spec['theater_id'])
+        if with_period and spec['date_from']:
+            filters &= Q(date__gte=spec['date_from'])
+        if with_period and spec['date_to']:
+            filters &= Q(date__lte=spec['date_to'])
+        return filters
+
+    @staticmethod
+    def booking_filters(spec, with_period=True):
+
+        filters = Q(status='CONFIRMED')
+        if spec['movie_id']:
+            filters &= Q(showtime__movie_id=spec['movie_id'])
+        if spec['theater_id']:
+            filters &= Q(showtime__screen__theater_id=spec['theater_id'])
+        if with_period and spec['date_from']:
+            filters &= Q(created_at__date__gte=spec['date_from'])
+        if with_period and spec['date_to']:
+            filters &= Q(created_at__date__lte=spec['date_to'])
+        return filters
+
+    @staticmethod
+    def cache_key(name, spec, *extra):
+
+        try:
+            version = cache.get(AnalyticsEngine.VERSION_KEY, 0)
+        except Exception as e:
+            logger.error(f"Analytics cache version read error: {e}")
+            version = 0
+        digest = hashlib.md5(json.dumps([spec, *extra], sort_keys=True, default=str).encode()).hexdigest()
+        return f"admin_analytics_{name}_v{version}_{digest}"
+
+    @staticmethod
+    def invalidate():
+
+        # Bumping the version orphans every cached report at once; stale keys age out via TTL
+        try:
+            cache.incr(AnalyticsEngine.VERSION_KEY)
+        except ValueError:
+            cache.set(AnalyticsEngine.VERSION_KEY, 1, timeout=None)
+        except Exception as e:
+            logger.error(f"Analytics cache invalidation error: {e}")
+
+    @staticmethod
+    def _cached(name, spec, compute, *extra):
+
+        key = AnalyticsEngine.cache_key(name, spec, *extra)
+        try:
+            result = cache.get(key)
+        except Exception as e:
+            logger.error(f"Analytics cache read error: {e}")
+            return compute()
+
+        if result is None:
+            result = compute()
+            try:
+                cache.set(key, result, timeout=AnalyticsEngine.CACHE_TIMEOUT)
+            except Exception as e:
+                logger.error(f"Analytics cache write error: {e}")
+        return result
+
+    @staticmethod
+    def totals(spec):
+
+        # All-time, in-period and today's figures in one conditional aggregate
+        from bookings.models import DailySalesRollup
+
+        today = timezone.localdate()
+        period = AnalyticsEngine.rollup_filters(spec)
+        row = DailySalesRollup.objects.filter(
+            AnalyticsEngine.rollup_filters(spec, with_period=False)
+        ).aggregate(
+            total_revenue=Sum('revenue'),
+            total_bookings=Sum('bookings'),
+            period_revenue=Sum('revenue', filter=period),
+            period_bookings=Sum('bookings', filter=period),
+            today_revenue=Sum('revenue', filter=period & Q(date=today)),
+            today_bookings=Sum('bookings', filter=period & Q(date=today)),
+        )
+        return {
+            key: float(value or 0) if key.endswith('revenue') else (value or 0)
+            for key, value in row.items()
+        }
+
+    @staticmethod
+    def series(spec, start_date, end_date, bucket='day'):
+
+        from bookings.archive import BookingArchiver
+        from bookings.models import Booking, BookingArchive, DailySalesRollup
+
+        def compute():
+            if bucket == 'hour':
+                filters = AnalyticsEngine.booking_filters(spec, with_period=False)
+                return time_series(
+                    Booking.objects.filter(filters), start_date, end_date, bucket,
+                    archived=BookingArchive.objects.filter(filters) if BookingArchiver.reaches(start_date) else None,
+                )
+            return rollup_series(
+                DailySalesRollup.objects.filter(AnalyticsEngine.rollup_filters(spec, with_period=False)),
+                start_date, end_date, bucket
+            )
+
+        return AnalyticsEngine._cached('series', spec, compute, start_date, end_date, bucket)
+
+    @staticmethod
+    def top_movies(spec):
+
+        from bookings.models import DailySalesRollup
+        from .rankings import RankingService
+
+        return RankingService.top_movies(
+            DailySalesRollup.objects.filter(AnalyticsEngine.rollup_filters(spec)),
+            limit=AnalyticsEngine.TOP_LIMIT,
+        )
+
+    @staticmethod
+    def top_theaters(spec):
+
+        from bookings.models import DailySalesRollup
+        from .rankings import RankingService
+
+        return RankingService.top_theaters(
+            DailySalesRollup.objects.filter(AnalyticsEngine.rollup_filters(spec)),
+            limit=AnalyticsEngine.TOP_LIMIT,
+        )
+
+    @staticmethod
+    def recent_bookings(spec):
+
+        from bookings.archive import BookingArchiver
+        from bookings.models import Booking, BookingArchive
+
+        def latest(model):
+            return list(model.objects.filter(AnalyticsEngine.booking_filters(spec)).values(
+                'id', 'user__username', 'showtime__movie__title', 'total_amount', 'created_at'
+            ).order_by('-created_at')[:AnalyticsEngine.RECENT_LIMIT])
+
+        rows = latest(Booking)
+        # The archive only matters if it may hold something newer than the oldest row we would show
+        since = timezone.localdate(rows[-1]['created_at']) if len(rows) == AnalyticsEngine.RECENT_LIMIT else spec['date_from']
+        if BookingArchiver.reaches(since):
+            rows = sorted(rows + latest(BookingArchive), key=lambda row: row['created_at'], reverse=True)
+            rows = rows[:AnalyticsEngine.RECENT_LIMIT]
+
+        return [
+            {
+                'id': row['id'],
+                'user': row['user__username'],
+                'movie': row['showtime__movie__title'],
+                'amount': float(row['total_amount']),
+                'date': timezone.localtime(row['created_at']).strftime('%Y-%m-%d %H:%M'),
+            }
+            for row in rows
+        ]
+
+    @staticmethod
+    def report(spec):
+
+        # Everything the dashboard shows in a fixed handful of queries, cached per filter spec
+        def compute():
+            today = timezone.localdate()
+            return {
+                'spec': spec,
+                'totals': AnalyticsEngine.totals(spec),
+                'series': AnalyticsEngine.series(
+                    spec, today - timedelta(days=AnalyticsEngine.SERIES_DAYS - 1), today
+                ),
+                'top_movies': AnalyticsEngine.top_movies(spec),
+                'top_theaters': AnalyticsEngine.top_theaters(spec),
+                'recent_bookings': AnalyticsEngine.recent_bookings(spec),
+            }
+
+        return AnalyticsEngine._cached('report', spec, compute)
@@ -0,0 +1,128 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+from bookings.models import Booking
+from custom_admin.rankings import RankingService
+from movies.models import Movie
+from movies.theater_models import City, Theater, Screen, Showtime
+
+class Rollback(Exception):
+    pass
+
+class Command(BaseCommand):
+    help = 'Benchmark top movie/theater rankings on a seeded dataset (rolled back afterwards)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', default='2000,8000,32000', help='Comma separated booking counts to seed')
+        parser.add_argument('--movies', type=int, default=40)
+        parser.add_argument('--theaters', type=int, default=15)
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per size (median is reported)')
+        parser.add_argument('--legacy', action='store_true', help='Also time the old semi-join ranking queries')
+
+    def _time(self, func, repeat):
+
+        samples = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            func()
+            samples.append(time.perf_counter() - started)
+        return statistics.median(samples) * 1000
+
+    def _seed_dimensions(self, movies, theaters):
+
+        user = User.objects.create_user(username='ranking-benchmark')
+        city = City.objects.create(name='Benchmark City')
+        today = timezone.now().date()
+
+        movie_objs = [
+            Movie.objects.create(title=f'Benchmark Movie {i}', description='-', release_date=today, duration=120)
+            for i in range(movies)
+        ]
+        showtimes = []
+        for i in range(theaters):
+            theater = Theater.objects.create(name=f'Benchmark Theater {i}', city=city, address='-')
+            screen = Screen.objects.create(theater=theater, name='Screen 1')
+            showtimes += [
+                Showtime.objects.create(movie=movie, screen=screen, date=today, start_time='14:00', end_time='16:00')
+                for movie in movie_objs
+            ]
+        return user, showtimes
+
+    def _seed_bookings(self, user, showtimes, count, offset):
+
+        rng = random.Random(offset)
+        Booking.objects.bulk_create([
+            Booking(
+                booking_number=f'BENCH-{offset + i}',
+                user=user,
+                showtime=rng.choice(showtimes),
+                seats=['A1'],
+                total_seats=1,
+                base_price=200,
+                total_amount=rng.randint(150, 900),
+                status='CONFIRMED' if rng.random() < 0.8 else 'CANCELLED',
+            )
+            for i in range(count)
+        ], batch_size=2000)
+
+    def _legacy(self, bookings):
+
+        list(Movie.objects.filter(showtime__booking__in=bookings).annotate(
+            booking_count=Count('showtime__booking', filter=Q(showtime__booking__in=bookings))
+        ).distinct().order_by('-booking_count')[:5])
+        list(Theater.objects.filter(screen__showtime__booking__in=bookings).annotate(
+            booking_count=Count('screen__showtime__booking', filter=Q(screen__showtime__booking__in=bookings)),
+            revenue=Sum('screen__showtime__booking__total_amount', filter=Q(screen__showtime__booking__in=bookings))
+        ).distinct().order_by('-revenue')[:5])
+
+    def handle(self, *args, **options):
+
+        sizes = sorted(int(size) for size in options['sizes'].split(',') if size.strip())
+        results = []
+
+        try:
+            with transaction.atomic():
+                user, showtimes = self._seed_dimensions(options['movies'], options['theaters'])
+                seeded = 0
+
+                for size in sizes:
+                    self._seed_bookings(user, showtimes, size - seeded, seeded)
+                    seeded = size
+
+                    bookings = Booking.objects.filter(status='CONFIRMED')
+                    ranking_ms = self._time(
+                        lambda: (RankingService.top_movies(bookings), RankingService.top_theaters(bookings)),
+                        options['repeat']
+                    )
+                    legacy_ms = self._time(lambda: self._legacy(bookings), options['repeat']) if options['legacy'] else None
+                    results.append((size, ranking_ms, legacy_ms))
+
+                    line = f'📊 {size:>8} bookings: ranking {ranking_ms:8.2f} ms ({ranking_ms * 1000 / size:.2f} µs/row)'
+                    if legacy_ms is not None:
+                        line += f' | legacy {legacy_ms:8.2f} ms'
+                    self.stdout.write(line)
+
+                raise Rollback()
+        except Rollback:
+            pass
+
+        if len(results) < 2:
+            return
+
+        # Linear scaling means the per-row cost stays flat as the dataset grows
+        smallest, largest = results[0], results[-1]
+        per_row_growth = (largest[1] / largest[0]) / (smallest[1] / smallest[0])
+        if per_row_growth <= 2:
+            self.stdout.write(self.style.SUCCESS(
+                f'✅ Per-row cost changed {per_row_growth:.2f}x over a {largest[0] // smallest[0]}x larger dataset (linear)'
+            ))
+        else:
+            self.stdout.write(self.style.WARNING(
+                f'⚠️ Per-row cost grew {per_row_growth:.2f}x over a {largest[0] // smallest[0]}x larger dataset'
+            ))
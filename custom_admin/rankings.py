@@ -0,0 +1,55 @@
+from django.db.models import Count, Sum
+
+class RankingService:
+
+    # source -> (movie key, theater key, bookings aggregate, revenue aggregate)
+    SOURCES = {
+        'Booking': ('showtime__movie_id', 'showtime__screen__theater_id', lambda: Count('id'), lambda: Sum('total_amount')),
+        'DailySalesRollup': ('movie_id', 'theater_id', lambda: Sum('bookings'), lambda: Sum('revenue')),
+    }
+    ORDERINGS = ('bookings', 'revenue')
+
+    @staticmethod
+    def _rank(queryset, dimension, order_by, limit):
+
+        # One GROUP BY over the already-filtered rows, no joins to the ranked table
+        movie_key, theater_key, bookings, revenue = RankingService.SOURCES[queryset.model.__name__]
+        key = movie_key if dimension == 'movie' else theater_key
+        order_by = order_by if order_by in RankingService.ORDERINGS else 'bookings'
+        secondary = 'revenue' if order_by == 'bookings' else 'bookings'
+
+        # Aliased so they cannot clash with the rollup's own bookings/revenue columns
+        return list(
+            queryset.order_by().values(key).annotate(
+                rank_bookings=bookings(),
+                rank_revenue=revenue(),
+            ).filter(rank_bookings__gt=0).order_by(
+                f'-rank_{order_by}', f'-rank_{secondary}', key
+            ).values_list(key, 'rank_bookings', 'rank_revenue')[:limit]
+        )
+
+    @staticmethod
+    def top_movies(queryset, limit=5, order_by='bookings'):
+
+        from movies.models import Movie
+
+        rows = RankingService._rank(queryset, 'movie', order_by, limit)
+        titles = dict(Movie.objects.filter(id__in=[row[0] for row in rows]).values_list('id', 'title'))
+
+        return [
+            {'id': movie_id, 'title': titles.get(movie_id, ''), 'booking_count': count, 'revenue': float(revenue or 0)}
+            for movie_id, count, revenue in rows
+        ]
+
+    @staticmethod
+    def top_theaters(queryset, limit=5, order_by='revenue'):
+
+        from movies.theater_models import Theater
+
+        rows = RankingService._rank(queryset, 'theater', order_by, limit)
+        names = dict(Theater.objects.filter(id__in=[row[0] for row in rows]).values_list('id', 'name'))
+
+        return [
+            {'id': theater_id, 'name': names.get(theater_id, ''), 'booking_count': count, 'revenue': float(revenue or 0)}
+            for theater_id, count, revenue in rows
+        ]
@@ -0,0 +1,479 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.contrib.auth.models import User
+from django.utils import timezone
+from bookings.models import Booking, DailySalesRollup
+from bookings.rollups import SalesRollup
+from movies.models import Movie
+from movies.theater_models import City, Theater, Screen, Showtime
+from .analytics import AnalyticsEngine, rollup_series, time_series
+from .rankings import RankingService
+from moviebooking.performance import PerformanceRecorder
+from moviebooking.metrics import REGISTRY, SEAT_HOLDS, cache_family
+from bookings.utils import SeatManager
+from bookings.tests import QueryBudgetMixin
+
+class AnalyticsTestMixin:
+
+    def setUp(self):
+
+        cache.clear()
+        self.staff = User.objects.create_user(username='staff', password='testpass123', is_staff=True)
+        self.customer = User.objects.create_user(username='customer', password='testpass123')
+        self.movie = Movie.objects.create(
+            title='Test Movie',
+            description='Test',
+            release_date=timezone.now().date(),
+            duration=120
+        )
+        self.city = City.objects.create(name='Test City')
+        self.theater = Theater.objects.create(name='Test Theater', city=self.city, address='123 Test St')
+        self.screen = Screen.objects.create(theater=self.theater, name='Screen 1')
+        self.showtime = Showtime.objects.create(
+            movie=self.movie,
+            screen=self.screen,
+            date=timezone.now().date(),
+            start_time='14:00',
+            end_time='16:00'
+        )
+
+    def make_booking(self, days_ago=0, amount=300, status='CONFIRMED'):
+
+        booking = Booking.objects.create(
+            user=self.customer,
+            showtime=self.showtime,
+            seats=['A1'],
+            total_seats=1,
+            base_price=200,
+            total_amount=amount,
+            status=status
+        )
+        Booking.objects.filter(pk=booking.pk).update(created_at=timezone.now() - timedelta(days=days_ago))
+        # created_at was moved behind the signal's back, so resync the rollup
+        SalesRollup.rebuild()
+        return booking
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class TimeSeriesTests(AnalyticsTestMixin, TestCase):
+
+    def test_daily_series_is_zero_filled(self):
+
+        self.make_booking(days_ago=0, amount=300)
+        self.make_booking(days_ago=0, amount=200)
+        self.make_booking(days_ago=2, amount=100)
+        self.make_booking(days_ago=1, amount=999, status='PENDING')
+
+        today = timezone.now().date()
+        series = time_series(Booking.objects.filter(status='CONFIRMED'), today - timedelta(days=3), today)
+
+        self.assertEqual([point['revenue'] for point in series], [0.0, 100.0, 0.0, 500.0])
+        self.assertEqual([point['bookings'] for point in series], [0, 1, 0, 2])
+
+    def test_query_count_is_constant_in_range(self):
+
+        today = timezone.now().date()
+        for days in (7, 365):
+            with self.assertNumQueries(1):
+                series = time_series(Booking.objects.all(), today - timedelta(days=days), today)
+            self.assertEqual(len(series), days + 1)
+
+    def test_weekly_and_hourly_buckets(self):
+
+        self.make_booking(days_ago=0, amount=300)
+        today = timezone.now().date()
+
+        weekly = time_series(Booking.objects.all(), today - timedelta(days=20), today, bucket='week')
+        hourly = time_series(Booking.objects.all(), today, today, bucket='hour')
+
+        self.assertEqual(sum(point['revenue'] for point in weekly), 300.0)
+        self.assertEqual(len(hourly), 24)
+        self.assertEqual(sum(point['bookings'] for point in hourly), 1)
+
+    def test_api_revenue_uses_single_series_query(self):
+
+        self.make_booking(days_ago=1, amount=450)
+        self.client.login(username='staff', password='testpass123')
+
+        response = self.client.get('/custom-admin/api/revenue/', {'days': 90})
+
+        data = response.json()
+        self.assertEqual(len(data['dates']), 91)
+        self.assertEqual(data['revenues'][-2], 450.0)
+        self.assertEqual(data['bookings'][-2], 1)
+
+    def test_dashboard_renders_thirty_day_chart(self):
+
+        self.make_booking(days_ago=0, amount=300)
+        self.client.login(username='staff', password='testpass123')
+
+        response = self.client.get('/custom-admin/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['revenue_data']), 30)
+        self.assertEqual(response.context['revenue_data'][-1]['revenue'], 300.0)
+
+class SalesRollupTests(AnalyticsTestMixin, TestCase):
+
+    def test_confirm_and_cancel_adjust_rollup(self):
+
+        booking = Booking.objects.create(
+            user=self.customer,
+            showtime=self.showtime,
+            seats=['A1', 'A2'],
+            total_seats=2,
+            base_price=200,
+            total_amount=400,
+            status='PENDING'
+        )
+        self.assertFalse(DailySalesRollup.objects.exists())
+
+        booking.status = 'CONFIRMED'
+        booking.save()
+        rollup = DailySalesRollup.objects.get(movie=self.movie, theater=self.theater)
+        self.assertEqual((rollup.bookings, rollup.seats, float(rollup.revenue)), (1, 2, 400.0))
+
+        booking.status = 'CANCELLED'
+        booking.save()
+        rollup.refresh_from_db()
+        self.assertEqual((rollup.bookings, rollup.seats, float(rollup.revenue)), (0, 0, 0.0))
+
+    def test_delete_confirmed_booking_subtracts(self):
+
+        booking = Booking.objects.create(
+            user=self.customer,
+            showtime=self.showtime,
+            seats=['A1'],
+            total_seats=1,
+            base_price=200,
+            total_amount=250,
+            status='CONFIRMED'
+        )
+        Booking.objects.get(pk=booking.pk).delete()
+
+        rollup = DailySalesRollup.objects.get(movie=self.movie)
+        self.assertEqual(rollup.bookings, 0)
+        self.assertEqual(float(rollup.revenue), 0.0)
+
+    def test_rollup_series_matches_booking_series(self):
+
+        self.make_booking(days_ago=0, amount=300)
+        self.make_booking(days_ago=3, amount=150)
+        self.make_booking(days_ago=3, amount=50)
+        self.make_booking(days_ago=1, amount=999, status='PENDING')
+
+        today = timezone.now().date()
+        start_date = today - timedelta(days=10)
+
+        for bucket in ('day', 'week'):
+            self.assertEqual(
+                rollup_series(DailySalesRollup.objects.all(), start_date, today, bucket),
+                time_series(Booking.objects.filter(status='CONFIRMED'), start_date, today, bucket)
+            )
+
+    def test_api_stats_reads_rollup_totals(self):
+
+        self.make_booking(days_ago=0, amount=300)
+        self.make_booking(days_ago=10, amount=200)
+        self.client.login(username='staff', password='testpass123')
+
+        data = self.client.get('/custom-admin/api/stats/', {'period': 'week'}).json()
+
+        self.assertEqual(data['total_revenue'], 500.0)
+        self.assertEqual(data['total_bookings'], 2)
+        self.assertEqual(data['today_revenue'], 300.0)
+        self.assertEqual(data['today_bookings'], 1)
+
+class AnalyticsEngineTests(AnalyticsTestMixin, TestCase):
+
+    def test_equivalent_filters_normalize_to_same_spec(self):
+
+        first = AnalyticsEngine.normalize({'period': 'week', 'movie_id': str(self.movie.id), 'theater_id': ''})
+        second = AnalyticsEngine.normalize({'movie': self.movie.id, 'period': 'week'}, movie_param='movie')
+
+        self.assertEqual(first, second)
+        self.assertEqual(AnalyticsEngine.normalize({'movie_id': 'abc', 'period': 'bogus'})['movie_id'], None)
+        self.assertEqual(AnalyticsEngine.normalize({'period': 'bogus'})['period'], 'all')
+
+    def test_report_is_cached_per_spec(self):
+
+        self.make_booking(days_ago=0, amount=300)
+        spec = AnalyticsEngine.normalize({})
+
+        # totals, series, two rankings (grouped + names) and recent bookings; with fewer live
+        # bookings than the list holds, recent bookings also checks whether the archive reaches back
+        with self.assertNumQueries(8):
+            report = AnalyticsEngine.report(spec)
+        with self.assertNumQueries(0):
+            self.assertEqual(AnalyticsEngine.report(spec), report)
+
+        self.assertEqual(report['totals']['total_revenue'], 300.0)
+        self.assertEqual(report['top_movies'][0]['title'], 'Test Movie')
+        self.assertEqual(report['top_theaters'][0]['revenue'], 300.0)
+        self.assertEqual(report['recent_bookings'][0]['user'], 'customer')
+
+    def test_confirmation_invalidates_cached_report(self):
+
+        spec = AnalyticsEngine.normalize({'period': 'today'})
+        self.assertEqual(AnalyticsEngine.report(spec)['totals']['period_bookings'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.objects.create(
+                user=self.customer,
+                showtime=self.showtime,
+                seats=['A1'],
+                total_seats=1,
+                base_price=200,
+                total_amount=250,
+                status='CONFIRMED'
+            )
+
+        totals = AnalyticsEngine.report(spec)['totals']
+        self.assertEqual(totals['period_bookings'], 1)
+        self.assertEqual(totals['today_revenue'], 250.0)
+
+    def test_filtered_endpoint_limits_totals_to_range(self):
+
+        self.make_booking(days_ago=0, amount=300)
+        self.make_booking(days_ago=5, amount=200)
+        self.client.login(username='staff', password='testpass123')
+
+        yesterday = timezone.now().date() - timedelta(days=1)
+        data = self.client.get('/custom-admin/api/dashboard-filtered/', {
+            'date_to': yesterday.isoformat(),
+            'movie': self.movie.id,
+        }).json()
+
+        self.assertEqual(data['total_revenue'], 200.0)
+        self.assertEqual(data['today_revenue'], 0.0)
+        self.assertEqual(data['top_movies'], [{'title': 'Test Movie', 'bookings': 1}])
+
+class RankingServiceTests(AnalyticsTestMixin, TestCase):
+
+    def setUp(self):
+
+        super().setUp()
+        self.other_movie = Movie.objects.create(
+            title='Other Movie',
+            description='Test',
+            release_date=timezone.now().date(),
+            duration=90
+        )
+        self.other_theater = Theater.objects.create(name='Other Theater', city=self.city, address='456 Test St')
+        other_screen = Screen.objects.create(theater=self.other_theater, name='Screen 1')
+        self.other_showtime = Showtime.objects.create(
+            movie=self.other_movie,
+            screen=other_screen,
+            date=timezone.now().date(),
+            start_time='18:00',
+            end_time='20:00'
+        )
+
+        # Test Movie: two cheap bookings; Other Movie: one expensive booking
+        self.make_booking(amount=100)
+        self.make_booking(amount=100)
+        self.make_booking(amount=100, status='CANCELLED')
+        booking = self.make_booking(amount=900)
+        Booking.objects.filter(pk=booking.pk).update(showtime=self.other_showtime)
+        SalesRollup.rebuild()
+
+    def test_rankings_from_bookings_use_two_queries_each(self):
+
+        bookings = Booking.objects.filter(status='CONFIRMED')
+
+        with self.assertNumQueries(2):
+            movies = RankingService.top_movies(bookings)
+        with self.assertNumQueries(2):
+            theaters = RankingService.top_theaters(bookings)
+
+        self.assertEqual([m['title'] for m in movies], ['Test Movie', 'Other Movie'])
+        self.assertEqual([m['booking_count'] for m in movies], [2, 1])
+        self.assertEqual([t['name'] for t in theaters], ['Other Theater', 'Test Theater'])
+        self.assertEqual(theaters[0]['revenue'], 900.0)
+
+    def test_order_by_revenue_and_rollup_source_agree(self):
+
+        from_bookings = RankingService.top_movies(Booking.objects.filter(status='CONFIRMED'), order_by='revenue')
+        from_rollup = RankingService.top_movies(DailySalesRollup.objects.all(), order_by='revenue')
+
+        self.assertEqual(from_bookings, from_rollup)
+        self.assertEqual(from_bookings[0]['title'], 'Other Movie')
+        self.assertEqual(RankingService.top_movies(Booking.objects.none()), [])
+
+class PerformanceMiddlewareTests(AnalyticsTestMixin, TestCase):
+
+    def setUp(self):
+
+        super().setUp()
+        PerformanceRecorder.reset()
+        self.client.login(username='staff', password='testpass123')
+
+    def test_server_timing_header_reports_queries_and_cache(self):
+
+        response = self.client.get('/custom-admin/api/stats/')
+
+        self.assertIn('db;dur=', response['Server-Timing'])
+        self.assertIn('cache;dur=', response['Server-Timing'])
+        self.assertGreater(int(response['X-Query-Count']), 0)
+
+    def test_staff_endpoint_aggregates_per_view(self):
+
+        for _ in range(3):
+            self.client.get('/custom-admin/api/stats/')
+
+        views = self.client.get('/custom-admin/api/performance/').json()['views']
+
+        stats = views['custom_admin:api_stats']
+        self.assertEqual(stats['samples'], 3)
+        self.assertLessEqual(stats['queries']['p50'], stats['queries']['max'])
+        self.assertGreater(stats['cache_calls']['max'], 0)
+
+    @override_settings(PERF_BUDGETS={'default': {'queries': 0}})
+    def test_budget_violations_are_counted(self):
+
+        with self.assertLogs('moviebooking.performance', level='WARNING'):
+            self.client.get('/custom-admin/api/stats/')
+
+        stats = PerformanceRecorder.report()['custom_admin:api_stats']
+        self.assertEqual(stats['over_budget'], 1)
+        self.assertEqual(stats['budget'], {'queries': 0})
+
+    def test_endpoint_is_staff_only(self):
+
+        self.client.login(username='customer', password='testpass123')
+        response = self.client.get('/custom-admin/api/performance/')
+        self.assertEqual(response.status_code, 302)
+
+class MetricsEndpointTests(AnalyticsTestMixin, TestCase):
+
+    def setUp(self):
+
+        super().setUp()
+        self.metrics_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.metrics_dir, ignore_errors=True)
+        overridden = self.settings(METRICS_DIR=self.metrics_dir, METRICS_TOKEN='secret')
+        overridden.enable()
+        self.addCleanup(overridden.disable)
+
+    def sample(self, line_prefix):
+
+        body = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret').content.decode()
+        for line in body.splitlines():
+            if line.startswith(line_prefix + ' '):
+                return float(line.rsplit(' ', 1)[1])
+        return 0.0
+
+    def test_booking_funnel_counters(self):
+
+        created = self.sample('moviebooking_bookings_created_total')
+        confirmed = self.sample('moviebooking_booking_confirmations_total{path="admin"}')
+        expired = self.sample('moviebooking_booking_releases_total{status="EXPIRED"}')
+
+        pending = self.make_booking(status='PENDING')
+        pending.status = 'EXPIRED'
+        pending.save()
+        User.objects.create_superuser(username='root', password='testpass123')
+        self.client.login(username='root', password='testpass123')
+        self.client.post('/admin/bookings/booking/', {
+            'action': 'confirm_payments', '_selected_action': [self.make_booking(status='PENDING').pk],
+        })
+
+        self.assertEqual(self.sample('moviebooking_bookings_created_total'), created + 2)
+        self.assertEqual(self.sample('moviebooking_booking_confirmations_total{path="admin"}'), confirmed + 1)
+        self.assertEqual(self.sample('moviebooking_booking_releases_total{status="EXPIRED"}'), expired + 1)
+
+    @override_settings(SEAT_STORE={'BACKEND': 'legacy'})  # holds that live in the cache, not in booking rows
+    def test_seat_hold_results(self):
+
+        success = self.sample('moviebooking_seat_holds_total{result="success"}')
+        conflict = self.sample('moviebooking_seat_holds_total{result="conflict"}')
+
+        self.assertTrue(SeatManager.reserve_seats(self.showtime.id, ['A1'], self.customer.id))
+        self.assertFalse(SeatManager.reserve_seats(self.showtime.id, ['A1'], self.staff.id))
+
+        self.assertEqual(self.sample('moviebooking_seat_holds_total{result="success"}'), success + 1)
+        self.assertEqual(self.sample('moviebooking_seat_holds_total{result="conflict"}'), conflict + 1)
+
+    def test_request_db_time_and_cache_families(self):
+
+        self.client.login(username='staff', password='testpass123')
+        self.client.get('/custom-admin/api/stats/')
+        body = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret').content.decode()
+
+        self.assertIn('moviebooking_db_queries_total{view="custom_admin:api_stats"}', body)
+        self.assertIn('moviebooking_request_seconds_bucket{view="custom_admin:api_stats",le="+Inf"}', body)
+        self.assertIn('moviebooking_cache_requests_total{family="admin_analytics_version",result=', body)
+        self.assertEqual(cache_family('available_seats_12'), 'available_seats')
+        self.assertEqual(cache_family('moviebooking:v2:seat_layout:7'), 'seat_layout')
+
+    def test_worker_files_are_summed(self):
+
+        REGISTRY.flush()
+        key = (SEAT_HOLDS.name, ('conflict',))
+        local = REGISTRY.collect().get(key, 0)
+
+        # A live sibling process (our parent) with its own counters, as another gunicorn worker would write
+        with open(os.path.join(self.metrics_dir, f'metrics-{os.getppid()}.json'), 'w') as handle:
+            json.dump({SEAT_HOLDS.name: {'conflict': 5}}, handle)
+        with open(os.path.join(self.metrics_dir, 'metrics-999999999.json'), 'w') as handle:
+            json.dump({SEAT_HOLDS.name: {'conflict': 100}}, handle)
+
+        self.assertEqual(self.sample('moviebooking_seat_holds_total{result="conflict"}'), local + 5)
+        self.assertFalse(os.path.exists(os.path.join(self.metrics_dir, 'metrics-999999999.json')))
+
+    def test_token_protects_endpoint(self):
+
+        self.assertEqual(self.client.get('/metrics').status_code, 403)
+        self.assertEqual(self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer wrong').status_code, 403)
+        response = self.client.get('/metrics', HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+
+    def test_staff_only_without_token(self):
+
+        with self.settings(METRICS_TOKEN=None):
+            self.assertEqual(self.client.get('/metrics').status_code, 403)
+            self.client.login(username='customer', password='testpass123')
+            self.assertEqual(self.client.get('/metrics').status_code, 403)
+            self.client.login(username='staff', password='testpass123')
+            self.assertEqual(self.client.get('/metrics').status_code, 200)
+
+class AdminApiQueryBudgetTests(QueryBudgetMixin, TestCase):
+
+    # URL -> (queries, cache calls) on a cold cache
+    BUDGETS = {
+        '/custom-admin/api/stats/': (9, 8),
+        '/custom-admin/api/revenue/': (3, 5),
+        '/custom-admin/api/bookings/': (9, 8),
+        '/custom-admin/api/theaters/': (9, 8),
+        '/custom-admin/api/filter-options/': (4, 2),
+        '/custom-admin/api/dashboard-filtered/?period=week': (9, 8),
+        '/custom-admin/api/occupancy/': (4, 4),
+        '/custom-admin/api/performance/': (2, 2),
+        '/custom-admin/api/export/bookings/': (2, 2),
+        '/custom-admin/api/export/transactions/?format=jsonl': (2, 2),
+    }
+
+    def setUp(self):
+        self.seed()
+
+    def test_every_api_within_budget(self):
+
+        for url, (queries, cache_calls) in self.BUDGETS.items():
+            with self.subTest(url=url):
+                self.assertWithinBudget(url, queries, cache_calls, user=self.staff)
+
+    def test_budgets_cover_every_api(self):
+
+        from django.urls import get_resolver
+        api_routes = {
+            str(pattern.pattern).split('<')[0] for pattern in get_resolver('custom_admin.urls').url_patterns
+            if str(pattern.pattern).startswith('api/')
+        }
+        covered = {url.split('?')[0][len('/custom-admin/'):] for url in self.BUDGETS}
+        for route in api_routes:
+            self.assertTrue(any(url.startswith(route) for url in covered), route)
@@ -17,4 +17,7 @@ urlpatterns = [
     path('api/theaters/', views.api_theaters, name='api_theaters'),
     path('api/filter-options/', views.api_filter_options, name='api_filter_options'),
     path('api/dashboard-filtered/', views.api_dashboard_filtered, name='api_dashboard_filtered'),
+    path('api/occupancy/', views.api_occupancy, name='api_occupancy'),
+    path('api/performance/', views.api_performance, name='api_performance'),
+    path('api/export/<str:dataset>/', views.api_export, name='api_export'),
 ]
@@ -4,14 +4,18 @@ from django.contrib.admin.views.decorators import staff_member_required
 from django.contrib.auth import authenticate, login, logout
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import render, redirect
-from django.http import JsonResponse
-from django.db.models import Count, Sum, Q
+from django.http import JsonResponse, StreamingHttpResponse
 from django.utils import timezone
 from django.views.decorators.http import require_http_methods
 from datetime import timedelta
-from bookings.models import Booking
+import os
+from django.conf import settings
 from movies.models import Movie
 from movies.theater_models import Theater
+from bookings.exports import ExportService
+from bookings.occupancy import OccupancyAnalytics
+from moviebooking.performance import PerformanceRecorder
+from .analytics import AnalyticsEngine
 
 def admin_login(request):
 
@@ -43,108 +47,44 @@ def admin_logout(request):
 @staff_member_required(login_url='custom_admin:login')
 def dashboard(request):
 
-    from datetime import datetime, timedelta
+    spec = AnalyticsEngine.normalize(request.GET)
+    report = AnalyticsEngine.report(spec)
+    totals = report['totals']
     
-    today = timezone.now().date()
-    
-    movie_id = request.GET.get('movie_id')
-    theater_id = request.GET.get('theater_id')
-    period = request.GET.get('period', 'all')
-    date_from = request.GET.get('date_from')
-    date_to = request.GET.get('date_to')
-    
-    filters = Q(status='CONFIRMED')
-    
-    if movie_id:
-        filters &= Q(showtime__movie_id=movie_id)
-    
-    if theater_id:
-        filters &= Q(showtime__screen__theater_id=theater_id)
-    
-    period_filters = Q()
-    if date_from and date_to:
-        period_filters = Q(created_at__date__gte=date_from, created_at__date__lte=date_to)
-    elif period == 'today':
-        period_filters = Q(created_at__date=today)
-    elif period == 'week':
-        week_ago = today - timedelta(days=7)
-        period_filters = Q(created_at__date__gte=week_ago)
-    elif period == 'month':
-        month_ago = today - timedelta(days=30)
-        period_filters = Q(created_at__date__gte=month_ago)
-    
-    final_filters = filters & period_filters if period_filters else filters
-    
-    filtered_bookings = Booking.objects.filter(final_filters)
-    
-    total_revenue = Booking.objects.filter(filters).aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-    period_revenue = filtered_bookings.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-    total_bookings = Booking.objects.filter(filters).count()
-    period_bookings = filtered_bookings.count()
-    
-    end_date = today
-    start_date = today - timedelta(days=29)
-    revenue_data = []
-    current_date = start_date
-    
-    while current_date <= end_date:
-        daily_bookings = Booking.objects.filter(
-            filters,
-            created_at__date=current_date
-        )
-        daily_revenue = daily_bookings.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-        revenue_data.append({
-            'date': current_date.strftime('%b %d'),
-            'revenue': float(daily_revenue)
-        })
-        current_date += timedelta(days=1)
-    
-    top_movies = Movie.objects.filter(
-        showtime__booking__in=filtered_bookings
-    ).annotate(
-        booking_count=Count('showtime__booking', filter=Q(showtime__booking__in=filtered_bookings))
-    ).distinct().order_by('-booking_count')[:5]
-    
-    top_theaters = Theater.objects.filter(
-        screen__showtime__booking__in=filtered_bookings
-    ).annotate(
-        booking_count=Count('screen__showtime__booking', filter=Q(screen__showtime__booking__in=filtered_bookings)),
-        revenue=Sum('screen__showtime__booking__total_amount', filter=Q(screen__showtime__booking__in=filtered_bookings))
-    ).distinct().order_by('-revenue')[:5]
-    
-    recent_bookings = filtered_bookings.select_related(
-        'user', 'showtime__movie'
-    ).order_by('-created_at')[:5]
+    revenue_data = [
+        {'date': point['bucket'].strftime('%b %d'), 'revenue': point['revenue']}
+        for point in report['series']
+    ]
     
     all_movies = Movie.objects.filter(is_active=True).order_by('title')
     all_theaters = Theater.objects.order_by('name')
     
     context = {
-        'total_revenue': total_revenue,
-        'period_revenue': period_revenue,
-        'total_bookings': total_bookings,
-        'period_bookings': period_bookings,
+        'total_revenue': totals['total_revenue'],
+        'period_revenue': totals['period_revenue'],
+        'total_bookings': totals['total_bookings'],
+        'period_bookings': totals['period_bookings'],
         
         'revenue_data': revenue_data,
-        'top_movies': top_movies,
-        'top_theaters': top_theaters,
+        'top_movies': report['top_movies'],
+        'top_theaters': report['top_theaters'],
         
-        'recent_bookings': recent_bookings,
+        'recent_bookings': report['recent_bookings'],
         
         'all_movies': all_movies,
         'all_theaters': all_theaters,
-        'selected_movie_id': movie_id,
-        'selected_theater_id': theater_id,
-        'selected_period': period,
-        'date_from': date_from,
-        'date_to': date_to,
+        'selected_movie_id': request.GET.get('movie_id'),
+        'selected_theater_id': request.GET.get('theater_id'),
+        'selected_period': request.GET.get('period', 'all'),
+        'date_from': request.GET.get('date_from'),
+        'date_to': request.GET.get('date_to'),
         
         'period_label': {
             'today': 'Today',
             'week': 'Last 7 Days',
             'month': 'Last 30 Days',
-            'all': 'All Time'
-        }.get(period, 'Custom Range' if date_from and date_to else 'All Time'),
+            'custom': 'Custom Range',
+        }.get(spec['period'], 'All Time'),
     }
     
     return render(request, 'custom_admin/dashboard_server.html', context)
@@ -157,159 +97,59 @@ def debug_page(request):
 @require_http_methods(["GET"])
 def api_stats(request):
 
-    today = timezone.now().date()
-    
-    filters = Q(status='CONFIRMED')
-    
-    movie_id = request.GET.get('movie_id')
-    if movie_id:
-        filters &= Q(showtime__movie_id=movie_id)
-    
-    theater_id = request.GET.get('theater_id')
-    if theater_id:
-        filters &= Q(showtime__screen__theater_id=theater_id)
-    
-    date_from = request.GET.get('date_from')
-    date_to = request.GET.get('date_to')
-    period = request.GET.get('period', 'all')
-    period_filters = Q()
-    
-    if date_from and date_to:
-        period_filters = Q(created_at__date__gte=date_from, created_at__date__lte=date_to)
-    elif period == 'today':
-        period_filters = Q(created_at__date=today)
-    elif period == 'week':
-        week_ago = today - timedelta(days=7)
-        period_filters = Q(created_at__date__gte=week_ago)
-    elif period == 'month':
-        month_ago = today - timedelta(days=30)
-        period_filters = Q(created_at__date__gte=month_ago)
-    
-    total_revenue = Booking.objects.filter(
-        filters
-    ).aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-    
-    period_revenue = Booking.objects.filter(
-        filters & period_filters
-    ).aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-    
-    total_bookings = Booking.objects.filter(filters).count()
-    
-    period_bookings = Booking.objects.filter(
-        filters & period_filters
-    ).count()
+    totals = AnalyticsEngine.report(AnalyticsEngine.normalize(request.GET))['totals']
     
     return JsonResponse({
-        'total_revenue': float(total_revenue),
-        'today_revenue': float(period_revenue),
-        'total_bookings': total_bookings,
-        'today_bookings': period_bookings,
+        'total_revenue': totals['total_revenue'],
+        'today_revenue': totals['period_revenue'],
+        'total_bookings': totals['total_bookings'],
+        'today_bookings': totals['period_bookings'],
     })
 
 @staff_member_required(login_url='custom_admin:login')
 @require_http_methods(["GET"])
 def api_revenue(request):
 
-    days = int(request.GET.get('days', 30))
+    try:
+        days = max(int(request.GET.get('days', 30)), 0)
+    except ValueError:
+        days = 30
     end_date = timezone.now().date()
     start_date = end_date - timedelta(days=days)
     
-    filters = Q(status='CONFIRMED')
-    
-    movie_id = request.GET.get('movie_id')
-    if movie_id:
-        filters &= Q(showtime__movie_id=movie_id)
-    
-    theater_id = request.GET.get('theater_id')
-    if theater_id:
-        filters &= Q(showtime__screen__theater_id=theater_id)
-    
-    dates = []
-    revenues = []
-    
-    current_date = start_date
-    while current_date <= end_date:
-        dates.append(current_date.strftime('%Y-%m-%d'))
-        
-        daily_revenue = Booking.objects.filter(
-            created_at__date=current_date,
-            **{'__'.join(str(k).split('__')[:-1]) if '__' in k else k: v for k, v in filters.children}
-        ).aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-        
-        daily_revenue = Booking.objects.filter(
-            filters,
-            created_at__date=current_date
-        ).aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-        
-        revenues.append(float(daily_revenue))
-        current_date += timedelta(days=1)
+    spec = AnalyticsEngine.normalize(request.GET)
+    bucket = request.GET.get('bucket', 'day')
+    series = AnalyticsEngine.series(spec, start_date, end_date, bucket)
+    label_format = '%Y-%m-%d %H:00' if bucket == 'hour' else '%Y-%m-%d'
     
     return JsonResponse({
-        'dates': dates,
-        'revenues': revenues,
+        'dates': [point['bucket'].strftime(label_format) for point in series],
+        'revenues': [point['revenue'] for point in series],
+        'bookings': [point['bookings'] for point in series],
     })
 
 @staff_member_required(login_url='custom_admin:login')
 @require_http_methods(["GET"])
 def api_bookings(request):
 
-    filters = Q(status='CONFIRMED')
-    
-    movie_id = request.GET.get('movie_id')
-    if movie_id:
-        filters &= Q(showtime__movie_id=movie_id)
-    
-    theater_id = request.GET.get('theater_id')
-    if theater_id:
-        filters &= Q(showtime__screen__theater_id=theater_id)
-    
-    date_from = request.GET.get('date_from')
-    date_to = request.GET.get('date_to')
-    period = request.GET.get('period', 'all')
-    period_filters = Q()
-    today = timezone.now().date()
-    
-    if date_from and date_to:
-        period_filters = Q(created_at__date__gte=date_from, created_at__date__lte=date_to)
-    elif period == 'today':
-        period_filters = Q(created_at__date=today)
-    elif period == 'week':
-        week_ago = today - timedelta(days=7)
-        period_filters = Q(created_at__date__gte=week_ago)
-    elif period == 'month':
-        month_ago = today - timedelta(days=30)
-        period_filters = Q(created_at__date__gte=month_ago)
-    
-    final_filters = filters & period_filters if period_filters else filters
-    
-    filtered_bookings = Booking.objects.filter(final_filters)
-    
-    movies = Movie.objects.filter(
-        showtime__booking__in=filtered_bookings
-    ).annotate(
-        booking_count=Count('showtime__booking', filter=Q(showtime__booking__in=filtered_bookings))
-    ).distinct().order_by('-booking_count')[:5]
+    report = AnalyticsEngine.report(AnalyticsEngine.normalize(request.GET))
     
     movie_data = [
         {
-            'title': m.title,
-            'bookings': m.booking_count,
+            'title': m['title'],
+            'bookings': m['booking_count'],
         }
-        for m in movies
+        for m in report['top_movies']
     ]
     
-    recent = Booking.objects.filter(
-        final_filters
-    ).select_related('user', 'showtime__movie').order_by('-created_at')[:5]
-    
     booking_data = [
         {
-            'user': b.user.username,
-            'movie': b.showtime.movie.title,
-            'amount': float(b.total_amount),
-            'date': b.created_at.strftime('%Y-%m-%d %H:%M'),
+            'user': b['user'],
+            'movie': b['movie'],
+            'amount': b['amount'],
+            'date': b['date'],
         }
-        for b in recent
+        for b in report['recent_bookings']
     ]
     
     return JsonResponse({
@@ -321,52 +161,15 @@ def api_bookings(request):
 @require_http_methods(["GET"])
 def api_theaters(request):
 
-    booking_filters = Q(status='CONFIRMED')
-    
-    movie_id = request.GET.get('movie_id')
-    if movie_id:
-        booking_filters &= Q(showtime__movie_id=movie_id)
-    
-    theater_id = request.GET.get('theater_id')
-    
-    date_from = request.GET.get('date_from')
-    date_to = request.GET.get('date_to')
-    period = request.GET.get('period', 'all')
-    period_filters = Q()
-    today = timezone.now().date()
-    
-    if date_from and date_to:
-        period_filters = Q(created_at__date__gte=date_from, created_at__date__lte=date_to)
-    elif period == 'today':
-        period_filters = Q(created_at__date=today)
-    elif period == 'week':
-        week_ago = today - timedelta(days=7)
-        period_filters = Q(created_at__date__gte=week_ago)
-    elif period == 'month':
-        month_ago = today - timedelta(days=30)
-        period_filters = Q(created_at__date__gte=month_ago)
-    
-    final_booking_filters = booking_filters & period_filters if period_filters else booking_filters
-    
-    filtered_bookings = Booking.objects.filter(final_booking_filters)
-    
-    query = Theater.objects.filter(
-        screen__showtime__booking__in=filtered_bookings
-    ).annotate(
-        booking_count=Count('screen__showtime__booking', filter=Q(screen__showtime__booking__in=filtered_bookings)),
-        revenue=Sum('screen__showtime__booking__total_amount', filter=Q(screen__showtime__booking__in=filtered_bookings))
-    ).distinct().order_by('-revenue')[:5]
-    
-    if theater_id:
-        query = query.filter(id=theater_id)
+    report = AnalyticsEngine.report(AnalyticsEngine.normalize(request.GET))
     
     theater_data = [
         {
-            'name': t.name,
-            'bookings': t.booking_count or 0,
-            'revenue': float(t.revenue or 0),
+            'name': t['name'],
+            'bookings': t['booking_count'],
+            'revenue': t['revenue'],
         }
-        for t in query
+        for t in report['top_theaters']
     ]
     
     return JsonResponse({
@@ -394,88 +197,88 @@ def api_filter_options(request):
 @require_http_methods(["GET"])
 def api_dashboard_filtered(request):
 
-    date_from_str = request.GET.get('date_from')
-    date_to_str = request.GET.get('date_to')
-    movie_id = request.GET.get('movie')
-    theater_id = request.GET.get('theater')
-    
-    bookings_qs = Booking.objects.filter(status='CONFIRMED')
-    
-    if date_from_str:
-        bookings_qs = bookings_qs.filter(created_at__date__gte=date_from_str)
+    spec = AnalyticsEngine.normalize(request.GET, movie_param='movie', theater_param='theater')
+    report = AnalyticsEngine.report(spec)
+    totals = report['totals']
     
-    if date_to_str:
-        bookings_qs = bookings_qs.filter(created_at__date__lte=date_to_str)
-    
-    if movie_id:
-        bookings_qs = bookings_qs.filter(showtime__movie_id=movie_id)
-    
-    if theater_id:
-        bookings_qs = bookings_qs.filter(showtime__screen__theater_id=theater_id)
-    
-    total_revenue = bookings_qs.aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-    total_bookings = bookings_qs.count()
-    
-    today = timezone.now().date()
-    today_revenue = bookings_qs.filter(created_at__date=today).aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-    today_bookings = bookings_qs.filter(created_at__date=today).count()
-    
-    end_date = timezone.now().date()
-    start_date = end_date - timedelta(days=30)
-    
-    dates = []
-    revenues = []
-    current_date = start_date
-    while current_date <= end_date:
-        dates.append(current_date.strftime('%Y-%m-%d'))
-        daily_revenue = bookings_qs.filter(
-            created_at__date=current_date
-        ).aggregate(Sum('total_amount'))['total_amount__sum'] or 0
-        revenues.append(float(daily_revenue))
-        current_date += timedelta(days=1)
-    
-    top_movies = Movie.objects.filter(
-        showtime__booking__in=bookings_qs
-    ).annotate(
-        booking_count=Count('showtime__booking', filter=Q(showtime__booking__in=bookings_qs))
-    ).order_by('-booking_count')[:5]
+    dates = [point['bucket'].strftime('%Y-%m-%d') for point in report['series']]
+    revenues = [point['revenue'] for point in report['series']]
     
     movies_data = [
-        {'title': m.title, 'bookings': m.booking_count}
-        for m in top_movies
+        {'title': m['title'], 'bookings': m['booking_count']}
+        for m in report['top_movies']
     ]
     
-    top_theaters = Theater.objects.filter(
-        screen__showtime__booking__in=bookings_qs
-    ).annotate(
-        booking_count=Count('screen__showtime__booking', filter=Q(screen__showtime__booking__in=bookings_qs)),
-        revenue=Sum('screen__showtime__booking__total_amount', filter=Q(screen__showtime__booking__in=bookings_qs))
-    ).order_by('-revenue')[:5]
-    
     theaters_data = [
-        {'name': t.name, 'bookings': t.booking_count or 0, 'revenue': float(t.revenue or 0)}
-        for t in top_theaters
+        {'name': t['name'], 'bookings': t['booking_count'], 'revenue': t['revenue']}
+        for t in report['top_theaters']
     ]
     
-    recent_bookings_qs = bookings_qs.select_related('user', 'showtime__movie').order_by('-created_at')[:5]
-    
     bookings_data = [
         {
-            'user': b.user.username,
-            'movie': b.showtime.movie.title,
-            'amount': float(b.total_amount),
-            'date': b.created_at.strftime('%Y-%m-%d %H:%M'),
+            'user': b['user'],
+            'movie': b['movie'],
+            'amount': b['amount'],
+            'date': b['date'],
         }
-        for b in recent_bookings_qs
+        for b in report['recent_bookings']
     ]
     
     return JsonResponse({
-        'total_revenue': float(total_revenue),
-        'today_revenue': float(today_revenue),
-        'total_bookings': total_bookings,
-        'today_bookings': today_bookings,
+        'total_revenue': totals['period_revenue'],
+        'today_revenue': totals['today_revenue'],
+        'total_bookings': totals['period_bookings'],
+        'today_bookings': totals['today_bookings'],
         'revenue_data': {'dates': dates, 'revenues': revenues},
         'top_movies': movies_data,
         'top_theaters': theaters_data,
         'recent_bookings': bookings_data,
     })
+
+@staff_member_required(login_url='custom_admin:login')
+@require_http_methods(["GET"])
+def api_occupancy(request):
+
+    # Served from the precomputed snapshot; bookings are never scanned here
+    report = OccupancyAnalytics.report(
+        theater_id=AnalyticsEngine.int_or_none(request.GET.get('theater_id')),
+        screen_id=AnalyticsEngine.int_or_none(request.GET.get('screen_id')),
+    )
+    
+    return JsonResponse(report)
+
+@staff_member_required(login_url='custom_admin:login')
+@require_http_methods(["GET"])
+def api_performance(request):
+
+    # Rolling per-view percentiles from this worker process
+    return JsonResponse({
+        'pid': os.getpid(),
+        'sample_rate': getattr(settings, 'PERF_SAMPLE_RATE', 0.0),
+        'views': PerformanceRecorder.report(),
+    })
+
+@staff_member_required(login_url='custom_admin:login')
+@require_http_methods(["GET"])
+def api_export(request, dataset):
+
+    fmt = request.GET.get('format', 'csv')
+    compress = request.GET.get('gzip') in ('1', 'true', 'yes')
+    
+    if dataset not in ExportService.DATASETS or fmt not in ExportService.FORMATS:
+        return JsonResponse({'error': 'Unknown dataset or format'}, status=400)
+    
+    filters = {
+        'date_from': request.GET.get('date_from'),
+        'date_to': request.GET.get('date_to'),
+        'status': request.GET.get('status'),
+        'movie_id': request.GET.get('movie_id'),
+        'theater_id': request.GET.get('theater_id'),
+    }
+    
+    response = StreamingHttpResponse(
+        ExportService.stream(dataset, fmt=fmt, compress=compress, filters=filters),
+        content_type=ExportService.content_type(fmt, compress)
+    )
+    response['Content-Disposition'] = f'attachment; filename="{ExportService.filename(dataset, fmt, compress)}"'
+    return response
@@ -28,4 +28,28 @@ app.conf.beat_schedule = {
         'task': 'bookings.tasks.cleanup_old_data',
         'schedule': 86400.0,  # Daily
     },
+    'build-recommendations-every-6-hours': {
+        'task': 'movies.tasks.build_recommendations',
+        'schedule': 21600.0,  # Every 6 hours
+    },
+    'flush-counters-every-minute': {
+        'task': 'movies.tasks.flush_counters',
+        'schedule': 60.0,  # Every minute
+    },
+    'repair-counters-daily': {
+        'task': 'movies.tasks.repair_counters',
+        'schedule': 86400.0,  # Daily
+    },
+    'rebuild-sales-rollup-daily': {
+        'task': 'bookings.tasks.rebuild_sales_rollup',
+        'schedule': 86400.0,  # Daily
+    },
+    'refresh-occupancy-every-minute': {
+        'task': 'bookings.tasks.refresh_occupancy',
+        'schedule': 60.0,  # Every minute
+    },
+    'repair-seat-inventory-hourly': {
+        'task': 'bookings.tasks.repair_seat_inventory',
+        'schedule': 3600.0,  # Every hour
+    },
 }
\ No newline at end of file
@@ -0,0 +1,87 @@
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+_replica = ContextVar('replica', default=None)
+_wrote = ContextVar('wrote', default=None)
+
+PIN_SESSION_KEY = '_db_primary_until'
+
+def replicas():
+
+    # Only aliases that are actually configured; an empty list routes everything to the primary
+    return [alias for alias in getattr(settings, 'READ_REPLICAS', []) if alias in settings.DATABASES]
+
+class ReplicaRouter:
+
+    # Reads go to a replica only inside a request ReplicaMiddleware marked read-only;
+    # everything else (writes, Celery tasks, management commands) stays on the primary
+    def db_for_read(self, model, **hints):
+
+        return _replica.get() or 'default'
+
+    def db_for_write(self, model, **hints):
+
+        wrote = _wrote.get()
+        if wrote is not None:
+            wrote['value'] = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+
+        databases = {'default', *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+
+        # Replicas get their schema from the primary
+        if db in getattr(settings, 'READ_REPLICAS', []):
+            return False
+        return None
+
+class ReplicaMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+
+        wrote = {'value': False}
+        wrote_token = _wrote.set(wrote)
+        replica_token = _replica.set(None)
+        try:
+            response = self.get_response(request)
+        finally:
+            _replica.reset(replica_token)
+            _wrote.reset(wrote_token)
+
+        # Read-your-writes: this session reads from the primary until the replicas have caught up
+        if wrote['value'] and hasattr(request, 'session'):
+            request.session[PIN_SESSION_KEY] = time.time() + getattr(settings, 'READ_REPLICA_PIN_SECONDS', 10)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+
+        aliases = replicas()
+        if (
+            request.method in ('GET', 'HEAD')
+            and request.resolver_match.view_name in getattr(settings, 'READ_REPLICA_VIEWS', ())
+            and aliases
+            and not self.pinned(request)
+        ):
+            # One replica for the whole request, so its reads see a single consistent snapshot
+            _replica.set(random.choice(aliases))
+        return None
+
+    @staticmethod
+    def pinned(request):
+
+        session = getattr(request, 'session', None)
+        return session is not None and session.get(PIN_SESSION_KEY, 0) > time.time()
@@ -0,0 +1,183 @@
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .metrics import L1_REQUESTS
+from .redis_client import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+class L1Cache:
+
+    # Per-process LRU in front of the shared cache, for read-mostly key families only.
+    # Values are shared between callers: treat them as read-only.
+    CHANNEL = 'moviebooking:l1:invalidate'
+    MAX_ENTRIES = 2048
+    FAMILIES = {  # family -> seconds an entry may be served without asking Redis
+        'seat_layout': 60,
+        'autocomplete': 30,
+        'genres': 300,
+        'languages': 300,
+    }
+    RETRY_SECONDS = (1, 2, 5, 10, 30)
+
+    _lock = threading.Lock()
+    _entries = OrderedDict()  # (family, key) -> (expires_at, value)
+    _pid = None
+    _origin = None
+
+    @staticmethod
+    def config():
+        return getattr(settings, 'L1_CACHE', {})
+
+    @staticmethod
+    def enabled():
+        return L1Cache.config().get('ENABLED', True)
+
+    @staticmethod
+    def ttl(family):
+        return {**L1Cache.FAMILIES, **L1Cache.config().get('FAMILIES', {})}.get(family, 0)
+
+    @staticmethod
+    def _ensure_process():
+
+        # First use in this process (or first use after a fork): fresh state and a listener of our own
+        if L1Cache._pid == os.getpid():
+            return
+        with L1Cache._lock:
+            if L1Cache._pid == os.getpid():
+                return
+            L1Cache._entries.clear()
+            L1Cache._origin = uuid.uuid4().hex
+            L1Cache._pid = os.getpid()
+        threading.Thread(target=L1Cache._listen, name='l1-cache-invalidation', daemon=True).start()
+
+    @staticmethod
+    def get(family, key, loader=None, timeout=None):
+
+        # Read-through: L1, then the shared cache, then loader() (which fills both tiers)
+        if not L1Cache.enabled() or not L1Cache.ttl(family):
+            return L1Cache._load(key, loader, timeout)
+
+        L1Cache._ensure_process()
+        now = time.monotonic()
+        with L1Cache._lock:
+            entry = L1Cache._entries.get((family, key))
+            if entry is not None and entry[0] > now:
+                L1Cache._entries.move_to_end((family, key))
+                hit = True
+            else:
+                hit = False
+        if hit:
+            L1_REQUESTS.inc(family=family, result='hit')
+            return entry[1]
+
+        L1_REQUESTS.inc(family=family, result='miss')
+        value = L1Cache._load(key, loader, timeout)
+        if value is not None:
+            L1Cache._store(family, key, value, now)
+        return value
+
+    @staticmethod
+    def _load(key, loader, timeout):
+
+        value = cache.get(key)
+        if value is None and loader is not None:
+            value = loader()
+            cache.set(key, value, timeout=timeout)
+        return value
+
+    @staticmethod
+    def _store(family, key, value, now):
+
+        limit = L1Cache.config().get('MAX_ENTRIES', L1Cache.MAX_ENTRIES)
+        evicted = []
+        with L1Cache._lock:
+            L1Cache._entries[(family, key)] = (now + L1Cache.ttl(family), value)
+            L1Cache._entries.move_to_end((family, key))
+            while len(L1Cache._entries) > limit:
+                (evicted_family, _), _ = L1Cache._entries.popitem(last=False)
+                evicted.append(evicted_family)
+        for evicted_family in evicted:
+            L1_REQUESTS.inc(family=evicted_family, result='eviction')
+
+    @staticmethod
+    def _evict(family, key=None):
+
+        with L1Cache._lock:
+            if key is not None:
+                L1Cache._entries.pop((family, key), None)
+            else:
+                for entry in [entry for entry in L1Cache._entries if entry[0] == family]:
+                    del L1Cache._entries[entry]
+        L1_REQUESTS.inc(family=family, result='invalidation')
+
+    @staticmethod
+    def invalidate(family, key=None):
+
+        # Drop the entry (or the whole family) here and in every other process; the shared cache is untouched
+        L1Cache._ensure_process()
+        L1Cache._evict(family, key)
+        try:
+            get_redis_connection("default").publish(L1Cache.CHANNEL, f"{L1Cache._origin}|{family}|{key or ''}")
+        except Exception as e:
+            logger.error(f"L1 invalidation publish failed for {family}:{key}: {e}")
+
+    @staticmethod
+    def delete(family, key):
+
+        cache.delete(key)
+        L1Cache.invalidate(family, key)
+
+    @staticmethod
+    def clear():
+
+        with L1Cache._lock:
+            L1Cache._entries.clear()
+
+    @staticmethod
+    def stats():
+
+        counts = {}
+        with L1Cache._lock:
+            for family, _ in L1Cache._entries:
+                counts[family] = counts.get(family, 0) + 1
+        return counts
+
+    @staticmethod
+    def handle_message(data):
+
+        origin, family, key = data.decode('utf-8').split('|', 2)
+        if origin != L1Cache._origin:
+            L1Cache._evict(family, key or None)
+
+    @staticmethod
+    def _listen():
+
+        failures = 0
+        while True:
+            try:
+                pubsub = get_redis_connection("default").pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(L1Cache.CHANNEL)
+                # Anything published while we were not listening is lost; start from a clean slate
+                L1Cache.clear()
+                failures = 0
+                while True:
+                    # Polling keeps the socket read under SOCKET_TIMEOUT on quiet channels
+                    message = pubsub.get_message(timeout=1.0)
+                    if message and message.get('type') == 'message':
+                        L1Cache.handle_message(message['data'])
+            except Exception as e:
+                L1Cache.clear()
+                delay = L1Cache.RETRY_SECONDS[min(failures, len(L1Cache.RETRY_SECONDS) - 1)]
+                failures += 1
+                logger.error(f"L1 invalidation listener lost its subscription ({e}), retrying in {delay}s")
+                time.sleep(delay)
@@ -0,0 +1,777 @@
+import fnmatch
+import pickle
+import queue
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+from .performance import record_round_trip
+
+class WrongTypeError(TypeError):
+    pass
+
+def _bytes(value):
+
+    # Same wire encoding as redis-py: everything is stored and returned as bytes
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, str):
+        return value.encode('utf-8')
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return repr(value).encode('utf-8')
+    raise TypeError(f"Invalid input of type {type(value).__name__}; encode it first")
+
+class LocalRedis:
+
+    is_local = True
+
+    def __init__(self, clock=time.monotonic, round_trip_ms=0):
+        self.clock = clock
+        self.round_trip_ms = round_trip_ms
+        self.lock = threading.RLock()
+        self._data = {}
+        self._expires = {}
+        self._batched = 0
+        self._subscribers = defaultdict(list)
+        self.stats = defaultdict(int)
+
+    # -- bookkeeping ---------------------------------------------------------
+
+    def _round_trip(self, commands=1):
+
+        # One network hop per call (or per pipeline/script); optional simulated latency for benchmarks
+        if self._batched:
+            return
+        self.stats['round_trips'] += 1
+        record_round_trip()
+        self.stats['commands'] += commands
+        if self.round_trip_ms:
+            time.sleep(self.round_trip_ms / 1000)
+
+    def _alive(self, key):
+
+        deadline = self._expires.get(key)
+        if deadline is not None and deadline <= self.clock():
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+            return False
+        return key in self._data
+
+    def _read(self, key, kind):
+
+        key = _bytes(key)
+        if not self._alive(key):
+            return None
+        found, value = self._data[key]
+        if found != kind:
+            raise WrongTypeError('WRONGTYPE Operation against a key holding the wrong kind of value')
+        return value
+
+    def _write(self, key, kind, factory):
+
+        value = self._read(key, kind)
+        if value is None:
+            value = factory()
+            self._data[_bytes(key)] = (kind, value)
+        return value
+
+    def _drop_if_empty(self, key, value):
+
+        if not value:
+            self._data.pop(_bytes(key), None)
+            self._expires.pop(_bytes(key), None)
+
+    def _command(name):
+
+        def decorator(func):
+            def wrapper(self, *args, **kwargs):
+                with self.lock:
+                    self._round_trip()
+                    return func(self, *args, **kwargs)
+            wrapper.__name__ = name
+            wrapper.raw = func
+            return wrapper
+        return decorator
+
+    # -- server --------------------------------------------------------------
+
+    @_command('ping')
+    def ping(self):
+        return True
+
+    @_command('info')
+    def info(self):
+
+        return {
+            'redis_mode': 'local',
+            'connected_clients': 1,
+            'used_memory_human': 'N/A',
+            'keyspace_hits': self.stats['keyspace_hits'],
+            'keyspace_misses': self.stats['keyspace_misses'],
+            'db0': {'keys': len(self._data), 'expires': len(self._expires)},
+        }
+
+    @_command('flushdb')
+    def flushdb(self):
+
+        self._data.clear()
+        self._expires.clear()
+        return True
+
+    flushall = flushdb
+
+    @_command('dbsize')
+    def dbsize(self):
+        return sum(1 for key in list(self._data) if self._alive(key))
+
+    @_command('keys')
+    def keys(self, pattern='*'):
+
+        pattern = _bytes(pattern).decode('utf-8')
+        return [key for key in list(self._data) if self._alive(key) and fnmatch.fnmatchcase(key.decode('utf-8'), pattern)]
+
+    def scan_iter(self, match='*', count=None):
+        return iter(self.keys(match))
+
+    # -- keys ----------------------------------------------------------------
+
+    @_command('exists')
+    def exists(self, *names):
+        return sum(1 for name in names if self._alive(_bytes(name)))
+
+    @_command('delete')
+    def delete(self, *names):
+
+        deleted = 0
+        for name in names:
+            key = _bytes(name)
+            if self._alive(key):
+                deleted += 1
+            self._data.pop(key, None)
+            self._expires.pop(key, None)
+        return deleted
+
+    @_command('type')
+    def type(self, name):
+
+        key = _bytes(name)
+        return self._data[key][0].encode('utf-8') if self._alive(key) else b'none'
+
+    @_command('expire')
+    def expire(self, name, time):
+        return LocalRedis.pexpire.raw(self, name, int(time * 1000))
+
+    @_command('pexpire')
+    def pexpire(self, name, time):
+
+        key = _bytes(name)
+        if not self._alive(key):
+            return False
+        if time <= 0:
+            LocalRedis.delete.raw(self, key)
+        else:
+            self._expires[key] = self.clock() + time / 1000
+        return True
+
+    @_command('pttl')
+    def pttl(self, name):
+
+        key = _bytes(name)
+        if not self._alive(key):
+            return -2
+        if key not in self._expires:
+            return -1
+        return max(int(round((self._expires[key] - self.clock()) * 1000)), 0)
+
+    @_command('ttl')
+    def ttl(self, name):
+
+        remaining = LocalRedis.pttl.raw(self, name)
+        return remaining if remaining < 0 else int(round(remaining / 1000))
+
+    @_command('persist')
+    def persist(self, name):
+
+        key = _bytes(name)
+        return self._alive(key) and self._expires.pop(key, None) is not None
+
+    # -- strings -------------------------------------------------------------
+
+    @_command('get')
+    def get(self, name):
+
+        value = self._read(name, 'string')
+        self.stats['keyspace_misses' if value is None else 'keyspace_hits'] += 1
+        return value
+
+    @_command('mget')
+    def mget(self, keys, *args):
+
+        names = list(keys) if isinstance(keys, (list, tuple)) else [keys]
+        return [self._read(name, 'string') for name in names + list(args)]
+
+    @_command('set')
+    def set(self, name, value, ex=None, px=None, nx=False, xx=False, keepttl=False, get=False):
+
+        key = _bytes(name)
+        exists = self._alive(key)
+        previous = self._read(key, 'string') if get and exists else None
+        if (nx and exists) or (xx and not exists):
+            return previous if get else None
+        self._data[key] = ('string', _bytes(value))
+        if ex is not None or px is not None:
+            self._expires[key] = self.clock() + (ex if ex is not None else px / 1000)
+        elif not keepttl:
+            self._expires.pop(key, None)
+        return previous if get else True
+
+    @_command('setnx')
+    def setnx(self, name, value):
+        return bool(LocalRedis.set.raw(self, name, value, nx=True))
+
+    @_command('setex')
+    def setex(self, name, time, value):
+        return LocalRedis.set.raw(self, name, value, ex=time)
+
+    @_command('incrby')
+    def incrby(self, name, amount=1):
+
+        key = _bytes(name)
+        current = self._read(key, 'string')
+        try:
+            value = int(current or 0) + amount
+        except ValueError:
+            raise WrongTypeError('ERR value is not an integer or out of range')
+        self._data[key] = ('string', _bytes(value))
+        return value
+
+    incr = incrby
+
+    @_command('decrby')
+    def decrby(self, name, amount=1):
+        return LocalRedis.incrby.raw(self, name, -amount)
+
+    decr = decrby
+
+    # -- bitmaps -------------------------------------------------------------
+
+    @_command('setbit')
+    def setbit(self, name, offset, value):
+
+        key = _bytes(name)
+        current = bytearray(self._read(key, 'string') or b'')
+        byte, bit = divmod(offset, 8)
+        if len(current) <= byte:
+            current.extend(b'\x00' * (byte + 1 - len(current)))
+        previous = (current[byte] >> (7 - bit)) & 1
+        if value:
+            current[byte] |= 1 << (7 - bit)
+        else:
+            current[byte] &= ~(1 << (7 - bit)) & 0xFF
+        self._data[key] = ('string', bytes(current))
+        return previous
+
+    @_command('getbit')
+    def getbit(self, name, offset):
+
+        current = self._read(name, 'string') or b''
+        byte, bit = divmod(offset, 8)
+        return (current[byte] >> (7 - bit)) & 1 if byte < len(current) else 0
+
+    @_command('bitcount')
+    def bitcount(self, name):
+        return sum(bin(byte).count('1') for byte in self._read(name, 'string') or b'')
+
+    # -- hashes --------------------------------------------------------------
+
+    @_command('hset')
+    def hset(self, name, key=None, value=None, mapping=None):
+
+        fields = dict(mapping or {})
+        if key is not None:
+            fields[key] = value
+        hash_ = self._write(name, 'hash', dict)
+        added = 0
+        for field, field_value in fields.items():
+            field = _bytes(field)
+            added += field not in hash_
+            hash_[field] = _bytes(field_value)
+        return added
+
+    @_command('hget')
+    def hget(self, name, key):
+        return (self._read(name, 'hash') or {}).get(_bytes(key))
+
+    @_command('hgetall')
+    def hgetall(self, name):
+        return dict(self._read(name, 'hash') or {})
+
+    @_command('hdel')
+    def hdel(self, name, *keys):
+
+        hash_ = self._read(name, 'hash') or {}
+        deleted = sum(1 for key in keys if hash_.pop(_bytes(key), None) is not None)
+        self._drop_if_empty(name, hash_)
+        return deleted
+
+    @_command('hlen')
+    def hlen(self, name):
+        return len(self._read(name, 'hash') or {})
+
+    @_command('hincrby')
+    def hincrby(self, name, key, amount=1):
+
+        hash_ = self._write(name, 'hash', dict)
+        value = int(hash_.get(_bytes(key), 0)) + amount
+        hash_[_bytes(key)] = _bytes(value)
+        return value
+
+    # -- sets ----------------------------------------------------------------
+
+    @_command('sadd')
+    def sadd(self, name, *values):
+
+        members = self._write(name, 'set', set)
+        before = len(members)
+        members.update(_bytes(value) for value in values)
+        return len(members) - before
+
+    @_command('srem')
+    def srem(self, name, *values):
+
+        members = self._read(name, 'set') or set()
+        before = len(members)
+        members.difference_update(_bytes(value) for value in values)
+        self._drop_if_empty(name, members)
+        return before - len(members)
+
+    @_command('smembers')
+    def smembers(self, name):
+        return set(self._read(name, 'set') or ())
+
+    @_command('sismember')
+    def sismember(self, name, value):
+        return _bytes(value) in (self._read(name, 'set') or ())
+
+    @_command('scard')
+    def scard(self, name):
+        return len(self._read(name, 'set') or ())
+
+    # -- sorted sets ---------------------------------------------------------
+
+    @_command('zadd')
+    def zadd(self, name, mapping, nx=False, xx=False, incr=False):
+
+        scores = self._write(name, 'zset', dict)
+        added = 0
+        for member, score in mapping.items():
+            member = _bytes(member)
+            if (nx and member in scores) or (xx and member not in scores):
+                continue
+            added += member not in scores
+            scores[member] = scores.get(member, 0) + float(score) if incr else float(score)
+        self._drop_if_empty(name, scores)
+        if incr:
+            return scores.get(_bytes(next(iter(mapping))))
+        return added
+
+    @_command('zincrby')
+    def zincrby(self, name, amount, value):
+
+        scores = self._write(name, 'zset', dict)
+        member = _bytes(value)
+        scores[member] = scores.get(member, 0) + float(amount)
+        return scores[member]
+
+    @_command('zscore')
+    def zscore(self, name, value):
+        return (self._read(name, 'zset') or {}).get(_bytes(value))
+
+    @_command('zrem')
+    def zrem(self, name, *values):
+
+        scores = self._read(name, 'zset') or {}
+        removed = sum(1 for value in values if scores.pop(_bytes(value), None) is not None)
+        self._drop_if_empty(name, scores)
+        return removed
+
+    @_command('zcard')
+    def zcard(self, name):
+        return len(self._read(name, 'zset') or {})
+
+    def _sorted(self, name, desc=False):
+
+        # Redis order: by score, ties broken lexicographically by member
+        items = sorted((self._read(name, 'zset') or {}).items(), key=lambda item: (item[1], item[0]))
+        return items[::-1] if desc else items
+
+    @staticmethod
+    def _slice(items, start, end):
+
+        length = len(items)
+        start = max(start + length if start < 0 else start, 0)
+        end = end + length if end < 0 else end
+        return items[start:end + 1]
+
+    @staticmethod
+    def _format(items, withscores):
+        return [(member, score) for member, score in items] if withscores else [member for member, _ in items]
+
+    @_command('zrange')
+    def zrange(self, name, start, end, desc=False, withscores=False):
+        return self._format(self._slice(self._sorted(name, desc), start, end), withscores)
+
+    @_command('zrevrange')
+    def zrevrange(self, name, start, end, withscores=False):
+        return self._format(self._slice(self._sorted(name, True), start, end), withscores)
+
+    @staticmethod
+    def _bound(value, upper):
+
+        if value in ('-inf', b'-inf'):
+            return float('-inf'), False
+        if value in ('+inf', 'inf', b'+inf', b'inf'):
+            return float('inf'), False
+        if isinstance(value, (str, bytes)) and _bytes(value).startswith(b'('):
+            return float(_bytes(value)[1:]), True
+        return float(value), False
+
+    def _by_score(self, name, low, high):
+
+        low, low_open = self._bound(low, False)
+        high, high_open = self._bound(high, True)
+        return [
+            (member, score) for member, score in self._sorted(name)
+            if (score > low if low_open else score >= low) and (score < high if high_open else score <= high)
+        ]
+
+    @_command('zrangebyscore')
+    def zrangebyscore(self, name, min, max, start=None, num=None, withscores=False):
+
+        items = self._by_score(name, min, max)
+        if start is not None and num is not None:
+            items = items[start:start + num if num >= 0 else None]
+        return self._format(items, withscores)
+
+    @_command('zcount')
+    def zcount(self, name, min, max):
+        return len(self._by_score(name, min, max))
+
+    @_command('zremrangebyscore')
+    def zremrangebyscore(self, name, min, max):
+
+        scores = self._read(name, 'zset') or {}
+        doomed = [member for member, _ in self._by_score(name, min, max)]
+        for member in doomed:
+            del scores[member]
+        self._drop_if_empty(name, scores)
+        return len(doomed)
+
+    @_command('zpopmin')
+    def zpopmin(self, name, count=1):
+
+        scores = self._read(name, 'zset') or {}
+        popped = self._sorted(name)[:count]
+        for member, _ in popped:
+            del scores[member]
+        self._drop_if_empty(name, scores)
+        return popped
+
+    # -- lists ---------------------------------------------------------------
+
+    @_command('lpush')
+    def lpush(self, name, *values):
+
+        items = self._write(name, 'list', list)
+        for value in values:
+            items.insert(0, _bytes(value))
+        return len(items)
+
+    @_command('rpush')
+    def rpush(self, name, *values):
+
+        items = self._write(name, 'list', list)
+        items.extend(_bytes(value) for value in values)
+        return len(items)
+
+    @_command('lpop')
+    def lpop(self, name):
+
+        items = self._read(name, 'list')
+        value = items.pop(0) if items else None
+        self._drop_if_empty(name, items)
+        return value
+
+    @_command('rpop')
+    def rpop(self, name):
+
+        items = self._read(name, 'list')
+        value = items.pop() if items else None
+        self._drop_if_empty(name, items)
+        return value
+
+    @_command('llen')
+    def llen(self, name):
+        return len(self._read(name, 'list') or [])
+
+    @_command('lrange')
+    def lrange(self, name, start, end):
+        return self._slice(list(self._read(name, 'list') or []), start, end)
+
+    @_command('ltrim')
+    def ltrim(self, name, start, end):
+
+        items = self._read(name, 'list')
+        if items is not None:
+            items[:] = self._slice(items, start, end)
+            self._drop_if_empty(name, items)
+        return True
+
+    # -- pub/sub -------------------------------------------------------------
+
+    @_command('publish')
+    def publish(self, channel, message):
+
+        subscribers = list(self._subscribers.get(_bytes(channel), ()))
+        for subscriber in subscribers:
+            subscriber.messages.put({'type': 'message', 'pattern': None, 'channel': _bytes(channel), 'data': _bytes(message)})
+        return len(subscribers)
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return LocalPubSub(self, ignore_subscribe_messages)
+
+    # -- pipelines and scripts -----------------------------------------------
+
+    @contextmanager
+    def atomic(self, commands=1):
+
+        # Everything inside runs as one uninterrupted server-side step: a single round trip
+        with self.lock:
+            self._round_trip(commands)
+            self._batched += 1
+            try:
+                yield self
+            finally:
+                self._batched -= 1
+
+    def pipeline(self, transaction=True):
+        return LocalPipeline(self)
+
+    def register_script(self, script):
+        raise NotImplementedError('LocalRedis cannot run Lua; wrap the script in moviebooking.redis_client.Script')
+
+    del _command
+
+class LocalPipeline:
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.queued = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.reset()
+
+    def __len__(self):
+        return len(self.queued)
+
+    def __getattr__(self, name):
+
+        command = getattr(LocalRedis, name, None)
+        raw = getattr(command, 'raw', None)
+        if raw is None:
+            raise AttributeError(f"LocalRedis pipelines do not support '{name}'")
+
+        def queue(*args, **kwargs):
+            self.queued.append((raw, args, kwargs))
+            return self
+        return queue
+
+    def execute(self, raise_on_error=True):
+
+        # MULTI/EXEC equivalent: the whole batch runs under the store lock in one round trip
+        results = []
+        with self.redis.atomic(len(self.queued)):
+            for raw, args, kwargs in self.queued:
+                try:
+                    results.append(raw(self.redis, *args, **kwargs))
+                except Exception as e:
+                    if raise_on_error:
+                        self.reset()
+                        raise
+                    results.append(e)
+        self.reset()
+        return results
+
+    def reset(self):
+        self.queued = []
+
+class LocalPubSub:
+
+    def __init__(self, redis, ignore_subscribe_messages=False):
+        self.redis = redis
+        self.ignore_subscribe_messages = ignore_subscribe_messages
+        self.channels = set()
+        self.messages = queue.Queue()
+
+    def subscribe(self, *channels):
+
+        with self.redis.lock:
+            for channel in map(_bytes, channels):
+                if channel not in self.channels:
+                    self.channels.add(channel)
+                    self.redis._subscribers[channel].append(self)
+                if not self.ignore_subscribe_messages:
+                    self.messages.put({'type': 'subscribe', 'pattern': None, 'channel': channel, 'data': len(self.channels)})
+
+    def unsubscribe(self, *channels):
+
+        with self.redis.lock:
+            for channel in map(_bytes, channels or list(self.channels)):
+                self.channels.discard(channel)
+                if self in self.redis._subscribers.get(channel, []):
+                    self.redis._subscribers[channel].remove(self)
+
+    def get_message(self, ignore_subscribe_messages=False, timeout=0.0):
+
+        try:
+            return self.messages.get(timeout=timeout) if timeout else self.messages.get_nowait()
+        except queue.Empty:
+            return None
+
+    def listen(self):
+
+        while self.channels:
+            yield self.messages.get()
+
+    def close(self):
+        self.unsubscribe()
+
+    reset = close
+
+class _LocalClient:
+
+    # Just enough of django_redis' client for get_redis_connection()
+    def __init__(self, redis):
+        self.redis = redis
+
+    def get_client(self, write=True):
+        return self.redis
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+class LocalRedisCache(BaseCache):
+
+    def __init__(self, server, params):
+
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        with _stores_lock:
+            if server not in _stores:
+                _stores[server] = LocalRedis(round_trip_ms=options.get('ROUND_TRIP_MS', 0))
+            self.redis = _stores[server]
+        self.client = _LocalClient(self.redis)
+
+    @staticmethod
+    def _encode(value):
+
+        # Integers stay plain so INCR works on them, like django_redis
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+        return pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+    @staticmethod
+    def _decode(value):
+
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return pickle.loads(value)
+
+    def _timeout(self, timeout):
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def _set(self, key, value, timeout, nx=False):
+
+        timeout = self._timeout(timeout)
+        if timeout is not None and timeout <= 0:
+            # Django semantics: a non-positive timeout expires the key immediately
+            if nx:
+                return False
+            self.redis.delete(key)
+            return True
+        return bool(self.redis.set(key, self._encode(value), ex=timeout, nx=nx))
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+
+        key = self.make_and_validate_key(key, version=version)
+        return self._set(key, value, timeout, nx=True)
+
+    def get(self, key, default=None, version=None):
+
+        value = self.redis.get(self.make_and_validate_key(key, version=version))
+        return default if value is None else self._decode(value)
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self._set(self.make_and_validate_key(key, version=version), value, timeout)
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+
+        key = self.make_and_validate_key(key, version=version)
+        timeout = self._timeout(timeout)
+        if timeout is None:
+            return self.redis.persist(key) or bool(self.redis.exists(key))
+        return self.redis.expire(key, timeout)
+
+    def delete(self, key, version=None):
+        return bool(self.redis.delete(self.make_and_validate_key(key, version=version)))
+
+    def delete_many(self, keys, version=None):
+
+        keys = [self.make_and_validate_key(key, version=version) for key in keys]
+        if keys:
+            self.redis.delete(*keys)
+
+    def has_key(self, key, version=None):
+        return bool(self.redis.exists(self.make_and_validate_key(key, version=version)))
+
+    def incr(self, key, delta=1, version=None):
+
+        key = self.make_and_validate_key(key, version=version)
+        with self.redis.lock:
+            if not self.redis.exists(key):
+                raise ValueError(f"Key '{key}' not found")
+            return self.redis.incrby(key, delta)
+
+    def ttl(self, key, version=None):
+
+        # django_redis semantics: 0 when missing, None when persistent
+        remaining = self.redis.ttl(self.make_and_validate_key(key, version=version))
+        if remaining == -2:
+            return 0
+        return None if remaining == -1 else remaining
+
+    def expire(self, key, timeout, version=None):
+        return self.redis.expire(self.make_and_validate_key(key, version=version), timeout)
+
+    def persist(self, key, version=None):
+        return self.redis.persist(self.make_and_validate_key(key, version=version))
+
+    def keys(self, search, version=None):
+
+        prefix = self.make_key('', version=version)
+        return [key.decode('utf-8')[len(prefix):] for key in self.redis.keys(self.make_key(search, version=version))]
+
+    def delete_pattern(self, pattern, version=None):
+
+        keys = self.redis.keys(self.make_key(pattern, version=version))
+        return self.redis.delete(*keys) if keys else 0
+
+    def clear(self):
+        self.redis.flushdb()
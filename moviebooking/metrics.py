@@ -0,0 +1,310 @@
+import glob
+import json
+import logging
+import os
+import re
+import tempfile
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+class MetricsRegistry:
+
+    FLUSH_SECONDS = 5
+
+    def __init__(self):
+        self.metrics = {}
+        self._local = threading.local()
+        self._shards = []
+        self._shards_lock = threading.Lock()  # Only taken once per thread, when its shard is created
+        self._flush_lock = threading.Lock()
+        self._last_flush = 0.0
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def shard(self):
+
+        # Each thread writes only to its own dict, so increments never contend on a lock
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._shards_lock:
+                self._shards.append(shard)
+        return shard
+
+    def collect(self):
+
+        # Merge every thread's shard; dict.copy() and list slicing are atomic under the GIL
+        merged = {}
+        with self._shards_lock:
+            shards = list(self._shards)
+        for shard in shards:
+            for key, value in shard.copy().items():
+                if isinstance(value, list):
+                    value = value[:]
+                    current = merged.get(key)
+                    merged[key] = value if current is None else [a + b for a, b in zip(current, value)]
+                else:
+                    merged[key] = merged.get(key, 0) + value
+        return merged
+
+    def directory(self):
+        return getattr(settings, 'METRICS_DIR', os.path.join(tempfile.gettempdir(), 'moviebooking-metrics'))
+
+    @staticmethod
+    def _alive(path):
+
+        # Files of exited workers are dropped; Prometheus treats the drop as a counter reset
+        pid = os.path.basename(path)[len('metrics-'):-len('.json')]
+        try:
+            os.kill(int(pid), 0)
+        except ValueError:
+            return False
+        except PermissionError:
+            return True
+        except OSError:
+            return False
+        return True
+
+    def flush(self):
+
+        # One file per process; /metrics sums every worker's file
+        directory = self.directory()
+        samples = {}
+        for (name, labels), value in self.collect().items():
+            samples.setdefault(name, {})['\x1f'.join(labels)] = value
+
+        try:
+            os.makedirs(directory, exist_ok=True)
+            path = os.path.join(directory, f'metrics-{os.getpid()}.json')
+            tmp_path = f'{path}.tmp'
+            with open(tmp_path, 'w') as handle:
+                json.dump(samples, handle)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.error(f"Metrics flush failed: {e}")
+
+    def maybe_flush(self):
+
+        now = time.monotonic()
+        if now - self._last_flush < self.FLUSH_SECONDS or not self._flush_lock.acquire(blocking=False):
+            return
+        try:
+            self._last_flush = now
+            self.flush()
+        finally:
+            self._flush_lock.release()
+
+    def aggregate(self):
+
+        self.flush()
+        totals = {}
+        for path in glob.glob(os.path.join(self.directory(), 'metrics-*.json')):
+            if not self._alive(path):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+                continue
+            try:
+                with open(path) as handle:
+                    samples = json.load(handle)
+            except (OSError, ValueError):
+                continue
+            for name, series in samples.items():
+                for labels, value in series.items():
+                    current = totals.setdefault(name, {}).get(labels)
+                    if isinstance(value, list):
+                        totals[name][labels] = value if current is None else [a + b for a, b in zip(current, value)]
+                    else:
+                        totals[name][labels] = (current or 0) + value
+        return totals
+
+    def render(self):
+
+        totals = self.aggregate()
+        lines = []
+        for name, metric in sorted(self.metrics.items()):
+            lines.append(f'# HELP {name} {metric.help}')
+            lines.append(f'# TYPE {name} {metric.kind}')
+            for labels, value in sorted(totals.get(name, {}).items()):
+                values = labels.split('\x1f') if metric.labelnames else []
+                lines.extend(metric.exposition(dict(zip(metric.labelnames, values)), value))
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = MetricsRegistry()
+
+def _format_labels(labels):
+    if not labels:
+        return ''
+    pairs = ','.join(f'{key}="{str(value)}"' for key, value in labels.items())
+    return '{' + pairs + '}'
+
+class Counter:
+
+    kind = 'counter'
+
+    def __init__(self, name, help, labelnames=(), registry=REGISTRY):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.registry = registry
+        registry.register(self)
+
+    def _key(self, labels):
+        return (self.name, tuple(str(labels.get(label, '')) for label in self.labelnames))
+
+    def inc(self, amount=1, **labels):
+        shard = self.registry.shard()
+        key = self._key(labels)
+        shard[key] = shard.get(key, 0) + amount
+        self.registry.maybe_flush()
+
+    def exposition(self, labels, value):
+        return [f'{self.name}{_format_labels(labels)} {value}']
+
+class Histogram(Counter):
+
+    kind = 'histogram'
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS, registry=REGISTRY):
+        super().__init__(name, help, labelnames, registry)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, **labels):
+
+        # Stored as [per-bucket counts..., +Inf count, sum, count]; cumulated on exposition
+        shard = self.registry.shard()
+        key = self._key(labels)
+        state = shard.get(key)
+        if state is None:
+            state = shard[key] = [0] * (len(self.buckets) + 3)
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        state[index] += 1
+        state[-2] += value
+        state[-1] += 1
+        self.registry.maybe_flush()
+
+    @contextmanager
+    def time(self, **labels):
+
+        # Histograms with an 'outcome' label get success/error filled in from whether the block raised
+        started = time.perf_counter()
+        outcome = 'success'
+        try:
+            yield
+        except Exception:
+            outcome = 'error'
+            raise
+        finally:
+            if 'outcome' in self.labelnames:
+                labels.setdefault('outcome', outcome)
+            self.observe(time.perf_counter() - started, **labels)
+
+    def exposition(self, labels, value):
+
+        lines = []
+        cumulative = 0
+        for bound, count in zip(list(self.buckets) + ['+Inf'], value[:-2]):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{_format_labels({**labels, "le": bound})} {cumulative}')
+        lines.append(f'{self.name}_sum{_format_labels(labels)} {round(value[-2], 6)}')
+        lines.append(f'{self.name}_count{_format_labels(labels)} {value[-1]}')
+        return lines
+
+SEAT_HOLDS = Counter('moviebooking_seat_holds_total', 'Seat hold attempts by result', ['result'])
+SEAT_STORE_LATENCY = Histogram('moviebooking_seat_store_seconds', 'Seat store call latency by engine', ['backend', 'operation', 'outcome'])
+BOOKINGS_CREATED = Counter('moviebooking_bookings_created_total', 'Bookings created (PENDING)')
+BOOKING_CONFIRMATIONS = Counter('moviebooking_booking_confirmations_total', 'Bookings confirmed, by path', ['path'])
+BOOKING_RELEASES = Counter('moviebooking_booking_releases_total', 'Pending bookings that expired, failed or were cancelled', ['status'])
+GATEWAY_LATENCY = Histogram('moviebooking_gateway_request_seconds', 'Payment gateway call latency', ['operation', 'outcome'])
+EMAIL_LATENCY = Histogram('moviebooking_email_send_seconds', 'Transactional email send latency', ['email', 'outcome'])
+CACHE_REQUESTS = Counter('moviebooking_cache_requests_total', 'Cache reads by key family and result', ['family', 'result'])
+L1_REQUESTS = Counter('moviebooking_l1_cache_events_total', 'In-process L1 cache hits, misses, evictions and invalidations', ['family', 'result'])
+REQUEST_LATENCY = Histogram('moviebooking_request_seconds', 'Request latency by view', ['view'])
+DB_QUERIES = Counter('moviebooking_db_queries_total', 'Database queries by view', ['view'])
+DB_SECONDS = Counter('moviebooking_db_query_seconds_total', 'Database time by view', ['view'])
+
+_MISSING = object()
+_FAMILY_PATTERN = re.compile(r'^(?:moviebooking:v\d+:)?([A-Za-z]+(?:[_:][A-Za-z]+)*)')
+
+def cache_family(key):
+
+    # 'available_seats_12' -> 'available_seats', 'moviebooking:v2:seat_layout:7' -> 'seat_layout'
+    match = _FAMILY_PATTERN.match(str(key))
+    return match.group(1).replace(':', '_') if match else 'other'
+
+def instrument_cache_reads():
+
+    for alias in settings.CACHES:
+        backend = type(caches[alias])
+        if getattr(backend.get, '_metrics_instrumented', False):
+            continue
+        original = backend.get
+
+        @wraps(original)
+        def get(self, key, default=None, version=None, _original=original, **kwargs):
+            value = _original(self, key, _MISSING, version, **kwargs)
+            CACHE_REQUESTS.inc(family=cache_family(key), result='miss' if value is _MISSING else 'hit')
+            return default if value is _MISSING else value
+
+        get._metrics_instrumented = True
+        backend.get = get
+
+class MetricsMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        instrument_cache_reads()
+
+    def __call__(self, request):
+
+        state = {'queries': 0, 'seconds': 0.0}
+
+        def record_query(execute, sql, params, many, context):
+            started = time.perf_counter()
+            try:
+                return execute(sql, params, many, context)
+            finally:
+                state['queries'] += 1
+                state['seconds'] += time.perf_counter() - started
+
+        started = time.perf_counter()
+        with ExitStack() as stack:
+            # Every alias, so reads served by a replica are counted too
+            for alias in connections:
+                stack.enter_context(connections[alias].execute_wrapper(record_query))
+            response = self.get_response(request)
+
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unresolved'
+        REQUEST_LATENCY.observe(time.perf_counter() - started, view=view)
+        if state['queries']:
+            DB_QUERIES.inc(state['queries'], view=view)
+            DB_SECONDS.inc(state['seconds'], view=view)
+        return response
+
+def metrics_view(request):
+
+    # Scrapers authenticate with the token; without one configured the endpoint is for staff sessions only
+    token = getattr(settings, 'METRICS_TOKEN', None)
+    if token:
+        allowed = request.headers.get('Authorization') == f'Bearer {token}'
+    else:
+        allowed = request.user.is_authenticated and request.user.is_staff
+    if not allowed:
+        return HttpResponseForbidden('Forbidden')
+
+    return HttpResponse(REGISTRY.render(), content_type='text/plain; version=0.0.4; charset=utf-8')
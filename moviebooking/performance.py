@@ -0,0 +1,236 @@
+import logging
+import math
+import random
+import threading
+import time
+from collections import defaultdict, deque
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+
+logger = logging.getLogger(__name__)
+
+_current_profile = ContextVar('request_profile', default=None)
+
+class RequestProfile:
+
+    __slots__ = ('queries', 'db_ms', 'cache_calls', 'cache_ms', 'in_cache_call', 'redis_round_trips')
+
+    def __init__(self):
+        self.queries = 0
+        self.db_ms = 0.0
+        self.cache_calls = 0
+        self.cache_ms = 0.0
+        self.in_cache_call = False
+        self.redis_round_trips = 0
+
+def record_round_trip():
+
+    # One request/response exchange with Redis: a command, a whole pipeline or a script call
+    profile = _current_profile.get()
+    if profile is not None:
+        profile.redis_round_trips += 1
+
+@contextmanager
+def profiled():
+
+    # Profile a block outside the middleware (tests, benchmarks); counts cache calls and Redis round trips
+    PerformanceRecorder.instrument_caches()
+    PerformanceRecorder.instrument_redis()
+    profile = RequestProfile()
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+
+def _counted_redis_call(method):
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        record_round_trip()
+        return method(self, *args, **kwargs)
+
+    wrapper._perf_instrumented = True
+    return wrapper
+
+def _record_query(execute, sql, params, many, context):
+
+    profile = _current_profile.get()
+    if profile is None:
+        return execute(sql, params, many, context)
+
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        profile.queries += 1
+        profile.db_ms += (time.perf_counter() - started) * 1000
+
+def _timed_cache_method(method):
+
+    @wraps(method)
+    def wrapper(self, *args, **kwargs):
+        profile = _current_profile.get()
+        # Only the outermost call counts (get_or_set -> get + add is one call to the caller)
+        if profile is None or profile.in_cache_call:
+            return method(self, *args, **kwargs)
+
+        profile.in_cache_call = True
+        started = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            profile.in_cache_call = False
+            profile.cache_calls += 1
+            profile.cache_ms += (time.perf_counter() - started) * 1000
+
+    wrapper._perf_instrumented = True
+    return wrapper
+
+class PerformanceRecorder:
+
+    WINDOW = 500  # Samples kept per view for the rolling percentiles
+    CACHE_METHODS = (
+        'get', 'set', 'add', 'delete', 'get_many', 'set_many', 'delete_many',
+        'has_key', 'incr', 'decr', 'touch', 'get_or_set', 'clear',
+    )
+    METRICS = ('total_ms', 'queries', 'db_ms', 'cache_calls', 'cache_ms', 'redis_round_trips')
+
+    _lock = threading.Lock()
+    _samples = defaultdict(lambda: deque(maxlen=PerformanceRecorder.WINDOW))
+    _over_budget = defaultdict(int)
+
+    @staticmethod
+    def instrument_caches():
+
+        # Patch each configured backend class once; the wrappers are no-ops outside a sampled request
+        for alias in settings.CACHES:
+            backend = type(caches[alias])
+            for name in PerformanceRecorder.CACHE_METHODS:
+                method = getattr(backend, name, None)
+                if method is not None and not getattr(method, '_perf_instrumented', False):
+                    setattr(backend, name, _timed_cache_method(method))
+
+    @staticmethod
+    def instrument_redis():
+
+        # Every non-pipelined command goes through Redis.execute_command; a pipeline is one execute()
+        try:
+            from redis import Redis
+            from redis.client import Pipeline
+        except ImportError:
+            return
+        for cls, name in ((Redis, 'execute_command'), (Pipeline, 'execute')):
+            method = cls.__dict__[name]
+            if not getattr(method, '_perf_instrumented', False):
+                setattr(cls, name, _counted_redis_call(method))
+
+    @staticmethod
+    def budget(view_name):
+
+        budgets = getattr(settings, 'PERF_BUDGETS', {})
+        return {**budgets.get('default', {}), **budgets.get(view_name, {})}
+
+    @staticmethod
+    def record(view_name, profile, total_ms):
+
+        sample = (total_ms, profile.queries, profile.db_ms, profile.cache_calls, profile.cache_ms, profile.redis_round_trips)
+        budget = PerformanceRecorder.budget(view_name)
+        over = (
+            ('queries' in budget and profile.queries > budget['queries']) or
+            ('ms' in budget and total_ms > budget['ms'])
+        )
+
+        with PerformanceRecorder._lock:
+            PerformanceRecorder._samples[view_name].append(sample)
+            if over:
+                PerformanceRecorder._over_budget[view_name] += 1
+
+        if over:
+            logger.warning(
+                f"⚠️ {view_name} over budget: {profile.queries} queries, {total_ms:.0f}ms (budget {budget})"
+            )
+        return over
+
+    @staticmethod
+    def _percentile(values, pct):
+
+        # Nearest-rank percentile on an already sorted list
+        return values[max(math.ceil(pct / 100 * len(values)) - 1, 0)]
+
+    @staticmethod
+    def report():
+
+        with PerformanceRecorder._lock:
+            snapshot = {view: list(samples) for view, samples in PerformanceRecorder._samples.items()}
+            over_budget = dict(PerformanceRecorder._over_budget)
+
+        views = {}
+        for view, samples in sorted(snapshot.items()):
+            columns = dict(zip(PerformanceRecorder.METRICS, (sorted(column) for column in zip(*samples))))
+            views[view] = {
+                'samples': len(samples),
+                'over_budget': over_budget.get(view, 0),
+                'budget': PerformanceRecorder.budget(view),
+                **{
+                    metric: {
+                        'p50': round(PerformanceRecorder._percentile(values, 50), 2),
+                        'p95': round(PerformanceRecorder._percentile(values, 95), 2),
+                        'p99': round(PerformanceRecorder._percentile(values, 99), 2),
+                        'max': round(values[-1], 2),
+                    }
+                    for metric, values in columns.items()
+                },
+            }
+        return views
+
+    @staticmethod
+    def reset():
+
+        with PerformanceRecorder._lock:
+            PerformanceRecorder._samples.clear()
+            PerformanceRecorder._over_budget.clear()
+
+class PerformanceBudgetMiddleware:
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.sample_rate = getattr(settings, 'PERF_SAMPLE_RATE', 0.0)
+        PerformanceRecorder.instrument_caches()
+        PerformanceRecorder.instrument_redis()
+
+    def __call__(self, request):
+
+        if self.sample_rate <= 0 or random.random() >= self.sample_rate:
+            return self.get_response(request)
+
+        profile = RequestProfile()
+        token = _current_profile.set(profile)
+        started = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for alias in connections:
+                    stack.enter_context(connections[alias].execute_wrapper(_record_query))
+                response = self.get_response(request)
+        finally:
+            _current_profile.reset(token)
+        total_ms = (time.perf_counter() - started) * 1000
+
+        match = getattr(request, 'resolver_match', None)
+        if match is None:
+            return response
+
+        PerformanceRecorder.record(match.view_name, profile, total_ms)
+        response['Server-Timing'] = ', '.join([
+            f'db;dur={profile.db_ms:.1f};desc="{profile.queries} queries"',
+            f'cache;dur={profile.cache_ms:.1f};desc="{profile.cache_calls} calls"',
+            f'redis;desc="{profile.redis_round_trips} round trips"',
+            f'total;dur={total_ms:.1f}',
+        ])
+        response['X-Query-Count'] = str(profile.queries)
+        return response
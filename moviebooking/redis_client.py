@@ -0,0 +1,33 @@
+from django.core.cache import caches
+
+def get_redis_connection(alias="default", write=True):
+
+    # Same contract as django_redis.get_redis_connection, but also serves the in-process LocalRedisCache
+    cache = caches[alias]
+    client = getattr(cache, 'client', None)
+    if client is None or not hasattr(client, 'get_client'):
+        raise NotImplementedError("This backend does not support this feature")
+    return client.get_client(write)
+
+def is_local(redis_conn):
+    return getattr(redis_conn, 'is_local', False)
+
+class Script:
+
+    # A Lua script plus its Python twin; LocalRedis runs the twin under its lock, which is just as atomic
+    def __init__(self, lua):
+        self.lua = lua
+        self.python = None
+
+    def local(self, func):
+        self.python = func
+        return func
+
+    def __call__(self, redis_conn, keys=(), args=()):
+
+        if is_local(redis_conn):
+            if self.python is None:
+                raise NotImplementedError('This script has no local implementation')
+            with redis_conn.atomic():
+                return self.python(redis_conn, list(keys), list(args))
+        return redis_conn.register_script(self.lua)(keys=list(keys), args=list(args))
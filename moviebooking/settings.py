@@ -1,5 +1,7 @@
 
 import os
+import sys
+import tempfile
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -47,12 +49,15 @@ except ImportError:
     HAS_DEBUG_TOOLBAR = False
 
 MIDDLEWARE = [
+    "moviebooking.performance.PerformanceBudgetMiddleware",  # Outermost, so it times the whole stack
+    "moviebooking.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "whitenoise.middleware.WhiteNoiseMiddleware",  # Serve static files in production
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "moviebooking.db_router.ReplicaMiddleware",  # Needs the session for read-your-writes pinning
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -60,6 +65,27 @@ MIDDLEWARE = [
 if HAS_DEBUG_TOOLBAR:
     MIDDLEWARE.append("debug_toolbar.middleware.DebugToolbarMiddleware")
 
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+
+# Share of requests profiled by PerformanceBudgetMiddleware (every request under tests)
+PERF_SAMPLE_RATE = 1.0 if TESTING else float(os.environ.get('PERF_SAMPLE_RATE', '0.05'))
+
+# Prometheus metrics: each worker process writes its counters here, /metrics sums them
+METRICS_DIR = os.environ.get('METRICS_DIR', os.path.join(tempfile.gettempdir(), 'moviebooking-metrics'))
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN')  # Scrapers send "Authorization: Bearer <token>"; unset, only staff can read /metrics
+
+# Per-view query/latency budgets (URL names); 'default' applies to every view
+PERF_BUDGETS = {
+    'default': {'queries': 30, 'ms': 500},
+    'home': {'queries': 15},
+    'movie_list': {'queries': 15},
+    'movie_detail': {'queries': 20},
+    'select_seats': {'queries': 10},
+    'get_seat_status': {'queries': 10},
+    'my_bookings': {'queries': 10},
+    'booking_detail': {'queries': 10},
+}
+
 ROOT_URLCONF = "moviebooking.urls"
 
 TEMPLATES = [
@@ -100,6 +126,9 @@ if os.environ.get('DATABASE_URL'):
             conn_health_checks=True,
         )
     }
+    # Streaming replicas of the primary for browse and analytics reads, comma-separated
+    for index, url in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_URLS', '').split(',')), start=1):
+        DATABASES[f'replica_{index}'] = dj_database_url.parse(url.strip(), conn_max_age=600, conn_health_checks=True)
 else:
     DATABASES = {
         "default": {
@@ -123,8 +152,31 @@ else:
             cursor.execute('PRAGMA busy_timeout=20000;')  # 20 second timeout
             cursor.close()
 
+    # Local replica runs: copy db.sqlite3 and name the copies here, comma-separated (nothing syncs them)
+    for index, name in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_SQLITE', '').split(',')), start=1):
+        DATABASES[f'replica_{index}'] = {**DATABASES['default'], 'NAME': BASE_DIR / name.strip()}
+
+if TESTING:
+    # Replicas mirror the test database; READ_REPLICAS stays empty unless a test opts in
+    DATABASES = {
+        alias: {**config, 'TEST': {'MIRROR': 'default'}} if alias != 'default' else config
+        for alias, config in DATABASES.items()
+    }
+    DATABASES.setdefault('replica_1', {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}})
+
 if not DEBUG:
     DATABASES['default']['CONN_MAX_AGE'] = 600
+
+# Read-only views (URL names) served from the replicas; see moviebooking/db_router.py. A request that writes
+# pins that session's reads to the primary for READ_REPLICA_PIN_SECONDS, so users see their own changes.
+DATABASE_ROUTERS = ['moviebooking.db_router.ReplicaRouter']
+READ_REPLICAS = [] if TESTING else [alias for alias in DATABASES if alias.startswith('replica_')]
+READ_REPLICA_PIN_SECONDS = int(os.environ.get('READ_REPLICA_PIN_SECONDS', '10'))
+READ_REPLICA_VIEWS = {
+    'home', 'movie_list', 'movie_detail', 'movie_trailer', 'movie_autocomplete',
+    'custom_admin:api_stats', 'custom_admin:api_revenue', 'custom_admin:api_bookings', 'custom_admin:api_theaters',
+    'custom_admin:api_filter_options', 'custom_admin:api_dashboard_filtered', 'custom_admin:api_occupancy',
+}
 CACHES = {
     'default': {
         'BACKEND': 'django_redis.cache.RedisCache',
@@ -139,6 +191,23 @@ CACHES = {
     }
 }
 
+# In-process L1 in front of Redis for read-mostly families (see moviebooking/l1cache.py). Off under tests:
+# fixtures rolled back between tests never fire the invalidation signals.
+L1_CACHE = {
+    'ENABLED': not TESTING and os.environ.get('L1_CACHE', '1') == '1',
+    'MAX_ENTRIES': int(os.environ.get('L1_CACHE_MAX_ENTRIES', '2048')),
+}
+
+# REDIS_URL=local:// swaps Redis for an in-process stand-in (tests, benchmarks, offline work).
+# It is per process: anything that forks workers needs a real Redis.
+if os.environ.get('REDIS_URL', '').startswith('local://'):
+    CACHES['default'] = {
+        'BACKEND': 'moviebooking.localredis.LocalRedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+        'OPTIONS': {'ROUND_TRIP_MS': float(os.environ.get('LOCAL_REDIS_ROUND_TRIP_MS', '0'))},
+        'KEY_PREFIX': 'moviebooking',
+    }
+
 CSRF_TRUSTED_ORIGINS = [
     'https://moviebookingapp-production-0bce.up.railway.app',
     'https://*.railway.app',
@@ -200,6 +269,25 @@ MESSAGE_TAGS = {
 
 SEAT_RESERVATION_TIMEOUT=720  # 12 minutes to match Razorpay timeout 
 
+# Seat hold engine (bookings/seat_store.py): legacy (hold list in the cache), locks (a Redis key per seat),
+# lua (scripted hash of holds + sold-seat bitmap) or db (PENDING bookings only, no Redis; SQLite development).
+# CANDIDATE serves CANDIDATE_PERCENT of showtimes (by id) for A/B runs. Showtimes moved between engines mid-sale
+# leave in-flight holds behind on the old one; the payment-time seat check still catches any clash.
+SEAT_STORE = {
+    'BACKEND': os.environ.get('SEAT_STORE', 'legacy'),
+    'CANDIDATE': os.environ.get('SEAT_STORE_CANDIDATE') or None,
+    'CANDIDATE_PERCENT': int(os.environ.get('SEAT_STORE_CANDIDATE_PERCENT', '0')),
+}
+
+RECOMMENDATION_TOP_K = 12  # Similar movies stored per movie by movies.recommendations
+
+OCCUPANCY_WINDOW_DAYS = 90  # Past showtimes kept in the occupancy snapshot (future ones are always included)
+
+# Finished bookings move to BookingArchive this many days after their showtime (bookings/archive.py).
+# Keep it above OCCUPANCY_WINDOW_DAYS: the occupancy snapshot only reads live bookings.
+BOOKING_ARCHIVE_AFTER_DAYS = int(os.environ.get('BOOKING_ARCHIVE_AFTER_DAYS', '180'))
+BOOKING_ARCHIVE_BATCH_SIZE = 500
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -8,6 +8,8 @@ from django.views import View
 from django.http import FileResponse
 import os
 
+from .metrics import metrics_view
+
 class MediaServeView(View):
     def get(self, request, path):
         file_path = os.path.join(settings.MEDIA_ROOT, path)
@@ -23,6 +25,7 @@ def home_redirect(request):
 urlpatterns = [
     path('custom-admin/', include('custom_admin.urls')),
     path('admin/', admin.site.urls),
+    path('metrics', metrics_view, name='metrics'),
     path('accounts/', include('accounts.urls')),
     path('bookings/', include('bookings.urls')),
     path('', include('movies.urls')),  # Include movies app URLs (handles home page)
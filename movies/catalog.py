@@ -0,0 +1,30 @@
+import logging
+
+from moviebooking.l1cache import L1Cache
+
+from .models import Genre, Language
+
+logger = logging.getLogger(__name__)
+
+class Catalog:
+
+    # Filter lists that change a few times a year; kept in both cache tiers and dropped on any edit
+    GENRES_KEY = 'catalog_genres'
+    LANGUAGES_KEY = 'catalog_languages'
+    TIMEOUT = 3600
+
+    @staticmethod
+    def genres():
+        return L1Cache.get('genres', Catalog.GENRES_KEY, loader=lambda: list(Genre.objects.all()), timeout=Catalog.TIMEOUT)
+
+    @staticmethod
+    def languages():
+        return L1Cache.get('languages', Catalog.LANGUAGES_KEY, loader=lambda: list(Language.objects.all()), timeout=Catalog.TIMEOUT)
+
+    @staticmethod
+    def invalidate(family):
+
+        try:
+            L1Cache.delete(family, Catalog.GENRES_KEY if family == 'genres' else Catalog.LANGUAGES_KEY)
+        except Exception as e:
+            logger.error(f"Catalog cache invalidation failed for {family}: {e}")
@@ -0,0 +1,143 @@
+import logging
+from collections import defaultdict
+
+from django.db import connection, transaction
+from django.db.models import Count, F, Q, Value
+from django.db.models.functions import Greatest
+from moviebooking.redis_client import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+class CounterBuffer:
+
+    PENDING_KEY = "moviebooking:v2:counters:pending"
+
+    # Counter families that may be buffered: family -> (model path, counter columns)
+    FAMILIES = {
+        'review': ('movies.reviews_models.Review', ('likes', 'dislikes')),
+        'movie': ('movies.models.Movie', ('wishlist_count', 'interest_count')),
+    }
+
+    @staticmethod
+    def _model(family):
+        from django.utils.module_loading import import_string
+        return import_string(CounterBuffer.FAMILIES[family][0])
+
+    @staticmethod
+    def _apply(family, field, delta, ids):
+        if field not in CounterBuffer.FAMILIES[family][1]:
+            raise ValueError(f"Unknown counter {family}.{field}")
+        return CounterBuffer._model(family).objects.filter(pk__in=ids).update(
+            **{field: Greatest(F(field) + delta, Value(0))}
+        )
+
+    @staticmethod
+    def increment(family, pk, field, delta=1):
+
+        # Buffered only once the row change commits, so a rollback never leaves a phantom delta behind
+        transaction.on_commit(lambda: CounterBuffer._buffer(family, pk, field, delta))
+
+    @staticmethod
+    def _buffer(family, pk, field, delta):
+
+        # O(1) HINCRBY on the pending hash; hot rows are only touched by the periodic flush
+        try:
+            redis_conn = get_redis_connection("default")
+            redis_conn.hincrby(CounterBuffer.PENDING_KEY, f"{family}:{pk}:{field}", delta)
+        except Exception as e:
+            logger.error(f"Counter buffer unavailable ({e}), writing {family}.{field} for {pk} directly")
+            CounterBuffer._apply(family, field, delta, [pk])
+
+    @staticmethod
+    def _drain():
+
+        redis_conn = get_redis_connection("default")
+        pipe = redis_conn.pipeline(transaction=True)
+        pipe.hgetall(CounterBuffer.PENDING_KEY)
+        pipe.delete(CounterBuffer.PENDING_KEY)
+        pending, _ = pipe.execute()
+        return pending
+
+    @staticmethod
+    def flush():
+
+        pending = CounterBuffer._drain()
+
+        # One UPDATE per (counter, delta) pair instead of one per row
+        grouped = defaultdict(list)
+        for member, delta in pending.items():
+            family, pk, field = member.decode('utf-8').split(':')
+            delta = int(delta)
+            if delta:
+                grouped[(family, field, delta)].append(int(pk))
+
+        updated = 0
+        for (family, field, delta), ids in grouped.items():
+            updated += CounterBuffer._apply(family, field, delta, ids)
+
+        if pending:
+            logger.info(f"Flushed {len(pending)} buffered counters in {len(grouped)} updates")
+        return updated
+
+    @staticmethod
+    def repair():
+
+        from .reviews_models import ReviewLike, Wishlist, Interest
+
+        with transaction.atomic():
+            # Hold off likes/wishlists/interests while recounting, and drop the pending deltas rather than
+            # flushing them: every delta in the hash is for a committed row the recount already includes,
+            # and one buffered between a flush and the recount would otherwise be applied twice.
+            # SQLite has no table locks: a no-op UPDATE takes its database write lock instead.
+            if connection.vendor == 'postgresql':
+                tables = ', '.join(
+                    connection.ops.quote_name(model._meta.db_table) for model in (ReviewLike, Wishlist, Interest)
+                )
+                with connection.cursor() as cursor:
+                    cursor.execute(f'LOCK TABLE {tables} IN SHARE MODE')
+            else:
+                ReviewLike.objects.filter(pk=0).update(id=F('id'))
+            CounterBuffer._drain()
+
+            return CounterBuffer._recount()
+
+    @staticmethod
+    def _recount():
+
+        from .models import Movie
+        from .reviews_models import Review, ReviewLike, Wishlist, Interest
+
+        like_counts = {
+            row['review_id']: (row['likes'], row['dislikes'])
+            for row in ReviewLike.objects.values('review_id').annotate(
+                likes=Count('id', filter=Q(is_like=True)),
+                dislikes=Count('id', filter=Q(is_like=False)),
+            )
+        }
+        wishlist_counts = dict(Wishlist.objects.values('movie_id').annotate(n=Count('id')).values_list('movie_id', 'n'))
+        interest_counts = dict(Interest.objects.values('movie_id').annotate(n=Count('id')).values_list('movie_id', 'n'))
+
+        drifted_reviews = []
+        for review in Review.objects.filter(
+            Q(id__in=list(like_counts)) | Q(likes__gt=0) | Q(dislikes__gt=0)
+        ).only('id', 'likes', 'dislikes'):
+            expected = like_counts.get(review.id, (0, 0))
+            if (review.likes, review.dislikes) != expected:
+                review.likes, review.dislikes = expected
+                drifted_reviews.append(review)
+
+        drifted_movies = []
+        for movie in Movie.objects.filter(
+            Q(id__in=list(wishlist_counts)) | Q(id__in=list(interest_counts)) |
+            Q(wishlist_count__gt=0) | Q(interest_count__gt=0)
+        ).only('id', 'wishlist_count', 'interest_count'):
+            expected = (wishlist_counts.get(movie.id, 0), interest_counts.get(movie.id, 0))
+            if (movie.wishlist_count, movie.interest_count) != expected:
+                movie.wishlist_count, movie.interest_count = expected
+                drifted_movies.append(movie)
+
+        Review.objects.bulk_update(drifted_reviews, ['likes', 'dislikes'], batch_size=500)
+        Movie.objects.bulk_update(drifted_movies, ['wishlist_count', 'interest_count'], batch_size=500)
+
+        logger.info(f"Counter repair: fixed {len(drifted_reviews)} reviews, {len(drifted_movies)} movies")
+        return len(drifted_reviews), len(drifted_movies)
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+from movies.recommendations import RecommendationBuilder
+
+class Command(BaseCommand):
+    help = 'Recompute the precomputed top-K similar movies used on the movie detail page'
+
+    def handle(self, *args, **options):
+        self.stdout.write('Building movie similarity matrix...')
+
+        count = RecommendationBuilder.build()
+
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ Stored {count} recommendations (top {RecommendationBuilder.top_k()} per movie)')
+        )
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Sum, Q
+from movies.models import Movie
+from movies.reviews_models import Review
+
+class Command(BaseCommand):
+    help = 'Recompute Movie rating aggregates from Review rows in a single GROUP BY pass'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help='Report drift without writing')
+
+    def handle(self, *args, **options):
+        aggregates = {
+            row['movie_id']: row
+            for row in Review.objects.values('movie_id').annotate(total=Sum('rating'), count=Count('id'))
+        }
+
+        movies = Movie.objects.filter(
+            Q(id__in=list(aggregates)) | Q(rating_count__gt=0)
+        ).only('id', 'title', 'total_rating', 'rating_count', 'rating')
+
+        drifted = []
+        for movie in movies:
+            row = aggregates.get(movie.id, {'total': 0.0, 'count': 0})
+            total, count = float(row['total'] or 0.0), row['count']
+            rating = total / count if count else 0.0
+
+            if (movie.rating_count, round(movie.total_rating, 4), round(movie.rating, 4)) != (count, round(total, 4), round(rating, 4)):
+                self.stdout.write(
+                    f'  {movie.title}: count {movie.rating_count} -> {count}, rating {movie.rating:.2f} -> {rating:.2f}'
+                )
+                movie.total_rating, movie.rating_count, movie.rating = total, count, rating
+                drifted.append(movie)
+
+        if options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'⚠️ {len(drifted)} movies drifted (dry run, nothing written)'))
+            return
+
+        Movie.objects.bulk_update(drifted, ['total_rating', 'rating_count', 'rating'], batch_size=500)
+        self.stdout.write(self.style.SUCCESS(f'✅ Reconciled ratings for {len(drifted)} movies'))
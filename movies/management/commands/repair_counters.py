@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+from movies.counters import CounterBuffer
+
+class Command(BaseCommand):
+    help = 'Flush buffered like/wishlist/interest counters and repair drift against the source tables'
+
+    def handle(self, *args, **options):
+        reviews, movies = CounterBuffer.repair()
+
+        self.stdout.write(
+            self.style.SUCCESS(f'✅ Counters repaired: {reviews} reviews, {movies} movies')
+        )
@@ -0,0 +1,23 @@
+# Generated by Django 4.2 on 2026-10-19 02:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0007_reinstate_reviews_movierecommendation'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='movie',
+            name='interest_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='movie',
+            name='wishlist_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2 on 2026-10-19 02:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0008_movie_wishlist_count_movie_interest_count'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['movie', '-created_at', '-id'], name='review_feed_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['movie', '-likes', '-id'], name='review_feed_helpful_idx'),
+        ),
+    ]
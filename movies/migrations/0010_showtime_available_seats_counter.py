@@ -0,0 +1,19 @@
+# Generated by Django 4.2 on 2026-10-19 02:31
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0009_review_feed_indexes'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='showtime',
+            name='available_seats',
+            field=models.IntegerField(default=100, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+    ]
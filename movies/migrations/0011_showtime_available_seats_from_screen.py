@@ -0,0 +1,19 @@
+# Generated by Django 4.2 on 2026-10-19 04:15
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0010_showtime_available_seats_counter'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='showtime',
+            name='available_seats',
+            field=models.IntegerField(blank=True, default=None, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated manually: seed the seat counter on existing showtimes so nobody has to run repair_seat_inventory --all
+
+import django.core.validators
+from django.db import migrations, models
+from django.db.models import Sum
+
+
+def backfill_available_seats(apps, schema_editor):
+    # Same rule as SeatInventory.repair(): screen capacity minus seats held by PENDING/CONFIRMED bookings
+    Showtime = apps.get_model('movies', 'Showtime')
+    Booking = apps.get_model('bookings', 'Booking')
+
+    held = dict(
+        Booking.objects.filter(status__in=('PENDING', 'CONFIRMED')).order_by().values('showtime_id').annotate(
+            seats=Sum('total_seats')
+        ).values_list('showtime_id', 'seats')
+    )
+
+    showtimes = []
+    for showtime in Showtime.objects.select_related('screen').only('id', 'available_seats', 'screen__total_seats'):
+        showtime.available_seats = max(showtime.screen.total_seats - (held.get(showtime.id) or 0), 0)
+        showtimes.append(showtime)
+    Showtime.objects.bulk_update(showtimes, ['available_seats'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0011_showtime_available_seats_from_screen'),
+        ('bookings', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='showtime',
+            name='available_seats',
+            field=models.IntegerField(blank=True, null=True, validators=[django.core.validators.MinValueValidator(0)]),
+        ),
+        migrations.RunPython(backfill_available_seats, migrations.RunPython.noop),
+    ]
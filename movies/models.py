@@ -1,4 +1,6 @@
 from django.db import models
+from django.db.models import F, Case, When, Value, FloatField
+from django.db.models.functions import Cast
 from django.utils.text import slugify
 
 from embed_video.fields import EmbedVideoField
@@ -93,6 +95,9 @@ class Movie(models.Model):
     rating_count = models.IntegerField(default=0)
     total_rating = models.FloatField(default=0.0)
 
+    wishlist_count = models.PositiveIntegerField(default=0)  # Maintained by movies.counters
+    interest_count = models.PositiveIntegerField(default=0)
+
     @property
     def youtube_id(self):
         import re
@@ -102,11 +107,31 @@ class Movie(models.Model):
             return match.group(1)
         return None 
 
-    def update_rating(self, new_rating):
-        self.total_rating += new_rating
-        self.rating_count += 1
-        self.rating = self.total_rating / self.rating_count
-        self.save()
+    def update_rating(self, new_rating, refresh=False):
+        self._apply_rating_delta(new_rating, 1, refresh)
+
+    def change_rating(self, old_rating, new_rating, refresh=False):
+        self._apply_rating_delta(new_rating - old_rating, 0, refresh)
+
+    def remove_rating(self, old_rating, refresh=False):
+        self._apply_rating_delta(-old_rating, -1, refresh)
+
+    def _apply_rating_delta(self, total_delta, count_delta, refresh=False):
+        # One UPDATE of the aggregate columns only: the database applies the deltas,
+        # so concurrent reviews never overwrite each other and save() side effects are skipped.
+        new_count = F('rating_count') + count_delta
+        updated = Movie.objects.filter(pk=self.pk).update(
+            total_rating=F('total_rating') + total_delta,
+            rating_count=new_count,
+            rating=Case(
+                When(rating_count__gt=-count_delta, then=(F('total_rating') + total_delta) / Cast(new_count, FloatField())),
+                default=Value(0.0),
+                output_field=FloatField(),
+            ),
+        )
+        # Only for callers that read the instance afterwards; the review signals don't
+        if updated and refresh:
+            self.refresh_from_db(fields=['total_rating', 'rating_count', 'rating'])
 
     def get_average_rating(self):
 
@@ -122,4 +147,21 @@ class Movie(models.Model):
         return reverse('movie_detail', kwargs={'slug': self.slug})
 
     class Meta:
-        ordering = ['-release_date', 'title']
\ No newline at end of file
+        ordering = ['-release_date', 'title']
+
+class MovieRecommendation(models.Model):
+
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='recommendations')
+    recommended = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='recommended_for')
+    score = models.FloatField(default=0.0)
+    rank = models.PositiveSmallIntegerField()  # 0 = most similar
+
+    def __str__(self):
+        return f"{self.movie_id} -> {self.recommended_id} (#{self.rank})"
+
+    class Meta:
+        ordering = ['movie', 'rank']
+        unique_together = ('movie', 'rank')
+
+
+from .reviews_models import Review, ReviewLike, Wishlist, Interest  # noqa: E402,F401  register review models
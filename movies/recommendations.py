@@ -0,0 +1,162 @@
+import logging
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from .models import Movie, MovieRecommendation
+from .reviews_models import Wishlist, Interest
+
+logger = logging.getLogger(__name__)
+
+class RecommendationBuilder:
+
+    GENRE_WEIGHT = 0.45
+    LANGUAGE_WEIGHT = 0.15
+    CO_BOOKING_WEIGHT = 0.25
+    CO_WISHLIST_WEIGHT = 0.15
+
+    USER_CHUNK_SIZE = 5000  # Rows of the user x movie matrix materialized at once
+
+    @staticmethod
+    def top_k():
+        return getattr(settings, 'RECOMMENDATION_TOP_K', 12)
+
+    @staticmethod
+    def _cosine(matrix):
+
+        norms = np.sqrt(np.einsum('ij,ij->i', matrix, matrix))
+        norms[norms == 0] = 1.0
+        normalized = matrix / norms[:, None]
+        return normalized @ normalized.T
+
+    @staticmethod
+    def _co_occurrence(pairs, sorted_movie_ids):
+
+        # pairs: iterable of (user_id, movie_id); returns cosine-normalized movie x movie counts
+        n_movies = len(sorted_movie_ids)
+        if not pairs:
+            return np.zeros((n_movies, n_movies), dtype=np.float32)
+
+        data = np.array(pairs, dtype=np.int64)
+        movie_cols = np.minimum(np.searchsorted(sorted_movie_ids, data[:, 1]), n_movies - 1)
+        keep = sorted_movie_ids[movie_cols] == data[:, 1]
+        user_ids, movie_cols = data[keep, 0], movie_cols[keep]
+        _, user_rows = np.unique(user_ids, return_inverse=True)
+        n_users = int(user_rows.max()) + 1 if len(user_rows) else 0
+
+        co = np.zeros((n_movies, n_movies), dtype=np.float32)
+        chunk = RecommendationBuilder.USER_CHUNK_SIZE
+        for start in range(0, n_users, chunk):
+            in_chunk = (user_rows >= start) & (user_rows < start + chunk)
+            block = np.zeros((min(chunk, n_users - start), n_movies), dtype=np.float32)
+            block[user_rows[in_chunk] - start, movie_cols[in_chunk]] = 1.0
+            co += block.T @ block
+
+        diag = np.sqrt(np.diag(co)).copy()
+        diag[diag == 0] = 1.0
+        return co / diag[:, None] / diag[None, :]
+
+    @staticmethod
+    def compute_similarity(movie_ids, genre_pairs, language_ids, booking_pairs, wishlist_pairs):
+
+        n = len(movie_ids)
+        sorted_ids = np.array(movie_ids, dtype=np.int64)  # build() passes ids in ascending order
+        index = {movie_id: i for i, movie_id in enumerate(movie_ids)}
+
+        genre_ids = sorted({genre_id for _, genre_id in genre_pairs})
+        genre_index = {genre_id: j for j, genre_id in enumerate(genre_ids)}
+        genres = np.zeros((n, max(len(genre_ids), 1)), dtype=np.float32)
+        for movie_id, genre_id in genre_pairs:
+            if movie_id in index:
+                genres[index[movie_id], genre_index[genre_id]] = 1.0
+
+        languages = np.array([lang if lang is not None else -1 for lang in language_ids], dtype=np.int64)
+        same_language = (languages[:, None] == languages[None, :]) & (languages[:, None] >= 0)
+
+        score = (
+            RecommendationBuilder.GENRE_WEIGHT * RecommendationBuilder._cosine(genres)
+            + RecommendationBuilder.LANGUAGE_WEIGHT * same_language.astype(np.float32)
+            + RecommendationBuilder.CO_BOOKING_WEIGHT * RecommendationBuilder._co_occurrence(booking_pairs, sorted_ids)
+            + RecommendationBuilder.CO_WISHLIST_WEIGHT * RecommendationBuilder._co_occurrence(wishlist_pairs, sorted_ids)
+        )
+        np.fill_diagonal(score, -np.inf)
+        return score
+
+    @staticmethod
+    def top_neighbours(score, k):
+
+        n = score.shape[0]
+        k = min(k, n - 1)
+        if k <= 0:
+            return np.empty((n, 0), dtype=np.int64), np.empty((n, 0), dtype=np.float32)
+
+        candidates = np.argpartition(-score, k - 1, axis=1)[:, :k]
+        candidate_scores = np.take_along_axis(score, candidates, axis=1)
+        order = np.argsort(-candidate_scores, axis=1, kind='stable')
+        neighbours = np.take_along_axis(candidates, order, axis=1)
+        return neighbours, np.take_along_axis(candidate_scores, order, axis=1)
+
+    @staticmethod
+    def build():
+
+        from bookings.models import Booking
+
+        movies = list(Movie.objects.filter(is_active=True).values_list('id', 'language_id').order_by('id'))
+        if len(movies) < 2:
+            MovieRecommendation.objects.all().delete()
+            return 0
+
+        movie_ids = [movie_id for movie_id, _ in movies]
+        language_ids = [language_id for _, language_id in movies]
+
+        genre_pairs = list(Movie.genres.through.objects.filter(
+            movie_id__in=movie_ids
+        ).values_list('movie_id', 'genre_id'))
+
+        booking_pairs = list(Booking.objects.filter(
+            status='CONFIRMED'
+        ).values_list('user_id', 'showtime__movie_id').distinct())
+
+        wishlist_pairs = list(set(Wishlist.objects.values_list('user_id', 'movie_id')) |
+                              set(Interest.objects.values_list('user_id', 'movie_id')))
+
+        score = RecommendationBuilder.compute_similarity(
+            movie_ids, genre_pairs, language_ids, booking_pairs, wishlist_pairs
+        )
+        neighbours, scores = RecommendationBuilder.top_neighbours(score, RecommendationBuilder.top_k())
+
+        rows = [
+            MovieRecommendation(
+                movie_id=movie_ids[i],
+                recommended_id=movie_ids[j],
+                score=float(scores[i, rank]),
+                rank=rank,
+            )
+            for i in range(len(movie_ids))
+            for rank, j in enumerate(neighbours[i])
+            if scores[i, rank] > 0
+        ]
+
+        with transaction.atomic():
+            MovieRecommendation.objects.all().delete()
+            MovieRecommendation.objects.bulk_create(rows, batch_size=1000)
+
+        logger.info(f"Built {len(rows)} recommendations for {len(movie_ids)} movies")
+        return len(rows)
+
+def get_recommended_movies(movie, limit=4):
+
+    recommended = list(Movie.objects.filter(
+        recommended_for__movie=movie,
+        is_active=True
+    ).order_by('recommended_for__rank')[:limit])
+
+    if recommended:
+        return recommended
+
+    # Not built yet (fresh install or brand new movie): fall back to a genre match
+    return list(Movie.objects.filter(
+        genres__in=movie.genres.all(),
+        is_active=True
+    ).exclude(id=movie.id).distinct()[:limit])
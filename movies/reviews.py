@@ -0,0 +1,130 @@
+import base64
+import binascii
+import logging
+
+from django.core.cache import cache
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from .reviews_models import Review, ReviewLike
+
+logger = logging.getLogger(__name__)
+
+class ReviewFeed:
+
+    # sort name -> (keyset column, ordering); both orderings are backed by an index on Review
+    SORTS = {
+        'recent': ('created_at', ['-created_at', '-id']),
+        'helpful': ('likes', ['-likes', '-id']),
+    }
+    DEFAULT_SORT = 'recent'
+    PAGE_SIZE = 10
+    MAX_PAGE_SIZE = 50
+    FIRST_PAGE_TIMEOUT = 300
+
+    @staticmethod
+    def cache_key(movie_id, sort):
+        return f"review_feed_{movie_id}_{sort}"
+
+    @staticmethod
+    def invalidate(movie_id):
+
+        try:
+            cache.delete_many([ReviewFeed.cache_key(movie_id, sort) for sort in ReviewFeed.SORTS])
+        except Exception as e:
+            logger.error(f"Review feed invalidation error for movie {movie_id}: {e}")
+
+    @staticmethod
+    def encode_cursor(review, sort):
+        column = ReviewFeed.SORTS[sort][0]
+        value = review.created_at.isoformat() if column == 'created_at' else review.likes
+        # Opaque and URL-safe, so a '+00:00' offset survives the query string untouched
+        return base64.urlsafe_b64encode(f"{value}|{review.id}".encode()).decode().rstrip('=')
+
+    @staticmethod
+    def decode_cursor(cursor, sort):
+
+        try:
+            raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+            value, review_id = raw.rsplit('|', 1)
+            review_id = int(review_id)
+            if ReviewFeed.SORTS[sort][0] == 'created_at':
+                value = parse_datetime(value)
+                if value is None:
+                    return None
+            else:
+                value = int(value)
+            return value, review_id
+        except (ValueError, TypeError, AttributeError, binascii.Error):
+            return None
+
+    @staticmethod
+    def _fetch_page(movie_id, sort, limit, cursor=None):
+
+        column, ordering = ReviewFeed.SORTS[sort]
+        reviews = Review.objects.filter(movie_id=movie_id).select_related('user').order_by(*ordering)
+
+        if cursor:
+            value, review_id = cursor
+            reviews = reviews.filter(
+                Q(**{f'{column}__lt': value}) | Q(**{column: value, 'id__lt': review_id})
+            )
+
+        # One extra row tells us whether another page exists
+        page = list(reviews[:limit + 1])
+        has_more = len(page) > limit
+        page = page[:limit]
+
+        return {
+            'results': [
+                {
+                    'id': review.id,
+                    'user': review.user.username,
+                    'rating': review.rating,
+                    'title': review.title,
+                    'content': review.content,
+                    'likes': review.likes,
+                    'dislikes': review.dislikes,
+                    'created_at': review.created_at.isoformat(),
+                }
+                for review in page
+            ],
+            'next_cursor': ReviewFeed.encode_cursor(page[-1], sort) if has_more else None,
+        }
+
+    @staticmethod
+    def get_page(movie_id, sort=None, cursor=None, limit=None, user=None):
+
+        sort = sort if sort in ReviewFeed.SORTS else ReviewFeed.DEFAULT_SORT
+        limit = max(1, min(limit or ReviewFeed.PAGE_SIZE, ReviewFeed.MAX_PAGE_SIZE))
+        decoded = None
+        if cursor:
+            decoded = ReviewFeed.decode_cursor(cursor, sort)
+            if decoded is None:
+                # Falling back to page one would send a paging client round in circles
+                raise ValueError("Invalid cursor")
+
+        if decoded is None and limit == ReviewFeed.PAGE_SIZE:
+            cache_key = ReviewFeed.cache_key(movie_id, sort)
+            page = cache.get(cache_key)
+            if page is None:
+                page = ReviewFeed._fetch_page(movie_id, sort, limit)
+                cache.set(cache_key, page, timeout=ReviewFeed.FIRST_PAGE_TIMEOUT)
+        else:
+            page = ReviewFeed._fetch_page(movie_id, sort, limit, decoded)
+
+        # Viewer state is per user, so it is merged in after the shared (cacheable) page
+        liked = {}
+        if user is not None and user.is_authenticated and page['results']:
+            liked = dict(ReviewLike.objects.filter(
+                user=user,
+                review_id__in=[review['id'] for review in page['results']]
+            ).values_list('review_id', 'is_like'))
+
+        results = [
+            dict(review, viewer_reaction=(
+                None if review['id'] not in liked else ('like' if liked[review['id']] else 'dislike')
+            ))
+            for review in page['results']
+        ]
+        return {'sort': sort, 'results': results, 'next_cursor': page['next_cursor']}
@@ -16,6 +16,13 @@ class Review(models.Model):
     def __str__(self):
         return f"{self.user.username}'s review for {self.movie.title}"
 
+    class Meta:
+        indexes = [
+            # Keyset pagination for the review feed (movies.reviews.ReviewFeed)
+            models.Index(fields=['movie', '-created_at', '-id'], name='review_feed_recent_idx'),
+            models.Index(fields=['movie', '-likes', '-id'], name='review_feed_helpful_idx'),
+        ]
+
 class ReviewLike(models.Model):
     user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE)
     review = models.ForeignKey(Review, on_delete=models.CASCADE, related_name='review_likes')
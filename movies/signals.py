@@ -0,0 +1,74 @@
+from django.db import transaction
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from movies.models import Movie, Genre, Language
+from movies.catalog import Catalog
+from movies.reviews_models import Review, ReviewLike, Wishlist, Interest
+from movies.counters import CounterBuffer
+from movies.reviews import ReviewFeed
+
+@receiver(post_init, sender=Review)
+def remember_review_rating(sender, instance, **kwargs):
+    instance._rating_at_load = instance.rating
+
+@receiver(post_save, sender=Review)
+def apply_review_rating(sender, instance, created, **kwargs):
+    movie = Movie(pk=instance.movie_id)
+    if created:
+        movie.update_rating(instance.rating)
+    elif instance._rating_at_load is not None and instance._rating_at_load != instance.rating:
+        movie.change_rating(instance._rating_at_load, instance.rating)
+    instance._rating_at_load = instance.rating
+    ReviewFeed.invalidate(instance.movie_id)
+
+@receiver(post_delete, sender=Review)
+def remove_review_rating(sender, instance, **kwargs):
+    Movie(pk=instance.movie_id).remove_rating(instance._rating_at_load)
+    ReviewFeed.invalidate(instance.movie_id)
+
+@receiver(post_init, sender=ReviewLike)
+def remember_review_like(sender, instance, **kwargs):
+    instance._is_like_at_load = instance.is_like
+
+@receiver(post_save, sender=ReviewLike)
+def count_review_like(sender, instance, created, **kwargs):
+    field = 'likes' if instance.is_like else 'dislikes'
+    if created:
+        CounterBuffer.increment('review', instance.review_id, field, 1)
+    elif instance._is_like_at_load != instance.is_like:
+        CounterBuffer.increment('review', instance.review_id, field, 1)
+        CounterBuffer.increment('review', instance.review_id, 'dislikes' if instance.is_like else 'likes', -1)
+    instance._is_like_at_load = instance.is_like
+
+@receiver(post_delete, sender=ReviewLike)
+def uncount_review_like(sender, instance, **kwargs):
+    CounterBuffer.increment('review', instance.review_id, 'likes' if instance._is_like_at_load else 'dislikes', -1)
+
+@receiver(post_save, sender=Wishlist)
+def count_wishlist(sender, instance, created, **kwargs):
+    if created:
+        CounterBuffer.increment('movie', instance.movie_id, 'wishlist_count', 1)
+
+@receiver(post_delete, sender=Wishlist)
+def uncount_wishlist(sender, instance, **kwargs):
+    CounterBuffer.increment('movie', instance.movie_id, 'wishlist_count', -1)
+
+@receiver(post_save, sender=Interest)
+def count_interest(sender, instance, created, **kwargs):
+    if created:
+        CounterBuffer.increment('movie', instance.movie_id, 'interest_count', 1)
+
+@receiver(post_delete, sender=Interest)
+def uncount_interest(sender, instance, **kwargs):
+    CounterBuffer.increment('movie', instance.movie_id, 'interest_count', -1)
+
+@receiver(post_save, sender=Genre)
+@receiver(post_delete, sender=Genre)
+def invalidate_genre_list(sender, instance, **kwargs):
+    # After commit, so no process can reload the old list between the invalidation and the commit
+    transaction.on_commit(lambda: Catalog.invalidate('genres'))
+
+@receiver(post_save, sender=Language)
+@receiver(post_delete, sender=Language)
+def invalidate_language_list(sender, instance, **kwargs):
+    transaction.on_commit(lambda: Catalog.invalidate('languages'))
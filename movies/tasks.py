@@ -0,0 +1,52 @@
+
+try:
+    from celery import shared_task
+except ImportError:
+    def shared_task(*args, **kwargs):
+        def decorator(func):
+            return func
+        return decorator
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+@shared_task
+def build_recommendations():
+
+    from .recommendations import RecommendationBuilder
+
+    try:
+        count = RecommendationBuilder.build()
+        result = f"Built {count} movie recommendations"
+        logger.info(result)
+        return result
+    except Exception as e:
+        logger.error(f"Error in build_recommendations task: {e}")
+        return f"Error: {e}"
+
+@shared_task
+def flush_counters():
+
+    from .counters import CounterBuffer
+
+    try:
+        updated = CounterBuffer.flush()
+        return f"Flushed counters into {updated} rows"
+    except Exception as e:
+        logger.error(f"Error in flush_counters task: {e}")
+        return f"Error: {e}"
+
+@shared_task
+def repair_counters():
+
+    from .counters import CounterBuffer
+
+    try:
+        reviews, movies = CounterBuffer.repair()
+        result = f"Repaired counters on {reviews} reviews and {movies} movies"
+        logger.info(result)
+        return result
+    except Exception as e:
+        logger.error(f"Error in repair_counters task: {e}")
+        return f"Error: {e}"
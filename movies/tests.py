@@ -1,2 +1,632 @@
-from django.test import TestCase
+import time
+from io import StringIO
+from unittest import mock
+from django.core.management import call_command
+from django.db import IntegrityError, connection, connections, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.utils import timezone
+from .models import Movie, Genre, Language, MovieRecommendation
+from .reviews_models import Review, ReviewLike, Wishlist, Interest
+from .counters import CounterBuffer
+from .theater_models import City, Theater, Screen, Showtime
+from .recommendations import RecommendationBuilder, get_recommended_movies
+from .trending import TrendingTracker
+from .catalog import Catalog
+from moviebooking.l1cache import L1Cache
+from moviebooking.localredis import LocalRedis
+from moviebooking.db_router import ReplicaRouter
+from bookings.tests import QueryBudgetMixin
 
+class RecommendationBuilderTests(TestCase):
+
+    def setUp(self):
+
+        self.action = Genre.objects.create(name='Action')
+        self.drama = Genre.objects.create(name='Drama')
+        self.hindi = Language.objects.create(name='Hindi', code='hi')
+        self.english = Language.objects.create(name='English', code='en')
+
+        self.movies = {}
+        for title, genres, language in [
+            ('Action One', [self.action], self.hindi),
+            ('Action Two', [self.action], self.hindi),
+            ('Action Three', [self.action], self.english),
+            ('Drama One', [self.drama], self.english),
+        ]:
+            movie = Movie.objects.create(
+                title=title,
+                description='Test',
+                release_date=timezone.now().date(),
+                duration=120,
+                language=language
+            )
+            movie.genres.set(genres)
+            self.movies[title] = movie
+
+    def test_build_stores_ranked_neighbours(self):
+
+        count = RecommendationBuilder.build()
+
+        self.assertGreater(count, 0)
+        ranked = list(MovieRecommendation.objects.filter(
+            movie=self.movies['Action One']
+        ).values_list('recommended__title', flat=True))
+        self.assertEqual(ranked[0], 'Action Two')  # same genre and language
+        self.assertNotIn('Action One', ranked)
+
+    def test_co_wishlist_signal_lifts_neighbour(self):
+
+        for i in range(3):
+            user = User.objects.create_user(username=f'fan{i}', password='testpass123')
+            Wishlist.objects.create(user=user, movie=self.movies['Drama One'])
+            Wishlist.objects.create(user=user, movie=self.movies['Action Three'])
+
+        RecommendationBuilder.build()
+
+        first = MovieRecommendation.objects.get(movie=self.movies['Drama One'], rank=0)
+        self.assertEqual(first.recommended, self.movies['Action Three'])
+
+    def test_detail_lookup_uses_precomputed_rows(self):
+
+        RecommendationBuilder.build()
+
+        with self.assertNumQueries(1):
+            recommended = get_recommended_movies(self.movies['Action One'], limit=2)
+        self.assertEqual(recommended[0], self.movies['Action Two'])
+
+    def test_fallback_before_first_build(self):
+
+        recommended = get_recommended_movies(self.movies['Action One'])
+
+        self.assertEqual(
+            {m.title for m in recommended},
+            {'Action Two', 'Action Three'}
+        )
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class TrendingTrackerTests(TestCase):
+
+    def setUp(self):
+
+        cache.clear()
+        self.user = User.objects.create_user(username='testuser', password='testpass123')
+        self.movie = Movie.objects.create(
+            title='Hot Movie',
+            description='Test',
+            release_date=timezone.now().date(),
+            duration=120
+        )
+        self.other_movie = Movie.objects.create(
+            title='Quiet Movie',
+            description='Test',
+            release_date=timezone.now().date(),
+            duration=120
+        )
+        self.city = City.objects.create(name='Test City')
+        self.theater = Theater.objects.create(name='Test Theater', city=self.city, address='123 Test St')
+        self.screen = Screen.objects.create(theater=self.theater, name='Screen 1')
+        self.showtime = Showtime.objects.create(
+            movie=self.movie,
+            screen=self.screen,
+            date=timezone.now().date() + timezone.timedelta(days=1),
+            start_time='14:00',
+            end_time='16:00'
+        )
+
+    def test_confirmation_increments_movie_and_city_counters(self):
+
+        from bookings.models import Booking
+
+        booking = Booking.objects.create(
+            user=self.user,
+            showtime=self.showtime,
+            seats=['A1'],
+            total_seats=1,
+            base_price=200,
+            total_amount=265.4,
+            status='PENDING'
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.status = 'CONFIRMED'
+            booking.save()
+        with self.captureOnCommitCallbacks(execute=True):
+            booking.save()  # re-saving a confirmed booking must not count twice
+
+        self.assertAlmostEqual(TrendingTracker.scores()[self.movie.id], 1.0)
+        self.assertAlmostEqual(TrendingTracker.scores(self.city.id)[self.movie.id], 1.0)
+        self.assertEqual(TrendingTracker.get_trending_movies(), [self.movie])
+
+    def test_older_bookings_decay(self):
+
+        now = time.time()
+        TrendingTracker.record_booking(self.movie.id, now=now)
+        TrendingTracker.record_booking(self.other_movie.id, now=now - TrendingTracker.HALF_LIFE_SECONDS)
+
+        totals = TrendingTracker.scores(now=now)
+
+        self.assertAlmostEqual(totals[self.movie.id], 1.0)
+        self.assertAlmostEqual(totals[self.other_movie.id], 0.5)
+
+    def test_movie_list_trending_sort(self):
+
+        for _ in range(2):
+            TrendingTracker.record_booking(self.other_movie.id)
+
+        response = self.client.get('/movies/?sort=trending')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(list(response.context['movies'])[0], self.other_movie)
+
+    def test_home_shows_trending_section(self):
+
+        TrendingTracker.record_booking(self.movie.id)
+
+        response = self.client.get('/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['trending_movies'], [self.movie])
+        self.assertContains(response, 'Trending Now')
+
+class RatingAggregationTests(TestCase):
+
+    def setUp(self):
+
+        self.user = User.objects.create_user(username='critic', password='testpass123')
+        self.other_user = User.objects.create_user(username='fan', password='testpass123')
+        self.movie = Movie.objects.create(
+            title='Rated Movie',
+            description='Original description',
+            release_date=timezone.now().date(),
+            duration=120
+        )
+
+    def review(self, user, rating):
+        return Review.objects.create(user=user, movie=self.movie, rating=rating, title='T', content='C')
+
+    def test_reviews_update_aggregates_without_full_save(self):
+
+        stale = Movie.objects.get(pk=self.movie.pk)
+        updated_at = stale.updated_at
+
+        self.review(self.user, 8)
+        self.review(self.other_user, 6)
+
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.rating_count, 2)
+        self.assertEqual(self.movie.total_rating, 14)
+        self.assertEqual(self.movie.rating, 7)
+        self.assertEqual(self.movie.updated_at, updated_at)
+
+        stale.update_rating(10, refresh=True)  # a stale instance must not overwrite earlier reviews
+        self.assertEqual(stale.rating_count, 3)
+        self.assertEqual(stale.total_rating, 24)
+
+    def test_signal_path_is_a_single_update(self):
+
+        with self.assertNumQueries(1):
+            Movie(pk=self.movie.pk).update_rating(9)
+
+    def test_edit_and_delete_adjust_aggregates(self):
+
+        review = self.review(self.user, 8)
+        self.review(self.other_user, 6)
+
+        review.rating = 4
+        review.save()
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.rating, 5)
+
+        review.delete()
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.rating_count, 1)
+        self.assertEqual(self.movie.rating, 6)
+
+    def test_recompute_ratings_repairs_drift(self):
+
+        self.review(self.user, 9)
+        self.review(self.other_user, 7)
+        Movie.objects.filter(pk=self.movie.pk).update(rating_count=5, total_rating=1.0, rating=0.2)
+
+        out = StringIO()
+        call_command('recompute_ratings', stdout=out)
+
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.rating_count, 2)
+        self.assertEqual(self.movie.rating, 8)
+        self.assertIn('Reconciled ratings for 1 movies', out.getvalue())
+
+class CounterBufferTests(TestCase):
+
+    def setUp(self):
+
+        cache.clear()
+        self.users = [User.objects.create_user(username=f'user{i}', password='testpass123') for i in range(3)]
+        self.movie = Movie.objects.create(
+            title='Counted Movie',
+            description='Test',
+            release_date=timezone.now().date(),
+            duration=120
+        )
+        self.review = Review.objects.create(user=self.users[0], movie=self.movie, rating=8, title='T', content='C')
+
+    def test_counters_are_buffered_then_flushed_in_bulk(self):
+
+        with self.captureOnCommitCallbacks(execute=True):
+            for user in self.users:
+                Interest.objects.create(user=user, movie=self.movie)
+                Wishlist.objects.create(user=user, movie=self.movie)
+            ReviewLike.objects.create(user=self.users[1], review=self.review, is_like=True)
+            ReviewLike.objects.create(user=self.users[2], review=self.review, is_like=False)
+            Wishlist.objects.filter(user=self.users[0]).delete()
+
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.interest_count, 0)  # not flushed yet
+
+        CounterBuffer.flush()
+
+        self.movie.refresh_from_db()
+        self.review.refresh_from_db()
+        self.assertEqual(self.movie.interest_count, 3)
+        self.assertEqual(self.movie.wishlist_count, 2)
+        self.assertEqual((self.review.likes, self.review.dislikes), (1, 1))
+
+    def test_flipping_a_like_moves_the_count(self):
+
+        with self.captureOnCommitCallbacks(execute=True):
+            like = ReviewLike.objects.create(user=self.users[1], review=self.review, is_like=True)
+            like.is_like = False
+            like.save()
+        CounterBuffer.flush()
+
+        self.review.refresh_from_db()
+        self.assertEqual((self.review.likes, self.review.dislikes), (0, 1))
+
+    def test_repair_fixes_drift(self):
+
+        Interest.objects.create(user=self.users[0], movie=self.movie)
+        Movie.objects.filter(pk=self.movie.pk).update(interest_count=40, wishlist_count=7)
+        Review.objects.filter(pk=self.review.pk).update(likes=9)
+
+        reviews, movies = CounterBuffer.repair()
+
+        self.movie.refresh_from_db()
+        self.review.refresh_from_db()
+        self.assertEqual((reviews, movies), (1, 1))
+        self.assertEqual((self.movie.interest_count, self.movie.wishlist_count), (1, 0))
+        self.assertEqual(self.review.likes, 0)
+
+    def test_rolled_back_change_is_not_buffered(self):
+
+        with self.captureOnCommitCallbacks(execute=True):
+            try:
+                with transaction.atomic():
+                    Interest.objects.create(user=self.users[0], movie=self.movie)
+                    raise IntegrityError
+            except IntegrityError:
+                pass
+        CounterBuffer.flush()
+
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.interest_count, 0)
+
+    def test_repair_drops_deltas_the_recount_already_covers(self):
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Interest.objects.create(user=self.users[0], movie=self.movie)
+
+        CounterBuffer.repair()
+
+        self.assertEqual(CounterBuffer.flush(), 0)
+
+        self.movie.refresh_from_db()
+        self.assertEqual(self.movie.interest_count, 1)
+
+class ReviewFeedTests(TestCase):
+
+    def setUp(self):
+
+        cache.clear()
+        self.viewer = User.objects.create_user(username='viewer', password='testpass123')
+        self.movie = Movie.objects.create(
+            title='Reviewed Movie',
+            description='Test',
+            release_date=timezone.now().date(),
+            duration=120
+        )
+        self.reviews = []
+        for i in range(5):
+            author = User.objects.create_user(username=f'author{i}', password='testpass123')
+            self.reviews.append(Review.objects.create(
+                user=author, movie=self.movie, rating=7, title=f'Review {i}', content='C', likes=i
+            ))
+        ReviewLike.objects.create(user=self.viewer, review=self.reviews[4], is_like=True)
+        self.url = f'/movies/{self.movie.slug}/reviews/'
+
+    def test_keyset_pages_cover_every_review_once(self):
+
+        seen = []
+        cursor = None
+        while True:
+            params = {'limit': 2, 'sort': 'helpful'}
+            if cursor:
+                params['cursor'] = cursor
+            data = self.client.get(self.url, params).json()
+            seen.extend(review['id'] for review in data['results'])
+            cursor = data['next_cursor']
+            if not cursor:
+                break
+
+        self.assertEqual(seen, [review.id for review in reversed(self.reviews)])
+
+    def test_recent_cursor_round_trips_timezone_offset(self):
+
+        first = self.client.get(self.url, {'limit': 2}).json()
+        # Pasted into the URL as-is, the way a paging client follows it
+        second = self.client.get(f"{self.url}?limit=2&cursor={first['next_cursor']}").json()
+
+        self.assertEqual(
+            [review['id'] for review in first['results'] + second['results']],
+            [review.id for review in reversed(self.reviews)][:4]
+        )
+
+    def test_invalid_cursor_is_rejected(self):
+
+        response = self.client.get(self.url, {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_page_queries_do_not_grow_with_page_size(self):
+
+        self.client.login(username='viewer', password='testpass123')
+        self.client.get(self.url)  # warm the first-page cache
+
+        # session user + movie id lookup + the viewer's reactions for the whole page
+        with self.assertNumQueries(3):
+            data = self.client.get(self.url).json()
+
+        self.assertEqual(data['results'][0]['viewer_reaction'], 'like')
+        self.assertIsNone(data['results'][1]['viewer_reaction'])
+
+    def test_new_review_invalidates_first_page(self):
+
+        self.client.get(self.url)
+        author = User.objects.create_user(username='latecomer', password='testpass123')
+        Review.objects.create(user=author, movie=self.movie, rating=9, title='Newest', content='C')
+
+        data = self.client.get(self.url).json()
+
+        self.assertEqual(data['results'][0]['title'], 'Newest')
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class ShowtimeAvailabilityTests(TestCase):
+
+    def setUp(self):
+
+        cache.clear()
+        self.movie = Movie.objects.create(
+            title='Busy Movie',
+            description='Test',
+            release_date=timezone.now().date(),
+            duration=120
+        )
+        self.city = City.objects.create(name='Test City')
+        self.theater = Theater.objects.create(name='Test Theater', city=self.city, address='123 Test St')
+        self.screen = Screen.objects.create(theater=self.theater, name='Screen 1', total_seats=80)
+
+    def add_showtimes(self, count):
+
+        for hour in range(count):
+            Showtime.objects.create(
+                movie=self.movie,
+                screen=self.screen,
+                date=timezone.now().date(),
+                start_time=f'{hour + 8:02d}:00',
+                end_time=f'{hour + 9:02d}:00'
+            )
+
+    def test_detail_queries_do_not_grow_with_showtimes(self):
+
+        self.add_showtimes(1)
+        cache.clear()
+        with CaptureQueriesContext(connection) as one_showtime:
+            self.client.get(f'/movies/{self.movie.slug}/')
+
+        self.add_showtimes(6)
+        cache.clear()
+        with CaptureQueriesContext(connection) as many_showtimes:
+            response = self.client.get(f'/movies/{self.movie.slug}/')
+
+        self.assertEqual(len(many_showtimes), len(one_showtime))
+        self.assertContains(response, '80')
+
+    def test_sold_out_showtime_is_badged(self):
+
+        self.add_showtimes(1)
+        Showtime.objects.update(available_seats=0)
+
+        response = self.client.get(f'/movies/{self.movie.slug}/')
+
+        self.assertContains(response, 'Sold Out')
+
+@override_settings(L1_CACHE={'ENABLED': True, 'MAX_ENTRIES': 3})
+class L1CacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        L1Cache.clear()
+
+    def tearDown(self):
+        L1Cache.clear()
+
+    def test_catalog_lists_are_served_from_l1_until_edited(self):
+
+        Genre.objects.create(name='Action')
+
+        with CaptureQueriesContext(connection) as first:
+            self.assertEqual([genre.name for genre in Catalog.genres()], ['Action'])
+        self.assertEqual(len(first), 1)
+
+        # Gone from Redis but still in this process: no query, no round trip
+        cache.delete(Catalog.GENRES_KEY)
+        with CaptureQueriesContext(connection) as second:
+            self.assertEqual([genre.name for genre in Catalog.genres()], ['Action'])
+        self.assertEqual(len(second), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Genre.objects.create(name='Drama')
+            # Not dropped until the edit commits, or a reader could cache the old list again
+            self.assertEqual([genre.name for genre in Catalog.genres()], ['Action'])
+        self.assertEqual([genre.name for genre in Catalog.genres()], ['Action', 'Drama'])
+
+    def test_lru_eviction_and_ttl(self):
+
+        with override_settings(L1_CACHE={'ENABLED': True, 'MAX_ENTRIES': 2, 'FAMILIES': {'autocomplete': 0.05}}):
+            for query in ('a', 'b', 'c'):
+                L1Cache.get('seat_layout', f'layout_{query}', loader=lambda query=query: [query])
+            self.assertEqual(L1Cache.stats(), {'seat_layout': 2})
+
+            cache.set('layout_a', ['stale'])
+            self.assertEqual(L1Cache.get('seat_layout', 'layout_a'), ['stale'])  # Evicted, so re-read from Redis
+
+            L1Cache.get('autocomplete', 'autocomplete_ab', loader=lambda: ['fresh'])
+            cache.set('autocomplete_ab', ['newer'])
+            self.assertEqual(L1Cache.get('autocomplete', 'autocomplete_ab'), ['fresh'])
+            time.sleep(0.06)
+            self.assertEqual(L1Cache.get('autocomplete', 'autocomplete_ab'), ['newer'])
+
+    def test_invalidations_from_other_processes_evict_entries(self):
+
+        L1Cache.get('genres', 'catalog_genres', loader=lambda: ['Action'])
+        L1Cache.handle_message(f'{L1Cache._origin}|genres|catalog_genres'.encode())
+        self.assertEqual(L1Cache.stats(), {'genres': 1})
+
+        L1Cache.handle_message(b'another-worker|genres|')
+        self.assertEqual(L1Cache.stats(), {})
+
+    def test_local_redis_pubsub_delivers_messages(self):
+
+        redis_conn = LocalRedis()
+        pubsub = redis_conn.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(L1Cache.CHANNEL)
+
+        self.assertEqual(redis_conn.publish(L1Cache.CHANNEL, 'worker|genres|'), 1)
+        message = pubsub.get_message(timeout=1)
+        self.assertEqual(message['data'], b'worker|genres|')
+        self.assertIsNone(pubsub.get_message())
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage', READ_REPLICAS=['replica_1'])
+class ReadReplicaRoutingTests(TransactionTestCase):
+
+    # The replica mirrors the test database through a second connection, which only sees committed rows
+    databases = {'default', 'replica_1'}
+
+    def setUp(self):
+
+        cache.clear()
+        self.movie = Movie.objects.create(title='Replica Movie', description='Test', release_date=timezone.now().date(), duration=120)
+        self.user = User.objects.create_user(username='reader', email='reader@example.com', password='testpass123')
+        self.user.profile.is_email_verified = True
+        self.user.profile.save()
+
+    def get(self, url):
+
+        with CaptureQueriesContext(connection) as primary, CaptureQueriesContext(connections['replica_1']) as replica:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(primary), len(replica)
+
+    def test_catalog_reads_go_to_the_replica(self):
+
+        primary, replica = self.get(f'/movies/{self.movie.slug}/')
+
+        self.assertEqual(primary, 0)
+        self.assertGreater(replica, 0)
+
+    def test_replica_is_picked_once_per_request(self):
+
+        with mock.patch('moviebooking.db_router.random.choice', return_value='replica_1') as choice:
+            primary, replica = self.get(f'/movies/{self.movie.slug}/')
+
+        self.assertGreater(replica, 1)
+        self.assertEqual(choice.call_count, 1)
+
+    def test_views_outside_the_list_stay_on_the_primary(self):
+
+        self.client.force_login(self.user)
+        primary, replica = self.get('/accounts/profile/')
+
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+    def test_a_write_pins_the_session_to_the_primary(self):
+
+        # Logging in writes last_login, so the next catalog read must see the primary
+        self.client.post('/accounts/login/', {'email': 'reader@example.com', 'password': 'testpass123'})
+        primary, replica = self.get(f'/movies/{self.movie.slug}/')
+        self.assertGreater(primary, 0)
+        self.assertEqual(replica, 0)
+
+        with override_settings(READ_REPLICA_PIN_SECONDS=0):
+            self.client.post('/accounts/login/', {'email': 'reader@example.com', 'password': 'testpass123'})
+            self.assertEqual(self.get(f'/movies/{self.movie.slug}/')[0], 0)
+
+    def test_no_configured_replica_falls_back_to_the_primary(self):
+
+        for replicas in ([], ['replica_9']):
+            with self.subTest(replicas=replicas), override_settings(READ_REPLICAS=replicas):
+                primary, replica = self.get(f'/movies/{self.movie.slug}/')
+                self.assertGreater(primary, 0)
+                self.assertEqual(replica, 0)
+
+    def test_replicas_take_no_writes_or_migrations(self):
+
+        router = ReplicaRouter()
+        self.assertEqual(router.db_for_write(Movie), 'default')
+        self.assertEqual(router.db_for_read(Movie), 'default')
+        self.assertFalse(router.allow_migrate('replica_1', 'movies'))
+        self.assertIsNone(router.allow_migrate('default', 'movies'))
+
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+    L1_CACHE={'ENABLED': True},
+)
+class MovieViewQueryBudgetTests(QueryBudgetMixin, TestCase):
+
+    def setUp(self):
+        L1Cache.clear()
+        self.seed()
+
+    def tearDown(self):
+        L1Cache.clear()
+
+    def test_home(self):
+
+        cache.clear()
+        Catalog.genres()
+        for movie in self.movies[:5]:
+            TrendingTracker.record_booking(movie_id=movie.id, city_id=None)
+        self.assertWithinBudget('/', queries=10, cache_calls=4, user=self.customer, cold=False)
+
+    def test_movie_list(self):
+        # Cold: filling the genre/language lists adds a get+set each over the bare view
+        self.assertWithinBudget('/movies/', queries=8, cache_calls=5, user=self.customer)
+
+    def test_movie_list_sorted_by_trending(self):
+        self.assertWithinBudget('/movies/?sort=trending', queries=8, cache_calls=7, user=self.customer)
+
+    def test_movie_list_warm_reads_catalog_from_l1(self):
+
+        self.measure('/movies/?sort=trending', self.customer)
+        self.assertWithinBudget('/movies/', queries=5, cache_calls=1, user=self.customer, cold=False)
+        self.assertWithinBudget('/movies/?sort=trending', queries=5, cache_calls=2, user=self.customer, cold=False)
+
+    def test_movie_detail(self):
+        self.assertWithinBudget(f'/movies/{self.movies[0].slug}/', queries=12, cache_calls=2, user=self.customer)
+
+    def test_movie_detail_with_recommendations(self):
+
+        RecommendationBuilder.build()
+        self.assertWithinBudget(f'/movies/{self.movies[0].slug}/', queries=12, cache_calls=2, user=self.customer)
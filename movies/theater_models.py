@@ -1,6 +1,6 @@
 from django.db import models
 from django.utils.text import slugify
-from django.core.validators import MaxValueValidator, MinValueValidator
+from django.core.validators import MinValueValidator
 
 class City(models.Model):
     name = models.CharField(max_length=100)
@@ -77,9 +77,12 @@ class Showtime(models.Model):
     
     price = models.DecimalField(max_digits=8, decimal_places=2, default=200.00)
     
+    # Kept in step with bookings by bookings.inventory.SeatInventory (F() updates + periodic repair);
+    # NULL until set, which save() and SeatInventory read as the screen's full capacity
     available_seats = models.IntegerField(
-        default=100,
-        validators=[MinValueValidator(0), MaxValueValidator(100)]
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(0)]
     )
     
     is_active = models.BooleanField(default=True)
@@ -88,6 +91,16 @@ class Showtime(models.Model):
     def __str__(self):
         return f"{self.movie.title} - {self.date} {self.start_time}"
     
+    def save(self, *args, **kwargs):
+        # Left empty, a new showtime starts at its screen's capacity
+        if self._state.adding and self.available_seats is None and self.screen_id:
+            self.available_seats = self.screen.total_seats
+        super().save(*args, **kwargs)
+    
+    @property
+    def is_sold_out(self):
+        return self.available_seats is not None and self.available_seats <= 0
+    
     def get_formatted_time(self):
 
         return self.start_time.strftime("%I:%M %p")
@@ -0,0 +1,112 @@
+import logging
+import time
+
+from django.core.cache import cache
+from django.db.models import Case, When, IntegerField
+from moviebooking.redis_client import get_redis_connection
+
+logger = logging.getLogger(__name__)
+
+class TrendingTracker:
+
+    BUCKET_SECONDS = 300  # 5 minute buckets
+    WINDOW_BUCKETS = 576  # 48 hours of buckets
+    HALF_LIFE_SECONDS = 6 * 3600  # A booking 6h ago counts half as much as one now
+    RANKING_CACHE_TIMEOUT = 60
+
+    PREFIX = "moviebooking:v2:trending"
+
+    @staticmethod
+    def current_bucket(now=None):
+        return int((now if now is not None else time.time()) // TrendingTracker.BUCKET_SECONDS)
+
+    @staticmethod
+    def bucket_key(bucket, city_id=None):
+        scope = f"city:{city_id}" if city_id else "all"
+        return f"{TrendingTracker.PREFIX}:{scope}:{bucket}"
+
+    @staticmethod
+    def record_booking(movie_id, city_id=None, count=1, now=None):
+
+        # O(1): one HINCRBY per scope on the current bucket, in a single round-trip
+        try:
+            bucket = TrendingTracker.current_bucket(now)
+            ttl = TrendingTracker.BUCKET_SECONDS * (TrendingTracker.WINDOW_BUCKETS + 1)
+
+            redis_conn = get_redis_connection("default")
+            pipe = redis_conn.pipeline(transaction=False)
+            for scope in ([None, city_id] if city_id else [None]):
+                key = TrendingTracker.bucket_key(bucket, scope)
+                pipe.hincrby(key, movie_id, count)
+                pipe.expire(key, ttl)
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Error recording trending booking for movie {movie_id}: {e}")
+
+    @staticmethod
+    def scores(city_id=None, now=None):
+
+        # O(buckets): fetch every bucket of the window in one pipeline and sum with decay
+        current = TrendingTracker.current_bucket(now)
+        buckets = range(current - TrendingTracker.WINDOW_BUCKETS + 1, current + 1)
+
+        redis_conn = get_redis_connection("default")
+        pipe = redis_conn.pipeline(transaction=False)
+        for bucket in buckets:
+            pipe.hgetall(TrendingTracker.bucket_key(bucket, city_id))
+        counts_per_bucket = pipe.execute()
+
+        decay_per_bucket = 0.5 ** (TrendingTracker.BUCKET_SECONDS / TrendingTracker.HALF_LIFE_SECONDS)
+        totals = {}
+        for bucket, counts in zip(buckets, counts_per_bucket):
+            if not counts:
+                continue
+            weight = decay_per_bucket ** (current - bucket)
+            for movie_id, count in counts.items():
+                movie_id = int(movie_id)
+                totals[movie_id] = totals.get(movie_id, 0.0) + int(count) * weight
+        return totals
+
+    @staticmethod
+    def get_trending_ids(city_id=None, limit=10):
+
+        cache_key = f"trending_ids_{city_id or 'all'}_{limit}"
+        ranked = cache.get(cache_key)
+
+        if ranked is None:
+            try:
+                totals = TrendingTracker.scores(city_id)
+            except Exception as e:
+                logger.error(f"Error reading trending counters: {e}")
+                return []
+            ranked = [movie_id for movie_id, _ in sorted(totals.items(), key=lambda item: (-item[1], item[0]))][:limit]
+            cache.set(cache_key, ranked, timeout=TrendingTracker.RANKING_CACHE_TIMEOUT)
+
+        return ranked
+
+    @staticmethod
+    def get_trending_movies(city_id=None, limit=10):
+
+        from .models import Movie
+
+        ranked = TrendingTracker.get_trending_ids(city_id, limit)
+        if not ranked:
+            return []
+
+        movies = Movie.objects.filter(id__in=ranked, is_active=True).prefetch_related('genres').in_bulk()
+        return [movies[movie_id] for movie_id in ranked if movie_id in movies]
+
+    @staticmethod
+    def order_by_trending(queryset, city_id=None, limit=50):
+
+        ranked = TrendingTracker.get_trending_ids(city_id, limit)
+        if not ranked:
+            return queryset
+
+        return queryset.annotate(
+            trending_rank=Case(
+                *[When(id=movie_id, then=position) for position, movie_id in enumerate(ranked)],
+                default=len(ranked),
+                output_field=IntegerField(),
+            )
+        ).order_by('trending_rank', '-release_date')
@@ -8,6 +8,7 @@ urlpatterns = [
 
     
     path('movies/<slug:slug>/', views.movie_detail, name='movie_detail'),
+    path('movies/<slug:slug>/reviews/', views.movie_reviews, name='movie_reviews'),
     
     path('movie/<slug:slug>/trailer/', views.movie_trailer, name='movie_trailer'),
     
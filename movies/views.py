@@ -1,9 +1,13 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.views.generic import ListView, DetailView
-from .models import Movie, Genre, Language
-from .theater_models import City, Showtime
-from django.db.models import Q
+from .models import Movie
+from .catalog import Catalog
+from .theater_models import Showtime
+from .recommendations import get_recommended_movies
+from .trending import TrendingTracker
+from .reviews import ReviewFeed
+from django.db.models import Q, prefetch_related_objects
 from django.contrib import messages
 from django.http import JsonResponse
 from django.views.decorators.csrf import csrf_exempt
@@ -11,15 +15,16 @@ from django.utils import timezone
 from django.conf import settings
 import json
 from embed_video.backends import detect_backend
-from django.core.cache import cache
+from moviebooking.l1cache import L1Cache
 
 def movie_list(request):
 
-    movies = Movie.objects.filter(is_active=True).order_by('-release_date')
+    movies = Movie.objects.filter(is_active=True).prefetch_related('genres').order_by('-release_date')
     
     query = request.GET.get('q', '') # General search query
     selected_genre = request.GET.get('genre', '')
     selected_language = request.GET.get('language', '')
+    selected_sort = request.GET.get('sort', '')
     
     if query:
         movies = movies.filter(
@@ -35,13 +40,16 @@ def movie_list(request):
     if selected_language:
         movies = movies.filter(language__code=selected_language)
     
+    if selected_sort == 'trending':
+        movies = TrendingTracker.order_by_trending(movies)
 
     context = {
         'movies': movies,
-        'genres': Genre.objects.all(),
-        'languages': Language.objects.all(),
+        'genres': Catalog.genres(),
+        'languages': Catalog.languages(),
         'selected_genre': request.GET.get('genre', ''),
         'selected_language': request.GET.get('language', ''),
+        'selected_sort': selected_sort,
         'query': query,
     }
     
@@ -51,43 +59,36 @@ def movie_detail(request, slug):
 
     movie = get_object_or_404(Movie, slug=slug, is_active=True)
     
+    # One query for every showtime with its screen/theater/city; seat counts come from
+    # the maintained Showtime.available_seats column, so the badges add no queries
     showtimes = Showtime.objects.filter(
         movie=movie,
-        is_active=True
-    ).order_by('date', 'start_time')
-    
-    cities_with_showtimes = []
-    cities = City.objects.filter(is_active=True)
-    
-    for city in cities:
-        city_showtimes = showtimes.filter(screen__theater__city=city)
-        
-        if city_showtimes.exists():
-            theaters = {}
-            for showtime in city_showtimes:
-                theater = showtime.screen.theater
-                if theater.id not in theaters:
-                    theaters[theater.id] = {
-                        'theater': theater,
-                        'showtimes': []
-                    }
-                theaters[theater.id]['showtimes'].append(showtime)
-            
-            cities_with_showtimes.append({
-                'city': city,
-                'theaters': list(theaters.values())
-            })
+        is_active=True,
+        screen__theater__city__is_active=True
+    ).select_related('screen__theater__city').order_by('date', 'start_time')
+    
+    cities = {}
+    for showtime in showtimes:
+        theater = showtime.screen.theater
+        city = cities.setdefault(theater.city.id, {'city': theater.city, 'theaters': {}})
+        city['theaters'].setdefault(theater.id, {
+            'theater': theater,
+            'showtimes': []
+        })['showtimes'].append(showtime)
+    
+    cities_with_showtimes = [
+        {'city': city['city'], 'theaters': list(city['theaters'].values())}
+        for city in sorted(cities.values(), key=lambda city: city['city'].name)
+    ]
     
     user_review = None
 
     reviews = []
 
-    recommended_movies = Movie.objects.filter(
-        genres__in=movie.genres.all(),
-        is_active=True
-    ).exclude(id=movie.id).distinct()[:4]
+    recommended_movies = get_recommended_movies(movie, limit=4)
+    prefetch_related_objects(recommended_movies, 'genres')
 
-    recently_added = Movie.objects.filter(is_active=True).order_by('-created_at').exclude(id=movie.id)[:4]
+    recently_added = Movie.objects.filter(is_active=True).prefetch_related('genres').order_by('-created_at').exclude(id=movie.id)[:4]
 
     context = {
         'movie': movie,
@@ -99,9 +100,33 @@ def movie_detail(request, slug):
     
     return render(request, 'movies/movie_detail.html', context)
 
+def movie_reviews(request, slug):
+
+    movie_id = Movie.objects.filter(slug=slug, is_active=True).values_list('id', flat=True).first()
+    if movie_id is None:
+        return JsonResponse({'error': 'Movie not found'}, status=404)
+    
+    try:
+        limit = int(request.GET.get('limit', ReviewFeed.PAGE_SIZE))
+    except ValueError:
+        limit = ReviewFeed.PAGE_SIZE
+    
+    try:
+        page = ReviewFeed.get_page(
+            movie_id,
+            sort=request.GET.get('sort'),
+            cursor=request.GET.get('cursor'),
+            limit=limit,
+            user=request.user,
+        )
+    except ValueError as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    
+    return JsonResponse(page)
+
 def home(request):
 
-    featured_movies = Movie.objects.filter(is_active=True).order_by('-release_date')[:6]
+    featured_movies = Movie.objects.filter(is_active=True).prefetch_related('genres').order_by('-release_date')[:6]
     
     from datetime import date, timedelta
     next_week = date.today() + timedelta(days=7)
@@ -114,13 +139,15 @@ def home(request):
     now_showing = Movie.objects.filter(
         id__in=upcoming_showtimes,
         is_active=True
-    )[:8]
+    ).prefetch_related('genres')[:8]
     
-    genres = Genre.objects.all()[:10]
+    genres = Catalog.genres()[:10]
     
+    trending_movies = TrendingTracker.get_trending_movies(limit=6)
     
     context = {
         'featured_movies': featured_movies,
+        'trending_movies': trending_movies,
         'now_showing': now_showing,
         'genres': genres,
     }
@@ -166,9 +193,8 @@ def movie_autocomplete(request):
         return JsonResponse({'results': []})
     
     cache_key = f'autocomplete_{query.lower()}'
-    results = cache.get(cache_key)
-    
-    if not results:
+
+    def search():
         movies = Movie.objects.filter(
             Q(title__icontains=query) |
             Q(cast__icontains=query) |
@@ -176,7 +202,7 @@ def movie_autocomplete(request):
             is_active=True
         )[:10]
         
-        results = [
+        return [
             {
                 'id': movie.id,
                 'title': movie.title,
@@ -187,8 +213,8 @@ def movie_autocomplete(request):
             }
             for movie in movies
         ]
-        
-        cache.set(cache_key, results, timeout=300)  # Cache for 5 minutes
+    
+    results = L1Cache.get('autocomplete', cache_key, loader=search, timeout=300)  # Cache for 5 minutes
     
     return JsonResponse({'results': results})
 